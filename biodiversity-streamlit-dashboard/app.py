@@ -1,8 +1,13 @@
 import streamlit as st
 from pathlib import Path
-from src.data_loader import load_and_clean_data
-from src.components.sidebar import sidebar
+from src.data_loader import load_and_open_dataset
+from src.components.sidebar import FILTER_COLUMNS, SIDEBAR_HIERARCHY_COLUMNS, sidebar
 from src.components import tabs
+from src.cache import filter_key
+from src.cube import CUBE_COLUMNS, CountCube
+from src.sketches import SKETCH_COLUMNS, DistinctSketches
+from src.indexes import DATE_INDEX_COLUMNS, FILTER_INDEX_COLUMNS, DateIndex, FilterIndex, HierarchyIndex
+from src.spatial import SPATIAL_INDEX_COLUMNS, SpatialIndex
 
 
 def main():
@@ -14,7 +19,10 @@ def main():
         with open(css_path) as f:
             st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-    data_path = Path(__file__).parent / "data" / "gbif_cleaned.csv"
+    # Prefer the incrementally updated store (src/store.py) when one has been built
+    data_path = Path(__file__).parent / "data" / "gbif_store"
+    if not data_path.exists():
+        data_path = Path(__file__).parent / "data" / "gbif_cleaned.csv"
     
     # Check if file exists
     if not data_path.exists():
@@ -22,36 +30,49 @@ def main():
         return
 
     with st.spinner("Loading data..."):
-        df = load_and_clean_data(str(data_path))
+        dataset = load_and_open_dataset(str(data_path))
+        df = dataset.frame(FILTER_COLUMNS)
 
     # Sidebar returns the selected page name and filters
-    selected, filters = sidebar(df)
+    selected, filters = sidebar(df, dataset.derived(HierarchyIndex, SIDEBAR_HIERARCHY_COLUMNS))
 
-    # Apply filters
-    if filters["kingdom"] != "All":
-        df = df[df["kingdom_grouped"] == filters["kingdom"]]
-    
-    if filters["phylum"] != "All":
-        df = df[df["phylum"] == filters["phylum"]]
+    # Read only the columns the selected page uses; they stay loaded for later reruns
+    tab_columns = tabs.columns_for(selected)
+    df = dataset.frame(None if tab_columns is None else FILTER_COLUMNS + tab_columns)
 
-    if filters["country"] != "All":
-        df = df[df["countryCode"] == filters["country"]]
-    
-    if filters["state"] != "All":
-        df = df[df["stateProvince"] == filters["state"]]
-        
-    if filters["year_range"]:
-        df = df[(df["event_year"] >= filters["year_range"][0]) & (df["event_year"] <= filters["year_range"][1])]
-        
-    if filters["has_image"]:
-        # Assuming mediaType contains 'StillImage' for images
-        df = df[df['mediaType'].str.contains('StillImage', na=False)]
-        
-    if filters["valid_coords"]:
-        df = df.dropna(subset=['decimalLatitude', 'decimalLongitude'])
+    # Apply filters: the index (built once per dataset) returns the matching rows
+    index = dataset.derived(FilterIndex, FILTER_INDEX_COLUMNS)
+    rows = dataset.results.get(('rows', filter_key(filters)), lambda: index.select(filters))
+    if rows is not None:
+        df = df.take(rows)
+
+    # Count charts slice the dataset-wide cube, maps and date search the
+    # dataset-wide spatial and date indexes; pages with selectors or summaries
+    # read an index of the filtered rows. All are built once per filter.
+    index = None
+    if selected in tabs.CUBE_TABS:
+        cube = dataset.derived(CountCube, CUBE_COLUMNS)
+        index = dataset.results.get(('CountCube', filter_key(filters)), lambda: cube.where(filters))
+    elif selected in tabs.SPATIAL_TABS:
+        spatial = dataset.derived(SpatialIndex, SPATIAL_INDEX_COLUMNS)
+        index = dataset.results.get(('SpatialIndex', filter_key(filters)), lambda: spatial.where(rows))
+    elif selected in tabs.DATE_TABS:
+        dates = dataset.derived(DateIndex, DATE_INDEX_COLUMNS)
+        index = dataset.results.get(('DateIndex', filter_key(filters)), lambda: dates.where(rows))
+    elif selected in tabs.SKETCH_TABS:
+        exact = st.session_state.get("exact_counts", False)
+        sketches = None if exact else dataset.derived(DistinctSketches, SKETCH_COLUMNS)
+        key = ('sketch', selected, exact, filter_key(filters))
+        index = dataset.results.get(key, lambda: tabs.SKETCH_TABS[selected](df, sketches, filters))
+    elif selected in tabs.TAB_INDEXES:
+        key = (tabs.TAB_INDEXES[selected].__name__, selected, filter_key(filters))
+        index = dataset.results.get(key, lambda: tabs.TAB_INDEXES[selected](df))
+
+    def cached(key, build):
+        return dataset.results.get((key, filter_key(filters)), build)
 
     # Display the selected tab, passing the dataframe
-    tabs.main(selected, df)
+    tabs.main(selected, df, index, cached)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Default memory budget of a dataset's ResultCache
+RESULT_CACHE_BYTES = 256 * 2**20
+
+# Rendered figures: memory and disk budgets, and where the disk tier lives
+FIGURE_MEMORY_BYTES = 64 * 2**20
+FIGURE_DISK_BYTES = 512 * 2**20
+FIGURE_CACHE_DIR = Path(__file__).parent.parent / ".cache" / "figures"
+
+_MISSING = object()
+
+
+def filter_key(filters):
+    """Hashable, order-independent key for a sidebar filter dict.
+
+    Filters left at their defaults ("All", unchecked, no range) are dropped, so
+    equivalent selections share an entry.
+    """
+    items = []
+    for name, value in filters.items():
+        if value is None or value is False or value == "All":
+            continue
+        if isinstance(value, (list, tuple)):
+            value = tuple(value)
+        items.append((name, value))
+    return tuple(sorted(items))
+
+
+def result_size(value):
+    """Approximate bytes held by a cached result."""
+    if value is None:
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray) or hasattr(value, 'nbytes'):
+        # Arrays, and indexes that report their own footprint
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(result_size(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Thread-safe LRU cache of filter results bounded by a byte budget.
+
+    Shared by every session on the server, so the row selection or
+    aggregate one user computes for a filter combination is reused by the
+    next. The least recently used entries are evicted until the new entry
+    fits; results larger than the whole budget are returned but not stored.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, compute):
+        """Return the cached result for key, computing and storing it on a miss."""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Computed outside the lock; two sessions racing on one key both compute it
+        value = compute()
+        size = result_size(value)
+        if size > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            while self._entries and self.nbytes + size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+            self._entries[key] = (value, size)
+            self.nbytes += size
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries), 'bytes': self.nbytes, 'max_bytes': self.max_bytes,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+        }
+
+
+def fingerprint(*parts):
+    """Hex digest identifying the content of frames, series, arrays and plain values."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        elif isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Rendered figures (PNG/SVG bytes, Plotly JSON) in a memory tier over a disk tier.
+
+    Keys are fingerprints of the plot function, its parameters and the data
+    it draws, so a stale entry can never match. The memory tier is a
+    ResultCache; the disk tier keeps one file per figure and drops the least
+    recently used files once it grows past max_disk_bytes. Pass
+    directory=None for memory only.
+    """
+
+    def __init__(self, directory=FIGURE_CACHE_DIR, max_memory_bytes=FIGURE_MEMORY_BYTES,
+                 max_disk_bytes=FIGURE_DISK_BYTES):
+        self.memory = ResultCache(max_memory_bytes)
+        self.directory = None if directory is None else Path(directory)
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_hits = 0
+        self._disk_lock = threading.Lock()
+
+    def get(self, key, render):
+        """Return the bytes cached for key, calling render() (bytes or None) on a miss."""
+        return self.memory.get(key, lambda: self._from_disk(key, render))
+
+    def _from_disk(self, key, render):
+        path = None if self.directory is None else self.directory / key
+        if path is not None and path.exists():
+            try:
+                data = path.read_bytes()
+                os.utime(path)
+                self.disk_hits += 1
+                return data
+            except OSError:
+                pass
+
+        data = render()
+        if path is not None and data is not None:
+            self._write(path, data)
+        return data
+
+    def _write(self, path, data):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            # The disk tier is an optimization; a read-only or full disk only costs re-renders
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        with self._disk_lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, file in sorted(files):
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(file)
+                except OSError:
+                    continue
+                total -= size
+
+    def stats(self):
+        return {**self.memory.stats(), 'disk_hits': self.disk_hits}
+
+
+# Shared by every session in the process
+FIGURE_CACHE = FigureCache()
@@ -0,0 +1,80 @@
+import io
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+from src import visualizations
+from src.cache import FIGURE_CACHE, fingerprint
+
+
+def figure_key(plot, df, fmt, params):
+    """Fingerprint of a plot call: function, output format, parameters and the data drawn.
+
+    When a parameter carries precomputed data (counts, richness, ...) the
+    plot only checks whether df is empty, so the rows are not hashed.
+    """
+    precomputed = any(isinstance(value, (pd.Series, pd.DataFrame, np.ndarray)) for value in params.values())
+    if precomputed:
+        data = df.empty
+    else:
+        # Column-name parameters (plot_taxonomy_pie's column) are read too
+        columns = visualizations.PLOT_COLUMNS[plot.__name__] + [v for v in params.values() if isinstance(v, str)]
+        data = df[[col for col in dict.fromkeys(columns) if col in df.columns]]
+    return fingerprint(plot.__name__, fmt, data, *chain.from_iterable(sorted(params.items())))
+
+
+def _figure_bytes(fig, fmt):
+    buffer = io.BytesIO()
+    # Same output st.pyplot produces
+    fig.savefig(buffer, format=fmt, dpi=200, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def pyplot_image(plot, df, fmt='png', **params):
+    """Cached PNG or SVG bytes of plot(df, **params), or None when there is nothing to draw.
+
+    Makes no Streamlit calls, so it can run on a worker thread.
+    """
+    def render():
+        fig = plot(df, **params)
+        return None if fig is None else _figure_bytes(fig, fmt)
+
+    return FIGURE_CACHE.get(figure_key(plot, df, fmt, params), render)
+
+
+def plotly_json(plot, df, **params):
+    """Cached figure JSON of a Plotly plot(df, **params), or None; safe on a worker thread."""
+    def render():
+        fig = plot(df, **params)
+        return None if fig is None else fig.to_json().encode()
+
+    return FIGURE_CACHE.get(figure_key(plot, df, 'plotly', params), render)
+
+
+def place_image(slot, data, fmt='png'):
+    """Show pyplot_image bytes in slot (st itself or a placeholder)."""
+    slot.image(data.decode() if fmt == 'svg' else data, use_container_width=True)
+
+
+def place_plotly(slot, data):
+    slot.plotly_chart(pio.from_json(data.decode()), use_container_width=True)
+
+
+def show_pyplot(plot, df, fmt='png', **params):
+    """Show plot(df, **params) as a cached PNG or SVG; returns False when there is nothing to draw."""
+    data = pyplot_image(plot, df, fmt, **params)
+    if data is None:
+        return False
+    place_image(st, data, fmt)
+    return True
+
+
+def show_plotly(plot, df, **params):
+    """Show a Plotly chart rebuilt from cached figure JSON; returns False when there is nothing to draw."""
+    data = plotly_json(plot, df, **params)
+    if data is None:
+        return False
+    place_plotly(st, data)
+    return True
@@ -1,72 +1,102 @@
 import streamlit as st
 import pandas as pd
+from src.indexes import paginate
 
-def display_date_search_tab(df):
+# Columns read by the tab, see tabs.TAB_COLUMNS
+COLUMNS = ['event_year', 'event_month', 'event_day', 'species', 'kingdom', 'countryCode', 'eventDate', 'occurrenceID']
+
+PAGE_SIZE = 100
+
+def display_date_search_tab(df, index):
+    """index is the dataset's DateIndex restricted to the rows of df (see app.main)."""
     st.title("Date Search")
-    st.write("Search for observations on a specific date.")
+    st.write("Search for observations on a specific date, across a range of dates, or on the same day every year.")
     
     if df.empty:
         st.warning("No data available.")
         return
 
+    mode = st.radio("Search by", ["Exact date", "Date range", "Same day every year"], horizontal=True)
+
     # Date Input Widgets
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        # Get unique years from data if possible, else default range
-        if 'event_year' in df.columns:
-            years = sorted(df['event_year'].dropna().unique().astype(int).tolist(), reverse=True)
+    if mode == "Date range":
+        if index.first is None:
+            st.info("No dated observations for the current filters.")
+            return
+        picked = st.date_input("Between", (index.first, index.last), min_value=index.first, max_value=index.last)
+        if len(picked) != 2:
+            st.info("Select a start and an end date.")
+            return
+        query = (mode, *picked)
+        label = f"between {picked[0]} and {picked[1]}"
+    else:
+        col1, col2, col3 = st.columns(3)
+        if mode == "Exact date":
+            with col1:
+                # Years present in the data, else default range
+                years = index.years or list(range(2023, 1900, -1))
+                selected_year = st.selectbox("Year", years)
+        else:
+            selected_year = None
+            
+        with col2:
+            months = list(range(1, 13))
+            selected_month = st.selectbox("Month", months)
+            
+        with col3:
+            days = list(range(1, 32))
+            selected_day = st.selectbox("Day", days)
+        query = (mode, selected_year, selected_month, selected_day)
+        if mode == "Exact date":
+            label = f"on {selected_year}-{selected_month}-{selected_day}"
         else:
-            years = list(range(2023, 1900, -1))
-        selected_year = st.selectbox("Year", years)
+            label = f"on {selected_month}-{selected_day} of any year"
+        
+    # Search Button; the query is kept so paging through results does not reset it
+    if st.button("Search Observations"):
+        st.session_state["date_search_query"] = query
+    if st.session_state.get("date_search_query") != query:
+        return
+
+    if mode == "Date range":
+        rows = index.between(*query[1:])
+    elif mode == "Exact date":
+        rows = index.on(*query[1:])
+    else:
+        rows = index.on_calendar_day(*query[2:])
         
-    with col2:
-        months = list(range(1, 13))
-        selected_month = st.selectbox("Month", months)
+    if len(rows):
+        st.success(f"Found {len(rows)} observations {label}.")
+
+        # Only the rows of the current page are taken from the frame
+        pages = paginate(rows, 1, PAGE_SIZE)[1]
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+        results = df.take(paginate(rows, page, PAGE_SIZE)[0])
+            
+        # Display Results Table
+        # Select relevant columns
+        cols_to_show = ['species', 'kingdom', 'countryCode', 'eventDate', 'occurrenceID']
+        # Ensure columns exist
+        cols_to_show = [c for c in cols_to_show if c in results.columns]
         
-    with col3:
-        days = list(range(1, 32))
-        selected_day = st.selectbox("Day", days)
+        display_df = results[cols_to_show].copy()
         
-    # Search Button
-    if st.button("Search Observations"):
-        # Filter Logic
-        # Assuming columns: event_year, event_month, event_day exist and are numeric
-        # If not, we might need to parse eventDate
+        # Make occurrenceID clickable
+        # Streamlit dataframe with column config can handle links
         
-        mask = (df['event_year'] == selected_year) & \
-               (df['event_month'] == selected_month) & \
-               (df['event_day'] == selected_day)
-               
-        results = df[mask]
+        st.dataframe(
+            display_df,
+            column_config={
+                "occurrenceID": st.column_config.LinkColumn(
+                    "Source Link",
+                    help="Click to view observation on source website",
+                    validate="^http",
+                    display_text="View Observation"
+                )
+            },
+            hide_index=True,
+            use_container_width=True
+        )
         
-        if not results.empty:
-            st.success(f"Found {len(results)} observations on {selected_year}-{selected_month}-{selected_day}.")
-            
-            # Display Results Table
-            # Select relevant columns
-            cols_to_show = ['species', 'kingdom', 'countryCode', 'eventDate', 'occurrenceID']
-            # Ensure columns exist
-            cols_to_show = [c for c in cols_to_show if c in results.columns]
-            
-            display_df = results[cols_to_show].copy()
-            
-            # Make occurrenceID clickable
-            # Streamlit dataframe with column config can handle links
-            
-            st.dataframe(
-                display_df,
-                column_config={
-                    "occurrenceID": st.column_config.LinkColumn(
-                        "Source Link",
-                        help="Click to view observation on source website",
-                        validate="^http",
-                        display_text="View Observation"
-                    )
-                },
-                hide_index=True,
-                use_container_width=True
-            )
-            
-        else:
-            st.info(f"No observations found on {selected_year}-{selected_month}-{selected_day}.")
+    else:
+        st.info(f"No observations found {label}.")
@@ -1,8 +1,21 @@
 import streamlit as st
 
 import streamlit as st
+from src.indexes import HierarchyIndex
 
-def sidebar(df):
+# Columns the sidebar options and the filters applied in app.main read
+FILTER_COLUMNS = [
+    'kingdom_grouped', 'phylum', 'countryCode', 'stateProvince', 'event_year',
+    'mediaType', 'decimalLatitude', 'decimalLongitude',
+]
+
+# Columns behind the cascading kingdom -> phylum and country -> state options
+SIDEBAR_HIERARCHY_COLUMNS = ['kingdom_grouped', 'phylum', 'countryCode', 'stateProvince']
+
+def sidebar(df, hierarchy=None):
+    """Render navigation and filters; options come from hierarchy (built from df if None)."""
+    if hierarchy is None:
+        hierarchy = HierarchyIndex(df)
     st.sidebar.title("Biodiversity Dashboard")
     st.sidebar.markdown("## Navigation")
     
@@ -25,25 +38,19 @@ def sidebar(df):
     st.sidebar.markdown("## Filters")
     
     # Kingdom Filter
-    kingdoms = ["All"] + sorted(df['kingdom_grouped'].unique().tolist())
+    kingdoms = ["All"] + hierarchy.options('kingdom_grouped')
     selected_kingdom = st.sidebar.selectbox("Select Kingdom", kingdoms)
 
     # Phylum Filter
-    if selected_kingdom != "All":
-        phyla = ["All"] + sorted(df[df['kingdom_grouped'] == selected_kingdom]['phylum'].unique().tolist())
-    else:
-        phyla = ["All"] + sorted(df['phylum'].unique().tolist())
+    phyla = ["All"] + hierarchy.options('phylum', {'kingdom_grouped': selected_kingdom})
     selected_phylum = st.sidebar.selectbox("Select Phylum", phyla)
 
     # Country Filter
-    countries = ["All"] + sorted(df['countryCode'].unique().tolist())
+    countries = ["All"] + hierarchy.options('countryCode')
     selected_country = st.sidebar.selectbox("Select Country", countries)
 
     # State Filter
-    if selected_country != "All":
-        states = ["All"] + sorted(df[df['countryCode'] == selected_country]['stateProvince'].unique().tolist())
-    else:
-        states = ["All"] + sorted(df['stateProvince'].unique().tolist())
+    states = ["All"] + hierarchy.options('stateProvince', {'countryCode': selected_country})
     selected_state = st.sidebar.selectbox("Select State/Province", states)
     
     # Year Filter
@@ -1,9 +1,20 @@
 import streamlit as st
 import pandas as pd
 from src import visualizations
+from src.indexes import HierarchyIndex
+from src.components.charts import show_plotly, show_pyplot
 from streamlit_folium import st_folium
 
-def display_species_panel(df):
+# Columns read by the panel, see tabs.TAB_COLUMNS
+COLUMNS = [
+    'kingdom_grouped', 'kingdom', 'phylum', 'class', 'order', 'family', 'genus', 'species',
+    'countryCode', 'stateProvince', 'event_year', 'eventDate', 'occurrenceID', 'mediaType',
+    *visualizations.required_columns(
+        visualizations.plot_folium_map, visualizations.plot_plotly_map, visualizations.plot_observations_per_year,
+    ),
+]
+
+def display_species_panel(df, hierarchy=None):
     st.title("Species Insights Panel")
     st.write("Deep dive into specific species.")
     
@@ -11,6 +22,8 @@ def display_species_panel(df):
     if df.empty:
         st.warning("No data available for the current filters.")
         return
+    if hierarchy is None:
+        hierarchy = HierarchyIndex(df)
 
     # Hierarchical Selection to group similar species
     st.markdown("### Select Species")
@@ -18,37 +31,26 @@ def display_species_panel(df):
     
     with col1:
         # Kingdom
-        kingdoms = ["All"] + sorted(df['kingdom_grouped'].unique().tolist())
+        kingdoms = ["All"] + hierarchy.options('kingdom_grouped')
         selected_kingdom = st.selectbox("Kingdom", kingdoms, key="species_kingdom")
         
     with col2:
         # Family (filtered by Kingdom)
-        if selected_kingdom != "All":
-            families = ["All"] + sorted(df[df['kingdom_grouped'] == selected_kingdom]['family'].unique().tolist())
-        else:
-            families = ["All"] + sorted(df['family'].unique().tolist()) if 'family' in df.columns else []
+        families = ["All"] + hierarchy.options('family', {'kingdom_grouped': selected_kingdom}) if 'family' in df.columns else []
         selected_family = st.selectbox("Family", families, key="species_family")
         
     with col3:
         # Genus (filtered by Family)
         if selected_family != "All":
-            genera = ["All"] + sorted(df[df['family'] == selected_family]['genus'].unique().tolist())
-        elif selected_kingdom != "All":
-            genera = ["All"] + sorted(df[df['kingdom_grouped'] == selected_kingdom]['genus'].unique().tolist())
+            genera = ["All"] + hierarchy.options('genus', {'family': selected_family})
         else:
-            genera = ["All"] + sorted(df['genus'].unique().tolist())
+            genera = ["All"] + hierarchy.options('genus', {'kingdom_grouped': selected_kingdom})
         selected_genus = st.selectbox("Genus", genera, key="species_genus")
         
     # Species (filtered by Genus)
-    filtered_df = df.copy()
-    if selected_kingdom != "All":
-        filtered_df = filtered_df[filtered_df['kingdom_grouped'] == selected_kingdom]
-    if selected_family != "All":
-        filtered_df = filtered_df[filtered_df['family'] == selected_family]
-    if selected_genus != "All":
-        filtered_df = filtered_df[filtered_df['genus'] == selected_genus]
-        
-    species_list = sorted(filtered_df['species'].unique().tolist())
+    species_list = hierarchy.options('species', {
+        'kingdom_grouped': selected_kingdom, 'family': selected_family, 'genus': selected_genus,
+    })
     selected_species = st.selectbox("Species", species_list, key="species_selector")
     
     if not selected_species:
@@ -94,17 +96,12 @@ def display_species_panel(df):
         else:
             st.warning("No coordinates available.")
     else:
-        fig = visualizations.plot_plotly_map(species_df)
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-        else:
+        if not show_plotly(visualizations.plot_plotly_map, species_df):
             st.warning("No coordinates available.")
 
     # 4. Timeline
     st.subheader("Observation Timeline")
-    fig_timeline = visualizations.plot_observations_per_year(species_df)
-    if fig_timeline:
-        st.pyplot(fig_timeline)
+    show_pyplot(visualizations.plot_observations_per_year, species_df)
         
     # 5. Image Panel / Observation Links
     st.subheader("Observation Gallery")
@@ -1,10 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+import numpy as np
 import streamlit as st
 from src import metrics
+from src import sampling
 from src import visualizations
-import matplotlib.pyplot as plt
-
-
-def display_overview_tab(df):
+from src.cube import CUBE_COLUMNS
+from src.sketches import relative_error
+from src.indexes import HierarchyIndex
+from src.spatial import SpatialIndex
+from src.components import charts
+
+# Charts render on a pool shared by all sessions; figures are built without
+# pyplot (see visualizations._figure), so they can be drawn side by side
+RENDER_WORKERS = 4
+_RENDER_POOL = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="chart")
+
+
+class ChartJobs:
+    """The charts of one tab, rendered concurrently and placed as each finishes.
+
+    Each pyplot()/plotly()/add() call reserves a placeholder where it is made
+    (e.g. inside a column) and immediately submits the render to the pool.
+    run() then fills the placeholders in completion order, so the tab waits
+    for its slowest chart instead of the sum of all of them. Workers make no
+    Streamlit calls; everything is drawn from the script thread in run().
+    """
+
+    def __init__(self, pool=_RENDER_POOL):
+        self.pool = pool
+        self._jobs = {}
+
+    def add(self, render, place, empty=None, level='info'):
+        """Start render() on the pool; run() calls place(slot, result), or shows empty if it is None."""
+        slot = st.empty()
+        self._jobs[self.pool.submit(render)] = (slot, place, empty, level)
+
+    def pyplot(self, plot, df, fmt='png', empty=None, level='info', **params):
+        self.add(partial(charts.pyplot_image, plot, df, fmt, **params), partial(charts.place_image, fmt=fmt),
+                 empty, level)
+
+    def plotly(self, plot, df, empty=None, level='info', **params):
+        self.add(partial(charts.plotly_json, plot, df, **params), charts.place_plotly, empty, level)
+
+    def run(self):
+        jobs, self._jobs = self._jobs, {}
+        for future in as_completed(jobs):
+            slot, place, empty, level = jobs[future]
+            result = future.result()
+            if result is not None:
+                place(slot, result)
+            elif empty:
+                getattr(slot, level)(empty)
+
+
+def display_overview_tab(df, summary=None):
     st.title("Biodiversity Dashboard Overview")
     
     st.markdown("""
@@ -16,71 +67,87 @@ def display_overview_tab(df):
     
     st.markdown("---")
     st.subheader("Key Metrics")
+    st.checkbox("Exact distinct counts", key="exact_counts",
+                help="Species, genera, families and observers are otherwise estimated from sketches.")
+    if summary is None:
+        summary = metrics.overview_summary(df)
     
     # Row 1
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Observations", f"{len(df):,}")
+        st.metric("Total Observations", f"{summary.observations:,}")
     with col2:
-        st.metric("Total Species", f"{metrics.species_count(df):,}")
+        st.metric("Total Species", f"{summary.species:,}")
     with col3:
-        st.metric("Total Genera", f"{metrics.genera_count(df):,}")
+        st.metric("Total Genera", f"{summary.genera:,}")
     with col4:
-        st.metric("Total Families", f"{metrics.families_count(df):,}")
+        st.metric("Total Families", f"{summary.families:,}")
         
     # Row 2
     col5, col6, col7 = st.columns(3)
     with col5:
-        if 'countryCode' in df.columns:
-            st.metric("Countries Represented", f"{df['countryCode'].nunique():,}")
+        if summary.countries is not None:
+            st.metric("Countries Represented", f"{summary.countries:,}")
     with col6:
-        st.metric("Unique Observers", f"{metrics.observers_count(df):,}")
+        st.metric("Unique Observers", f"{summary.observers:,}")
     with col7:
-        st.metric("Observations with Images", f"{metrics.images_count(df):,}")
+        st.metric("Observations with Images", f"{summary.images:,}")
+
+    if summary.approximate:
+        st.caption(f"Distinct counts are estimates, typically within ±{2 * relative_error():.1%}.")
 
     st.markdown("---")
     st.subheader("Quick Visualizations")
     
+    jobs = ChartJobs()
     c1, c2 = st.columns(2)
     with c1:
         st.write("### Kingdom Distribution")
-        fig = visualizations.plot_kingdom_distribution(df)
-        if fig is not None:
-            st.pyplot(fig)
+        jobs.pyplot(visualizations.plot_kingdom_distribution, df, counts=summary.kingdoms)
             
     with c2:
         st.write("### Top Phyla")
-        fig = visualizations.plot_top_phyla(df)
-        if fig is not None:
-            st.pyplot(fig)
+        jobs.pyplot(visualizations.plot_top_phyla, df, counts=summary.phyla)
+    jobs.run()
+
+
+# Ranks the Taxonomy sunburst can show; it starts at the deepest drill-down
+# selection and spans SUNBURST_DEPTH ranks, so deeper ranks are only counted
+# for the chosen subtree
+TAXONOMY_RANKS = ['kingdom', 'phylum', 'class', 'order', 'family', 'genus', 'species']
+SUNBURST_DEPTH = 4
+
+
+def sunburst_levels(selected, columns):
+    """Ranks drawn by the sunburst for the drill-down selection (rank -> value or "All")."""
+    chosen = [rank for rank in TAXONOMY_RANKS if selected.get(rank, "All") != "All"]
+    start = TAXONOMY_RANKS.index(chosen[-1]) if chosen else 0
+    return [rank for rank in TAXONOMY_RANKS[start:start + SUNBURST_DEPTH] if rank in columns]
 
 
-def display_taxonomy_tab(df):
+def display_taxonomy_tab(df, hierarchy=None):
     st.title("Taxonomy Explorer")
     st.write("Explore the taxonomic hierarchy and distribution of species.")
+    if hierarchy is None:
+        hierarchy = HierarchyIndex(df)
     
     # Drill-down filters specific to this tab
     st.markdown("### Drill-Down Filters")
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        classes = ["All"] + sorted(df['class'].unique().tolist()) if 'class' in df.columns else []
+        classes = ["All"] + hierarchy.options('class') if 'class' in df.columns else []
         selected_class = st.selectbox("Select Class", classes)
     
     with col2:
-        if selected_class != "All":
-            orders = ["All"] + sorted(df[df['class'] == selected_class]['order'].unique().tolist())
-        else:
-            orders = ["All"] + sorted(df['order'].unique().tolist()) if 'order' in df.columns else []
+        orders = ["All"] + hierarchy.options('order', {'class': selected_class}) if 'order' in df.columns else []
         selected_order = st.selectbox("Select Order", orders)
         
     with col3:
         if selected_order != "All":
-            families = ["All"] + sorted(df[df['order'] == selected_order]['family'].unique().tolist())
-        elif selected_class != "All":
-            families = ["All"] + sorted(df[df['class'] == selected_class]['family'].unique().tolist())
+            families = ["All"] + hierarchy.options('family', {'order': selected_order})
         else:
-            families = ["All"] + sorted(df['family'].unique().tolist()) if 'family' in df.columns else []
+            families = ["All"] + hierarchy.options('family', {'class': selected_class}) if 'family' in df.columns else []
         selected_family = st.selectbox("Select Family", families)
 
     # Apply local filters
@@ -96,147 +163,241 @@ def display_taxonomy_tab(df):
     st.markdown("---")
 
     # Visualizations
+    jobs = ChartJobs()
     st.subheader("Taxonomic Hierarchy")
-    st.write("Interactive Sunburst Chart (Click to expand)")
-    fig_sunburst = visualizations.plot_sunburst(filtered_df)
-    if fig_sunburst:
-        st.plotly_chart(fig_sunburst, use_container_width=True)
-    else:
-        st.info("Not enough data for Sunburst chart.")
+    st.write("Interactive Sunburst Chart (Click to zoom; select a class, order or family above to expand "
+             "its deeper ranks). Smaller groups are combined into \"Other\".")
+    selected = {'class': selected_class, 'order': selected_order, 'family': selected_family}
+    levels = sunburst_levels(selected, df.columns)
+    jobs.plotly(visualizations.plot_sunburst, filtered_df, nodes=hierarchy.tree(levels, selected), levels=levels,
+                empty="Not enough data for Sunburst chart.")
 
     st.markdown("---")
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("Top 10 Genera")
-        fig_genera = visualizations.plot_top_genera(filtered_df)
-        if fig_genera:
-            st.pyplot(fig_genera)
+        jobs.pyplot(visualizations.plot_top_genera, filtered_df)
             
     with c2:
         st.subheader("Top 10 Species")
-        fig_species = visualizations.plot_top_species(filtered_df)
-        if fig_species:
-            st.pyplot(fig_species)
+        jobs.pyplot(visualizations.plot_top_species, filtered_df)
             
     st.markdown("---")
     st.subheader("Distribution by Kingdom")
-    fig_pie = visualizations.plot_taxonomy_pie(filtered_df, 'kingdom_grouped')
-    if fig_pie:
-        st.plotly_chart(fig_pie, use_container_width=True)
+    jobs.plotly(visualizations.plot_taxonomy_pie, filtered_df, column='kingdom_grouped')
+    jobs.run()
 
 
-def display_temporal_tab(df):
+def display_temporal_tab(df, cube=None):
     st.title("Temporal Analysis")
     st.write("Analyze temporal trends and seasonal patterns.")
     
+    jobs = ChartJobs()
     st.subheader("Yearly Trends")
     col1, col2 = st.columns(2)
     with col1:
         st.write("### Observations per Year")
-        fig_year = visualizations.plot_observations_per_year(df)
-        if fig_year:
-            st.pyplot(fig_year)
+        counts = None if cube is None else cube.totals('event_year')
+        jobs.pyplot(visualizations.plot_observations_per_year, df, counts=counts)
             
     with col2:
         st.write("### Kingdom Trends Over Time")
-        fig_kingdom = visualizations.plot_kingdom_over_time(df)
-        if fig_kingdom:
-            st.plotly_chart(fig_kingdom, use_container_width=True)
+        counts = None if cube is None else cube.totals(['event_year', 'kingdom_grouped'])
+        jobs.plotly(visualizations.plot_kingdom_over_time, df, counts=counts)
             
     st.markdown("---")
     st.subheader("Seasonal Patterns")
     col3, col4 = st.columns(2)
     with col3:
         st.write("### Observations per Month")
-        fig_month = visualizations.plot_observations_per_month(df)
-        if fig_month:
-            st.pyplot(fig_month)
+        counts = None if cube is None else cube.totals('event_month')
+        jobs.pyplot(visualizations.plot_observations_per_month, df, counts=counts)
             
     with col4:
         st.write("### Month vs Year Heatmap")
-        fig_heatmap = visualizations.plot_month_year_heatmap(df)
-        if fig_heatmap:
-            st.pyplot(fig_heatmap)
+        counts = None if cube is None else cube.totals(['event_month', 'event_year']).unstack('event_year')
+        jobs.pyplot(visualizations.plot_month_year_heatmap, df, counts=counts)
+    jobs.run()
 
 
 from streamlit_folium import st_folium
 
-def display_spatial_tab(df):
+def display_latitude_richness(df, jobs, cached=None, key="richness"):
+    """Band controls and the latitude richness chart, rendered as one of jobs.
+
+    The bands come from cached (see main) when given, so the Spatial and
+    Additional Analysis tabs share one computation per filter and band size.
+    They are computed on the render pool along with the chart.
+    """
+    if df.empty or 'decimalLatitude' not in df.columns or 'species' not in df.columns:
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        band_width = st.select_slider("Band size (degrees)", [1, 2, 5, 10, 15, 30], value=5, key=f"{key}_band")
+    with col2:
+        lon_width = band_width if st.checkbox("Split by longitude bands", key=f"{key}_lon") else None
+
+    def build():
+        return metrics.latitude_richness(df, band_width, lon_width)
+
+    def render():
+        richness = build() if cached is None else cached(('latitude_richness', band_width, lon_width), build)
+        return charts.pyplot_image(visualizations.plot_species_richness, df, richness=richness, band_width=band_width)
+
+    jobs.add(render, charts.place_image)
+
+
+# The map's viewport is widened by this fraction on every side, so its edges
+# are not empty while panning
+VIEWPORT_PADDING = 0.25
+
+
+def _viewport(state):
+    """Padded (south, west, north, east) boxes and zoom reported by st_folium, or None before it reports.
+
+    Leaflet keeps counting longitudes past ±180 once the map is panned
+    across the antimeridian, so they are wrapped back; a view that then
+    straddles it becomes two boxes, one on either side.
+    """
+    bounds = (state or {}).get('bounds') or {}
+    south_west, north_east = bounds.get('_southWest'), bounds.get('_northEast')
+    if not south_west or not north_east or state.get('zoom') is None:
+        return None
+    south, west, north, east = south_west['lat'], south_west['lng'], north_east['lat'], north_east['lng']
+    pad_lat, pad_lon = (north - south) * VIEWPORT_PADDING, (east - west) * VIEWPORT_PADDING
+    south, north = max(south - pad_lat, -90.0), min(north + pad_lat, 90.0)
+    west, east = west - pad_lon, east + pad_lon
+    if east - west >= 360:
+        return [(south, -180.0, north, 180.0)], int(state['zoom'])
+    # West into [-180, 180) and east into (-180, 180], so an unwrapped view stays one box
+    west, east = (west + 180) % 360 - 180, 180 - (180 - east) % 360
+    if west <= east:
+        return [(south, west, north, east)], int(state['zoom'])
+    return [(south, west, north, 180.0), (south, -180.0, north, east)], int(state['zoom'])
+
+
+def display_spatial_map(df, spatial, map_style):
+    """Folium map that reports its bounds and zoom; only the observations around the viewport are sent.
+
+    Points come from the SpatialIndex lookup, and folium_layer picks the
+    level of detail: single observations once few are in view, grid cells
+    otherwise. The base map stays the same across reruns, so panning and
+    zooming only swap the observation layer.
+    """
+    base = visualizations.folium_base_map(df)
+    if base is None:
+        st.warning("No valid coordinates found for the current selection.")
+        return
+    view = _viewport(st.session_state.get("spatial_map"))
+    if view is None:
+        in_view, zoom = df, 2
+    else:
+        boxes, zoom = view
+        in_view = df.take(np.unique(np.concatenate([spatial.within(*box) for box in boxes])))
+    st.caption(f"{len(in_view):,} observations in and around the current view")
+    st_folium(base, key="spatial_map", width=None, height=500,
+              feature_group_to_add=visualizations.folium_layer(in_view, map_style, zoom),
+              returned_objects=["bounds", "zoom"])
+
+
+def display_map_sample(df, cached=None):
+    """Stratified sample of the observations with coordinates, small enough for the scatter map.
+
+    The sample is seeded and shared per filter through cached, so reruns draw
+    the same points and hit the figure cache.
+    """
+    located = df.dropna(subset=['decimalLatitude', 'decimalLongitude'])
+
+    def build():
+        return sampling.stratified_sample(located, visualizations.SCATTER_MAX_POINTS)
+
+    budget = visualizations.SCATTER_MAX_POINTS
+    if cached is None:
+        rows, n_strata = build(), sampling.stratum_count(located)
+    else:
+        rows = cached(('map_sample', budget), build)
+        n_strata = cached(('map_strata',), lambda: sampling.stratum_count(located))
+    if len(rows) == len(located):
+        st.caption(f"Showing all {len(rows):,} observations.")
+    elif n_strata <= budget:
+        st.caption(f"Showing {len(rows):,} of {len(located):,} observations, "
+                   "with every species and country combination represented.")
+    else:
+        st.caption(f"Showing {len(rows):,} of {len(located):,} observations: one from each of {len(rows):,} "
+                   f"of the {n_strata:,} species and country combinations, which exceed the point budget.")
+    return located.take(rows)
+
+
+def display_spatial_tab(df, spatial=None, cached=None):
     st.title("Geographic Mapping")
     st.write("Explore the spatial distribution of observations.")
     
     # Map Type Selection
+    jobs = ChartJobs()
     map_provider = st.radio("Select Map Provider", ["Folium (Interactive)", "Plotly (Global View)"], horizontal=True)
     
     if map_provider == "Folium (Interactive)":
         map_style = st.selectbox("Select Map Style", ["Cluster", "Heatmap", "Markers"])
-        st.write(f"Displaying {map_style} Map. (Note: Markers are capped for performance)")
-        
-        folium_map = visualizations.plot_folium_map(df, map_type=map_style)
-        if folium_map:
-            st_folium(folium_map, width=None, height=500, returned_objects=[])
-        else:
-            st.warning("No valid coordinates found for the current selection.")
+        st.write(f"Displaying {map_style} Map. (Cluster and Markers group observations into grid cells "
+                 "until you zoom in far enough to see each one; click a marker for details)")
+        display_spatial_map(df, SpatialIndex(df) if spatial is None else spatial, map_style)
             
     else:
         st.write("Displaying Global Scatter Map.")
-        plotly_map = visualizations.plot_plotly_map(df)
-        if plotly_map:
-            st.plotly_chart(plotly_map, use_container_width=True)
-        else:
-            st.warning("No valid coordinates found for the current selection.")
+        map_df, log_scale = df, True
+        if df['decimalLatitude'].count() > visualizations.SCATTER_MAX_POINTS:
+            large = st.radio("Show large selections as", ["Density image", "Stratified sample"], horizontal=True,
+                             key="spatial_large_mode",
+                             help="The density image draws every observation; the sample keeps "
+                                  "at least one point per species and country.")
+            if large == "Stratified sample":
+                map_df = display_map_sample(df, cached)
+            else:
+                log_scale = st.checkbox("Log density scale", value=True, key="spatial_log_scale")
+        jobs.plotly(visualizations.plot_plotly_map, map_df, log_scale=log_scale,
+                    empty="No valid coordinates found for the current selection.", level='warning')
 
     st.markdown("---")
     st.subheader("Species Richness by Latitude")
-    fig_lat = visualizations.plot_species_richness(df)
-    if fig_lat:
-        st.pyplot(fig_lat)
+    display_latitude_richness(df, jobs, cached, key="spatial_richness")
+    jobs.run()
 
 
-def display_distribution_tab(df):
+def display_distribution_tab(df, cube=None):
     st.title("Distribution Metrics")
     st.write("This tab displays distribution metrics by country and state.")
-    fig = visualizations.plot_top_countries(df)
-    if fig is not None:
-        st.pyplot(fig)
-    fig = visualizations.plot_top_states(df)
-    if fig is not None:
-        st.pyplot(fig)
+    jobs = ChartJobs()
+    jobs.pyplot(visualizations.plot_top_countries, df, counts=None if cube is None else cube.top('countryCode', 15))
+    jobs.pyplot(visualizations.plot_top_states, df, counts=None if cube is None else cube.top('stateProvince', 15))
+    jobs.run()
 
 
-def display_analysis_tab(df):
+def display_analysis_tab(df, country_richness=None, cached=None):
     st.title("Advanced Analysis")
     st.write("Deep dive into correlations and biodiversity patterns.")
     
+    jobs = ChartJobs()
     st.subheader("Correlation Matrix")
-    fig_corr = visualizations.plot_correlation_heatmap(df)
-    if fig_corr:
-        st.pyplot(fig_corr)
-    else:
-        st.info("Not enough numerical data for correlation analysis.")
+    jobs.pyplot(visualizations.plot_correlation_heatmap, df, empty="Not enough numerical data for correlation analysis.")
         
     st.markdown("---")
     st.subheader("Biodiversity Patterns")
     
     st.write("### Species Richness vs Latitude")
-    fig_lat = visualizations.plot_species_richness(df)
-    if fig_lat:
-        st.pyplot(fig_lat)
+    display_latitude_richness(df, jobs, cached, key="analysis_richness")
         
     st.markdown("---")
     st.subheader("Regional Richness")
     col1, col2 = st.columns(2)
     with col1:
         st.write("### Species Richness by Country")
-        fig_country = visualizations.plot_country_richness(df)
-        if fig_country:
-            st.pyplot(fig_country)
+        st.checkbox("Exact distinct counts", key="exact_counts")
+        jobs.pyplot(visualizations.plot_country_richness, df, richness=country_richness)
             
     with col2:
         st.write("### Species Richness by State")
-        fig_state = visualizations.plot_state_richness(df)
-        if fig_state:
-            st.pyplot(fig_state)
+        jobs.pyplot(visualizations.plot_state_richness, df)
+    jobs.run()
 
 
 
@@ -249,7 +410,7 @@ def display_yearly_observations_tab(df):
         return
 
     # Group by year and count
-    yearly_counts = df['event_year'].value_counts().sort_index().reset_index()
+    yearly_counts = metrics.value_counts(df['event_year']).sort_index().reset_index()
     yearly_counts.columns = ['Year', 'Observations']
     
     # Ensure Year is integer for display
@@ -281,7 +442,81 @@ def display_raw_data_tab(df):
 from src.components import species_panel
 from src.components import date_search
 
-def main(selected, df):
+# Pages that take an index of the filtered frame, and how to build it
+TAB_INDEXES = {
+    "Taxonomy": HierarchyIndex,
+    "Species Insights": HierarchyIndex,
+}
+
+# Pages drawn from the dataset's CountCube, restricted to the sidebar filters
+CUBE_TABS = ["Temporal Analysis", "Distribution"]
+
+# Pages that take the dataset's SpatialIndex, restricted to the filtered rows
+SPATIAL_TABS = ["Spatial Analysis"]
+
+# Pages that take the dataset's DateIndex, restricted to the filtered rows
+DATE_TABS = ["Date Search"]
+
+
+def overview_summary(df, sketches=None, filters=None):
+    """OverviewSummary; distinct totals come from sketches when given and the filters allow."""
+    return metrics.overview_summary(df, None if sketches is None else sketches.distinct(filters))
+
+
+def country_richness(df, sketches=None, filters=None):
+    """Estimated species per country from sketches, or None to count the rows exactly."""
+    return None if sketches is None else sketches.distinct_by('species', 'countryCode', filters)
+
+
+# Pages showing distinct counts, and how to build their input from the dataset's
+# DistinctSketches (None when the user asks for exact counts)
+SKETCH_TABS = {
+    "Overview": overview_summary,
+    "Additional Analysis": country_richness,
+}
+
+# Columns each page reads on top of the sidebar filter columns; None loads everything
+TAB_COLUMNS = {
+    "Overview": [
+        'species', 'genus', 'family', 'countryCode', 'recordedBy', 'mediaType',
+        *visualizations.required_columns(visualizations.plot_kingdom_distribution, visualizations.plot_top_phyla),
+    ],
+    "Taxonomy": [
+        'class', 'order', 'family',
+        *visualizations.required_columns(
+            visualizations.plot_sunburst, visualizations.plot_top_genera,
+            visualizations.plot_top_species, visualizations.plot_taxonomy_pie,
+        ),
+    ],
+    "Temporal Analysis": CUBE_COLUMNS,
+    "Spatial Analysis": visualizations.required_columns(
+        visualizations.plot_folium_map, visualizations.plot_plotly_map, visualizations.plot_species_richness,
+    ),
+    "Species Insights": species_panel.COLUMNS,
+    "Distribution": CUBE_COLUMNS,
+    "Additional Analysis": visualizations.required_columns(
+        visualizations.plot_correlation_heatmap, visualizations.plot_species_richness,
+        visualizations.plot_country_richness, visualizations.plot_state_richness,
+    ),
+    "Observations by Year": ['event_year'],
+    "Date Search": date_search.COLUMNS,
+    "Raw Data": None,
+}
+
+def columns_for(selected):
+    """Columns the selected page reads, or None when it shows every column."""
+    return TAB_COLUMNS.get(selected, TAB_COLUMNS["Overview"])
+
+# Pages that share per-filter results through main's cached argument
+CACHED_TABS = ["Spatial Analysis", "Additional Analysis"]
+
+def main(selected, df, index=None, cached=None):
+    """Render the selected page.
+
+    index is the page's input built by app.main (see TAB_INDEXES, CUBE_TABS,
+    SKETCH_TABS, SPATIAL_TABS and DATE_TABS); cached(key, build) returns
+    build() memoized for the current filters.
+    """
     tabs = {
         "Overview": display_overview_tab,
         "Taxonomy": display_taxonomy_tab,
@@ -299,7 +534,12 @@ def main(selected, df):
     if selected not in tabs:
         selected = "Overview"
 
-    tabs[selected](df)
+    kwargs = {'cached': cached} if selected in CACHED_TABS else {}
+    if (selected in TAB_INDEXES or selected in CUBE_TABS or selected in SKETCH_TABS or selected in SPATIAL_TABS
+            or selected in DATE_TABS):
+        tabs[selected](df, index, **kwargs)
+    else:
+        tabs[selected](df, **kwargs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+from src.indexes import VALUE_FILTERS
+
+# Dimensions of the cube; has_image and has_coords are derived flags
+CUBE_DIMS = [
+    'event_year', 'event_month', 'kingdom_grouped', 'phylum', 'countryCode', 'stateProvince',
+    'has_image', 'has_coords',
+]
+
+# Columns CountCube is built from
+CUBE_COLUMNS = [
+    'event_year', 'event_month', 'kingdom_grouped', 'phylum', 'countryCode', 'stateProvince',
+    'mediaType', 'decimalLatitude', 'decimalLongitude',
+]
+
+
+def _dimension(series):
+    """Codes (-1 for missing) and labels of one cube dimension; numbers get sorted labels."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int32), pd.Index(series.cat.categories)
+    if pd.api.types.is_numeric_dtype(series):
+        series = pd.to_numeric(series).astype('Int64')
+    codes, labels = pd.factorize(series, sort=True)
+    return codes.astype(np.int32), pd.Index(labels)
+
+
+class CountCube:
+    """Sparse observation counts over CUBE_DIMS.
+
+    Only non-empty cells are stored: one code array per dimension plus a
+    count array, i.e. a coordinate-format sparse cube. where() restricts it
+    to the sidebar filters and totals() sums it over the requested
+    dimensions, so charts of counts never touch the observation rows.
+    """
+
+    def __init__(self, df=None, codes=None, labels=None, counts=None):
+        if df is None:
+            self.codes, self.labels, self.counts = codes, labels, counts
+            return
+
+        codes, self.labels = {}, {}
+        for dim in CUBE_DIMS[:6]:
+            codes[dim], self.labels[dim] = _dimension(df[dim])
+        media_codes, media_labels = _dimension(df['mediaType'])
+        has_image = np.append(np.asarray(media_labels.astype(str).str.contains('StillImage'), dtype=bool), False)
+        codes['has_image'] = has_image[media_codes].astype(np.int32)
+        codes['has_coords'] = (df['decimalLatitude'].notna() & df['decimalLongitude'].notna()).to_numpy(np.int32)
+        self.labels['has_image'] = self.labels['has_coords'] = pd.Index([False, True])
+
+        # Shift codes so missing is 0, then fold every row into one mixed-radix cell key
+        sizes = [len(self.labels[dim]) + 1 for dim in CUBE_DIMS]
+        shifted = [codes[dim] + 1 for dim in CUBE_DIMS]
+        if np.prod(sizes, dtype=float) < 2**62:
+            keys, counts = np.unique(np.ravel_multi_index(shifted, sizes), return_counts=True)
+            cells = np.unravel_index(keys, sizes)
+        else:
+            cells, counts = np.unique(np.stack(shifted), axis=1, return_counts=True)
+        self.codes = {dim: (cell - 1).astype(np.int32) for dim, cell in zip(CUBE_DIMS, cells)}
+        self.counts = counts.astype(np.int64)
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Cube from a cells() frame, e.g. counts kept up to date elsewhere (see OccurrenceStore)."""
+        codes, labels = {}, {}
+        for dim in CUBE_DIMS[:6]:
+            codes[dim], labels[dim] = _dimension(cells[dim])
+        for flag in ('has_image', 'has_coords'):
+            codes[flag] = cells[flag].to_numpy(dtype=np.int32)
+            labels[flag] = pd.Index([False, True])
+        return cls(codes=codes, labels=labels, counts=cells['count'].to_numpy(dtype=np.int64))
+
+    def cells(self):
+        """The non-empty cells as a frame: one label column per dimension (missing as NA) and count."""
+        cells = {dim: self.labels[dim].take(self.codes[dim], allow_fill=True, fill_value=np.nan)
+                 for dim in CUBE_DIMS[:6]}
+        cells.update({flag: self.codes[flag].astype(bool) for flag in ('has_image', 'has_coords')})
+        return pd.DataFrame({**cells, 'count': self.counts})
+
+    def __len__(self):
+        return len(self.counts)
+
+    @property
+    def nbytes(self):
+        return int(self.counts.nbytes + sum(codes.nbytes for codes in self.codes.values()))
+
+    def _mask(self, dim, value):
+        code = self.labels[dim].get_indexer([value])[0]
+        return self.codes[dim] == code if code >= 0 else np.zeros(len(self), dtype=bool)
+
+    def where(self, filters):
+        """Cube of the cells matching the sidebar filters (see app.main)."""
+        mask = np.ones(len(self), dtype=bool)
+        for key, dim in VALUE_FILTERS.items():
+            if filters.get(key, "All") != "All":
+                mask &= self._mask(dim, filters[key])
+        if filters.get('year_range'):
+            first, last = filters['year_range']
+            years = self.labels['event_year'].to_numpy(dtype=float, na_value=np.nan)
+            in_range = np.append((years >= first) & (years <= last), False)
+            mask &= in_range[self.codes['event_year']]
+        if filters.get('has_image'):
+            mask &= self.codes['has_image'] == 1
+        if filters.get('valid_coords'):
+            mask &= self.codes['has_coords'] == 1
+        return CountCube(codes={dim: codes[mask] for dim, codes in self.codes.items()},
+                         labels=self.labels, counts=self.counts[mask])
+
+    def total(self):
+        return int(self.counts.sum())
+
+    def totals(self, by):
+        """Observation counts grouped by the dimensions in by; cells missing any of them are left out.
+
+        Returns a Series indexed by label (a MultiIndex for several dimensions),
+        in label order.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        codes = [self.codes[dim] for dim in by]
+        valid = np.logical_and.reduce([c >= 0 for c in codes])
+        sizes = [len(self.labels[dim]) for dim in by]
+        keys = np.ravel_multi_index([c[valid] for c in codes], sizes)
+        keys, inverse = np.unique(keys, return_inverse=True)
+        sums = np.bincount(inverse, weights=self.counts[valid], minlength=len(keys)).astype(np.int64)
+
+        cells = np.unravel_index(keys, sizes)
+        levels = [self.labels[dim].take(cell) for dim, cell in zip(by, cells)]
+        index = levels[0].rename(by[0]) if len(by) == 1 else pd.MultiIndex.from_arrays(levels, names=by)
+        return pd.Series(sums, index=index, name='count')
+
+    def top(self, dim, n):
+        """The n labels of dim with the most observations, largest first."""
+        return self.totals(dim).sort_values(ascending=False, kind='stable').head(n)
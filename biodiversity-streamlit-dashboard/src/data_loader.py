@@ -1,43 +1,568 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import warnings
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-@st.cache_data
-def load_data(file_path):
-    """Load the biodiversity dataset from a CSV file."""
-    # Read and perform cleaning to provide a ready-to-use DataFrame
-    # Use low_memory=False to avoid mixed type warnings on large files if needed, 
-    # or specify dtypes. For now, we'll stick to default.
-    df = pd.read_csv(file_path)
+from src import preprocessing
+from src.cache import ResultCache
+from src.preprocessing import filter_coordinates, read_dwca
+
+# Bump whenever the cleaning steps or the stored column layout change so that
+# snapshots written by an older version are rebuilt instead of reused.
+SNAPSHOT_VERSION = 3
+
+# Rows per chunk when streaming exports that are too large to parse at once,
+# and the source size above which snapshots are built through streaming.
+STREAM_CHUNKSIZE = 500_000
+STREAM_THRESHOLD_BYTES = 1 << 30
+
+# Declared dtypes for the flattened GBIF occurrence export. Low-cardinality
+# text is loaded as categoricals, coordinates as float32 and date parts as
+# small nullable ints; free text stays plain strings. Columns missing from a
+# file are ignored and unknown extra columns fall back to inference.
+CATEGORICAL_COLUMNS = [
+    'datasetKey', 'kingdom', 'phylum', 'class', 'order', 'family', 'genus',
+    'species', 'taxonRank', 'countryCode', 'stateProvince', 'occurrenceStatus',
+    'publishingOrgKey', 'basisOfRecord', 'institutionCode', 'collectionCode',
+    'license', 'mediaType', 'issue', 'event_day_of_week', 'event_season',
+    'kingdom_grouped',
+]
+
+GBIF_SCHEMA = {
+    **{col: 'category' for col in CATEGORICAL_COLUMNS},
+    'gbifID': 'int64',
+    'occurrenceID': 'str',
+    'scientificName': 'str',
+    'verbatimScientificName': 'str',
+    'decimalLatitude': 'float32',
+    'decimalLongitude': 'float32',
+    'coordinateUncertaintyInMeters': 'float32',
+    'eventDate': 'str',
+    'day': 'Int8',
+    'month': 'Int8',
+    'year': 'Int16',
+    'taxonKey': 'Int32',
+    'speciesKey': 'Int32',
+    'catalogNumber': 'str',
+    'identifiedBy': 'str',
+    'dateIdentified': 'str',
+    'rightsHolder': 'str',
+    'recordedBy': 'str',
+    'lastInterpreted': 'str',
+    'event_year': 'Int16',
+    'event_month': 'Int8',
+    'event_day': 'Int8',
+}
+
+
+def _csv_engine():
+    """Use the multithreaded pyarrow parser when it is installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'c'
+    return 'pyarrow'
+
+
+def detect_separator(file_path):
+    """GBIF downloads are tab-separated even when named .csv; check the header."""
+    with open(file_path, encoding='utf-8', errors='replace') as f:
+        header = f.readline()
+    return '\t' if header.count('\t') > header.count(',') else ','
+
+
+def read_csv_typed(file_path, **kwargs):
+    """Read a GBIF CSV export with the declared schema."""
+    kwargs.setdefault('sep', detect_separator(file_path))
+    return pd.read_csv(file_path, dtype=GBIF_SCHEMA, engine=_csv_engine(), **kwargs)
+
+
+def memory_report(file_path):
+    """Compare per-column memory of default read_csv inference with the declared schema."""
+    inferred = pd.read_csv(file_path, low_memory=False)
+    typed = read_csv_typed(file_path)
+    report = pd.DataFrame({
+        'inferred_bytes': inferred.memory_usage(deep=True, index=False),
+        'typed_bytes': typed.memory_usage(deep=True, index=False),
+    })
+    report.loc['Total'] = report.sum()
+    report['ratio'] = (report['inferred_bytes'] / report['typed_bytes']).round(2)
+    return report
+
+
+def snapshot_path(file_path):
+    """Return the path of the columnar snapshot kept next to a source CSV."""
+    return Path(file_path).with_suffix(".parquet")
+
+
+def _snapshot_meta_path(snapshot):
+    return snapshot.with_name(snapshot.name + ".json")
+
+
+def _content_hash(file_path, block_size=1 << 20):
+    """Hash the raw bytes of the source file in fixed-size blocks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_fingerprint(file_path):
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def snapshot_is_fresh(file_path):
+    """Check whether the snapshot still matches the source file.
+
+    Size and mtime are compared first. If only the mtime moved (e.g. the file
+    was copied or touched) the content hash decides, and a matching hash
+    refreshes the stored mtime so the next check is cheap again.
+    """
+    fingerprint = _source_fingerprint(file_path)
+    snapshot = snapshot_path(file_path)
+    meta_path = _snapshot_meta_path(snapshot)
+    if not snapshot.exists() or not meta_path.exists():
+        return False
+
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return False
+
+    if meta.get("version") != SNAPSHOT_VERSION or meta.get("size") != fingerprint["size"]:
+        return False
+    if meta.get("mtime_ns") == fingerprint["mtime_ns"]:
+        return True
+    if meta.get("sha") != _content_hash(file_path):
+        return False
+
+    meta["mtime_ns"] = fingerprint["mtime_ns"]
+    try:
+        meta_path.write_text(json.dumps(meta))
+    except OSError:
+        pass
+    return True
+
+
+def _write_snapshot(file_path, write):
+    """Write a snapshot through write(path) and record the source fingerprint.
+
+    The data file is written first and the metadata last, both through a
+    temporary file, so an interrupted write never leaves a snapshot that
+    looks valid. Failures only cost the speed-up and are reported as warnings.
+    """
+    snapshot = snapshot_path(file_path)
+    meta_path = _snapshot_meta_path(snapshot)
+    meta = dict(_source_fingerprint(file_path), version=SNAPSHOT_VERSION, sha=_content_hash(file_path))
+
+    tmp_snapshot = snapshot.with_name(snapshot.name + ".tmp")
+    tmp_meta = meta_path.with_name(meta_path.name + ".tmp")
+    try:
+        write(tmp_snapshot)
+        os.replace(tmp_snapshot, snapshot)
+        tmp_meta.write_text(json.dumps(meta))
+        os.replace(tmp_meta, meta_path)
+    except (ImportError, OSError, ValueError, TypeError) as e:
+        warnings.warn(f"Could not write snapshot {snapshot}: {e}")
+        for path in (tmp_snapshot, tmp_meta):
+            if path.exists():
+                path.unlink()
+        return None
+    return snapshot
+
+
+def write_snapshot(df, file_path):
+    """Write the cleaned frame as Parquet next to the source CSV."""
+    return _write_snapshot(file_path, lambda path: df.to_parquet(path, index=False))
+
+
+def stream_snapshot(file_path, chunksize=STREAM_CHUNKSIZE):
+    """Build the snapshot chunk by chunk, for sources too large to parse at once."""
+    return _write_snapshot(
+        file_path,
+        lambda path: stream_csv_to_parquet(file_path, path, chunksize=chunksize, drop_invalid_coords=False),
+    )
+
+
+def refresh_snapshot(file_path):
+    """Rewrite the snapshot of a CSV or DwC-A zip without returning the frame.
+
+    Archives and exports above STREAM_THRESHOLD_BYTES are streamed as in
+    read_dataset. Returns the snapshot path, or None if it could not be written.
+    """
+    if zipfile.is_zipfile(file_path) or os.path.getsize(file_path) > STREAM_THRESHOLD_BYTES:
+        return stream_snapshot(file_path)
+    return write_snapshot(clean_data(read_csv_typed(file_path)), file_path)
+
+
+class SeenIds:
+    """Compact set of int64 ids stored as sorted numpy runs.
+
+    A new run absorbs every older run that is not larger than it, like a
+    binary counter, so there are O(log n) runs and a membership test is one
+    searchsorted per run. Memory is 8 bytes per distinct id.
+    """
+
+    def __init__(self):
+        self._runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    def contains(self, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        found = np.zeros(len(ids), dtype=bool)
+        for run in self._runs:
+            pos = np.minimum(np.searchsorted(run, ids), len(run) - 1)
+            found |= run[pos] == ids
+        return found
+
+    def add(self, ids):
+        run = np.unique(np.asarray(ids, dtype=np.int64))
+        if not len(run):
+            return
+        while self._runs and len(self._runs[-1]) <= len(run):
+            run = np.union1d(self._runs.pop(), run)
+        self._runs.append(run)
+
+    def add_new(self, ids):
+        """Record ids and return a mask of the ones not seen before."""
+        ids = np.asarray(ids, dtype=np.int64)
+        new = ~self.contains(ids)
+        self.add(ids[new])
+        return new
+
+
+def storage_schema(table):
+    """Arrow schema shared by every chunk or part written to Parquet.
+
+    Each chunk has its own categories, so dictionary indices are widened to
+    int32 and columns that were empty in the first chunk are typed as strings.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for field in table.schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), pa.large_string()))
+        elif pa.types.is_null(field.type) or pa.types.is_string(field.type):
+            field = field.with_type(pa.large_string())
+        elif pa.types.is_timestamp(field.type):
+            field = field.with_type(pa.timestamp('us', tz=field.type.tz))
+        fields.append(field)
+    return pa.schema(fields, metadata=table.schema.metadata)
+
+
+def iter_clean_chunks(file_path, chunksize=STREAM_CHUNKSIZE, drop_invalid_coords=True, stats=None,
+                      drop_duplicates=True):
+    """Yield cleaned chunks of a CSV export or DwC-A zip without loading it whole.
+
+    Chunks of chunksize rows go through clean_data and, optionally, the
+    coordinate filters from preprocessing. With drop_duplicates the first
+    row of each gbifID wins, across chunks too (tracked with SeenIds);
+    without it every row is yielded, for callers that pick among
+    duplicates themselves. Ingestion counts are accumulated into stats.
+    """
+    if stats is None:
+        stats = {}
+    for key in ('rows_read', 'duplicates', 'invalid_coords'):
+        stats.setdefault(key, 0)
+
+    if zipfile.is_zipfile(file_path):
+        # Darwin Core Archive: stream the schema columns out of the zip
+        chunks = read_dwca(file_path, columns=list(GBIF_SCHEMA), dtype=GBIF_SCHEMA, chunksize=chunksize)
+    else:
+        sep = detect_separator(file_path)
+        columns = pd.read_csv(file_path, sep=sep, nrows=0).columns
+        dtype = {col: GBIF_SCHEMA.get(col, 'str') for col in columns}
+        chunks = pd.read_csv(file_path, sep=sep, dtype=dtype, chunksize=chunksize)
+
+    seen = SeenIds()
+    for chunk in chunks:
+        stats['rows_read'] += len(chunk)
+        n_rows = len(chunk)
+        chunk = clean_data(chunk, drop_duplicates)
+        if drop_duplicates and 'gbifID' in chunk.columns:
+            chunk = chunk[seen.add_new(chunk['gbifID'].to_numpy())]
+        stats['duplicates'] += n_rows - len(chunk)
+
+        if drop_invalid_coords:
+            n_rows = len(chunk)
+            chunk = filter_coordinates(chunk)
+            stats['invalid_coords'] += n_rows - len(chunk)
+        yield chunk
+
+
+def stream_csv_to_parquet(file_path, out_path, chunksize=STREAM_CHUNKSIZE, drop_invalid_coords=True):
+    """Clean a CSV export or DwC-A zip into a Parquet file without loading it whole.
+
+    Each chunk from iter_clean_chunks is appended as a row group, so peak
+    memory is one chunk plus the seen-id set. Returns ingestion counts.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    stats = {'rows_read': 0, 'rows_written': 0, 'duplicates': 0, 'invalid_coords': 0}
+    writer = None
+    try:
+        for chunk in iter_clean_chunks(file_path, chunksize, drop_invalid_coords, stats):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = storage_schema(table)
+                writer = pq.ParquetWriter(out_path, schema)
+            writer.write_table(table.cast(schema))
+            stats['rows_written'] += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        # Header-only export: still leave a readable, empty store behind
+        empty = pd.DataFrame() if zipfile.is_zipfile(file_path) else clean_data(read_csv_typed(file_path))
+        empty.to_parquet(out_path, index=False)
+    return stats
+
+
+# File patterns picked up when a directory of export partitions is loaded
+PARTITION_PATTERNS = ('*.csv', '*.txt', '*.tsv')
+
+
+def _is_store(file_path):
+    from src.store import OccurrenceStore
+    return OccurrenceStore.is_store(file_path)
+
+
+def partition_paths(file_path):
+    """Files of a partitioned export given as a glob or directory, else None.
+
+    Directories holding an occurrence store are not partitioned exports.
+    """
+    path = str(file_path)
+    if any(ch in path for ch in '*?['):
+        paths = sorted(glob.glob(path))
+    elif Path(path).is_dir() and not _is_store(path):
+        paths = sorted(str(p) for pattern in PARTITION_PATTERNS for p in Path(path).glob(pattern))
+    else:
+        return None
+    if not paths:
+        raise FileNotFoundError(f"No export partitions match {path}")
+    return paths
+
+
+def _init_partition_worker():
+    # Every process parses its own partition, so keep pyarrow to one thread each
+    try:
+        import pyarrow
+        pyarrow.set_cpu_count(1)
+    except ImportError:
+        pass
+
+
+def _clean_partition(file_path, out_path):
+    df = clean_data(read_csv_typed(file_path))
+    df.to_parquet(out_path, index=False)
+    return len(df)
+
+
+def read_partitions(paths, max_workers=None):
+    """Parse and clean export partitions in a process pool and merge them.
+
+    Each worker writes its cleaned partition to a temporary Parquet file;
+    the parent concatenates them with Arrow, which unifies the per-partition
+    category dictionaries, then drops gbifIDs already seen in an earlier
+    partition (partitions are taken in sorted path order).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    with tempfile.TemporaryDirectory() as tmp:
+        out_paths = [os.path.join(tmp, f"part-{i:05d}.parquet") for i in range(len(paths))]
+        # spawn, not fork: the Streamlit server process is multithreaded
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers, mp_context=context, initializer=_init_partition_worker) as pool:
+            list(pool.map(_clean_partition, paths, out_paths))
+
+        tables = []
+        for out_path in out_paths:
+            table = pq.read_table(out_path)
+            tables.append(table.cast(storage_schema(table)))
+        df = pa.concat_tables(tables, promote_options='default').to_pandas()
+
+    if 'gbifID' in df.columns:
+        df = df[~df['gbifID'].duplicated()].reset_index(drop=True)
+    return df
+
+
+def source_version(file_path):
+    """Value that changes whenever the data behind file_path changes.
+
+    Passed to load_data so Streamlit's cache is invalidated when a CSV is
+    replaced, a partition changes or a new export is ingested into an
+    occurrence store.
+    """
+    if Path(file_path).is_dir() and _is_store(file_path):
+        from src.store import OccurrenceStore
+        return OccurrenceStore(file_path).generation
+    paths = partition_paths(file_path) or [file_path]
+    return tuple((str(path),) + tuple(_source_fingerprint(path).values()) for path in paths)
+
+
+def read_dataset(file_path, use_snapshot=True):
+    """Read and clean the dataset, going through the Parquet snapshot when possible.
+
+    file_path may also be an occurrence store directory (see src/store.py),
+    whose parts are already cleaned, or a directory or glob of export
+    partitions, which are cleaned in parallel by read_partitions.
+    """
+    if Path(file_path).is_dir() and _is_store(file_path):
+        from src.store import OccurrenceStore
+        return OccurrenceStore(file_path).read()
+
+    paths = partition_paths(file_path)
+    if paths is not None:
+        return read_partitions(paths)
+
+    if use_snapshot and snapshot_is_fresh(file_path):
+        try:
+            return pd.read_parquet(snapshot_path(file_path))
+        except (ImportError, OSError, ValueError) as e:
+            warnings.warn(f"Ignoring unreadable snapshot for {file_path}: {e}")
+
+    is_archive = zipfile.is_zipfile(file_path)
+    if use_snapshot and (is_archive or os.path.getsize(file_path) > STREAM_THRESHOLD_BYTES):
+        # Archives and very large exports: stream into the snapshot, then read it back typed
+        if stream_snapshot(file_path) is not None:
+            return pd.read_parquet(snapshot_path(file_path))
+
+    if is_archive:
+        with tempfile.TemporaryDirectory() as tmp:
+            out_path = os.path.join(tmp, "archive.parquet")
+            stream_csv_to_parquet(file_path, out_path, drop_invalid_coords=False)
+            return pd.read_parquet(out_path)
+
+    df = read_csv_typed(file_path)
     # Apply basic cleaning to taxonomy and location fields
     df = clean_data(df)
+    if use_snapshot:
+        write_snapshot(df, file_path)
     return df
 
-def clean_data(df):
-    """Clean the dataset by handling missing values and duplicates."""
-    # Fill missing values
-    taxonomy_cols = ['phylum', 'class', 'order', 'family', 'genus', 'species']
-    for col in taxonomy_cols:
-        if col in df.columns:
-            df[col] = df[col].fillna("Unknown")
-            df[col] = df[col].str.capitalize()
-    
-    if 'countryCode' in df.columns:
-        df['countryCode'] = df['countryCode'].fillna("Unknown")
-    
-    if 'stateProvince' in df.columns:
-        df['stateProvince'] = df['stateProvince'].fillna("Unknown").replace("", "Unknown")
-    
-    # Drop duplicates
-    if 'gbifID' in df.columns:
-        df.drop_duplicates(subset=['gbifID'], inplace=True)
-    
-    # Convert eventDate to datetime if present
-    if 'eventDate' in df.columns:
-        df['eventDate'] = pd.to_datetime(df['eventDate'], errors='coerce')
 
-    return df
+@st.cache_data
+def load_data(file_path, version=None):
+    """Load the biodiversity dataset from a CSV file or occurrence store."""
+    return read_dataset(file_path)
+
+class LazyDataset:
+    """Cleaned dataset whose columns are read the first time someone asks for them.
+
+    read_columns(columns) must return those columns for every row, in the
+    same row order each call (true for a Parquet snapshot or store). Loaded
+    columns are kept, so a session that only opens the Overview tab never
+    pays for long text columns such as issue or rightsHolder. stored maps a
+    build function to a loader of a result the source already maintains
+    (the store's CountCube), which derived() returns instead of building it.
+    """
+
+    def __init__(self, read_columns, columns, stored=None):
+        self._read_columns = read_columns
+        self.columns = list(columns)
+        self._stored = stored or {}
+        self._frame = None
+        self._derived = {}
+        self._lock = threading.RLock()
+        # Per-filter results shared by every session using this dataset
+        self.results = ResultCache()
+
+    @property
+    def loaded_columns(self):
+        return [] if self._frame is None else list(self._frame.columns)
+
+    def frame(self, columns=None):
+        """Return a DataFrame with the requested columns (every column when None)."""
+        wanted = self.columns if columns is None else [c for c in dict.fromkeys(columns) if c in self.columns]
+        with self._lock:
+            missing = [c for c in wanted if c not in self.loaded_columns]
+            if missing:
+                new = self._read_columns(missing)
+                if self._frame is None:
+                    self._frame = new
+                else:
+                    for col in missing:
+                        self._frame[col] = new[col].array
+            return self._frame[wanted]
+
+    def derived(self, build, columns):
+        """Return build(frame(columns)), computed once and shared, e.g. an index."""
+        key = (build, tuple(columns))
+        with self._lock:
+            if key not in self._derived:
+                load = self._stored.get(build)
+                self._derived[key] = load() if load else build(self.frame(columns))
+            return self._derived[key]
+
+
+def open_dataset(file_path):
+    """Open a CSV or occurrence store as a LazyDataset over its Parquet data.
+
+    A CSV without a fresh snapshot gets one from refresh_snapshot (streamed
+    for large exports), and its columns are then read from the snapshot on
+    demand; if no snapshot can be written (no pyarrow) the cleaned frame
+    backs the dataset in memory instead, as it does for partitioned exports.
+    """
+    if Path(file_path).is_dir() and _is_store(file_path):
+        from src.cube import CountCube
+        from src.store import OccurrenceStore
+        store = OccurrenceStore(file_path)
+        return LazyDataset(store.read, store.columns(), stored={CountCube: store.cube})
+
+    if partition_paths(file_path) is not None:
+        df = read_dataset(file_path)
+        return LazyDataset(lambda columns: df[columns], df.columns)
+
+    if not snapshot_is_fresh(file_path) and refresh_snapshot(file_path) is None:
+        df = read_dataset(file_path, use_snapshot=False)
+        return LazyDataset(lambda columns: df[columns], df.columns)
+
+    import pyarrow.parquet as pq
+
+    snapshot = snapshot_path(file_path)
+    return LazyDataset(lambda columns: pd.read_parquet(snapshot, columns=columns), pq.read_schema(snapshot).names)
+
+
+@st.cache_resource
+def load_dataset(file_path, version=None):
+    """Shared LazyDataset for all sessions; see load_and_open_dataset."""
+    return open_dataset(file_path)
+
+
+def load_and_open_dataset(file_path):
+    """Open the dataset, reopening it when the underlying data changes."""
+    return load_dataset(file_path, source_version(file_path))
+
+def clean_data(df, drop_duplicates=True):
+    """Clean the dataset by handling missing values and duplicates.
+
+    Rows with invalid coordinates are kept; the dashboard's "valid
+    coordinates" filter decides per view whether to hide them.
+    """
+    return preprocessing.clean_data(df, drop_duplicates=drop_duplicates, drop_invalid_coords=False)
 
 def load_and_clean_data(file_path):
     """Load and clean the biodiversity dataset."""
-    df = load_data(file_path)
+    df = load_data(file_path, source_version(file_path))
     return df
\ No newline at end of file
@@ -0,0 +1,366 @@
+import numpy as np
+import pandas as pd
+
+# Sidebar filters answered by an equality lookup, by filter key
+VALUE_FILTERS = {
+    'kingdom': 'kingdom_grouped',
+    'phylum': 'phylum',
+    'country': 'countryCode',
+    'state': 'stateProvince',
+}
+
+# Columns DateIndex is built from
+DATE_INDEX_COLUMNS = ['event_year', 'event_month', 'event_day']
+
+# Columns FilterIndex is built from
+FILTER_INDEX_COLUMNS = [
+    *VALUE_FILTERS.values(), 'event_year', 'mediaType', 'decimalLatitude', 'decimalLongitude',
+]
+
+
+def _codes(series):
+    """Integer codes and their labels; missing values get code -1."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, uniques = pd.factorize(series)
+    return codes, pd.Index(uniques)
+
+
+def _row_dtype(n_rows):
+    return np.int32 if n_rows < 2**31 else np.int64
+
+
+class ValueIndex:
+    """Row ids of every distinct value of one column.
+
+    All row ids are kept in one array grouped by value (a CSR layout), so the
+    rows of a value are a slice and come out in ascending order.
+    """
+
+    def __init__(self, series):
+        codes, self.labels = _codes(series)
+        self.codes = codes.astype(np.int32)
+        self.rows = np.argsort(self.codes, kind='stable').astype(_row_dtype(len(series)))
+        # Slot 0 holds missing values, slot code + 1 the rows of each label
+        counts = np.bincount(self.codes + 1, minlength=len(self.labels) + 1)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def code(self, value):
+        """Code of value, or -1 when the column never holds it."""
+        return int(self.labels.get_indexer([value])[0])
+
+    def rows_for(self, code):
+        if code < 0:
+            return self.rows[:0]
+        return self.rows[self.offsets[code + 1]:self.offsets[code + 2]]
+
+
+def _bitset(mask):
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+
+def _bits_at(bits, rows):
+    return ((bits[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+
+class FilterIndex:
+    """Precomputed lookups that answer the sidebar filters without full-column masks.
+
+    Built once per dataset: a ValueIndex for each VALUE_FILTERS column, the
+    rows sorted by event_year, and bitsets for "has an image" and "has
+    coordinates". select() starts from the smallest candidate row set and
+    checks the remaining filters on those rows only.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.values = {col: ValueIndex(df[col]) for col in VALUE_FILTERS.values()}
+
+        self.years = pd.to_numeric(df['event_year']).to_numpy(dtype=np.float32, na_value=np.nan)
+        order = np.argsort(self.years, kind='stable')  # NaN sorts last
+        order = order[:np.count_nonzero(~np.isnan(self.years))]
+        self.year_rows = order.astype(_row_dtype(self.n_rows))
+        self.sorted_years = self.years[order]
+
+        codes, labels = _codes(df['mediaType'])
+        has_image = np.append(np.asarray(labels.astype(str).str.contains('StillImage'), dtype=bool), False)[codes]
+        self.has_image = _bitset(has_image)
+        self.has_coords = _bitset(df['decimalLatitude'].notna() & df['decimalLongitude'].notna())
+
+    def __len__(self):
+        return self.n_rows
+
+    def _all_set(self, bits):
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+    def _year_rows(self, lo, hi, first, last):
+        if hi - lo < self.n_rows // 16:
+            return np.sort(self.year_rows[lo:hi])
+        # Wide ranges: one vectorized pass beats sorting most of the rows
+        return np.flatnonzero((self.years >= first) & (self.years <= last))
+
+    def _candidates(self, filters):
+        """(size, materialize, check) for every active filter."""
+        candidates = []
+        for key, col in VALUE_FILTERS.items():
+            if filters.get(key, "All") == "All":
+                continue
+            index = self.values[col]
+            code = index.code(filters[key])
+            rows = index.rows_for(code)
+            candidates.append((len(rows), lambda rows=rows: rows,
+                               lambda r, codes=index.codes, code=code: codes[r] == code))
+
+        if filters.get('year_range'):
+            first, last = filters['year_range']
+            lo = np.searchsorted(self.sorted_years, first, side='left')
+            hi = np.searchsorted(self.sorted_years, last, side='right')
+            candidates.append((hi - lo, lambda: self._year_rows(lo, hi, first, last),
+                               lambda r: (self.years[r] >= first) & (self.years[r] <= last)))
+
+        for key, bits in [('has_image', self.has_image), ('valid_coords', self.has_coords)]:
+            if filters.get(key):
+                # Sized as the whole frame: a flag is only a starting point when nothing else is set
+                candidates.append((self.n_rows, lambda bits=bits: self._all_set(bits),
+                                   lambda r, bits=bits: _bits_at(bits, r)))
+        return candidates
+
+    def select(self, filters):
+        """Ascending row positions matching the sidebar filters, or None for every row."""
+        candidates = self._candidates(filters)
+        if not candidates:
+            return None
+        candidates.sort(key=lambda candidate: candidate[0])
+        rows = candidates[0][1]()
+        for _, _, check in candidates[1:]:
+            if not len(rows):
+                break
+            rows = rows[check(rows)]
+        # Unique ascending positions: as many as rows means nothing was filtered out
+        return None if len(rows) == self.n_rows else rows
+
+
+# Parent -> child chains served by HierarchyIndex; a frame may hold any subset
+HIERARCHY_PATHS = [
+    ['kingdom_grouped', 'kingdom', 'phylum', 'class', 'order', 'family', 'genus', 'species'],
+    ['countryCode', 'stateProvince'],
+]
+
+# Children kept per node, and nodes kept per level, by HierarchyIndex.tree
+TREE_TOP_K = 12
+TREE_MAX_LEVEL_NODES = 300
+OTHER_LABEL = "Other"
+
+# Node ids join the labels of a path with a control character no label holds;
+# folded children end in a segment that starts with one, so a real taxon
+# named "Other" keeps an id of its own
+TREE_ID_SEPARATOR = "\x1f"
+OTHER_ID = "\x00" + OTHER_LABEL
+
+
+class HierarchyIndex:
+    """Observation counts for each distinct taxonomy and country/state path.
+
+    Built with one groupby per path; cascading selectors then read their
+    options from these tables, which hold one row per distinct path (about
+    one per species) instead of one per observation.
+    """
+
+    def __init__(self, df):
+        self.tables = []
+        for path in HIERARCHY_PATHS:
+            columns = [col for col in path if col in df.columns]
+            if columns:
+                counts = df.groupby(columns, observed=True, dropna=False).size()
+                self.tables.append(counts.reset_index(name='count'))
+
+    @property
+    def nbytes(self):
+        return int(sum(table.memory_usage(deep=True).sum() for table in self.tables))
+
+    def _table(self, columns):
+        """The first table holding every one of columns."""
+        for table in self.tables:
+            if all(col in table.columns for col in columns):
+                return table
+        raise KeyError(f"No hierarchy holds {list(columns)}")
+
+    def counts(self, level, selected=None):
+        """Observations per value of level under the selected ancestors, sorted by value.
+
+        selected maps column names to values; "All" leaves a column unrestricted.
+        """
+        selected = {col: value for col, value in (selected or {}).items() if value != "All"}
+        table = self._table([level, *selected])
+
+        mask = np.ones(len(table), dtype=bool)
+        for col, value in selected.items():
+            mask &= (table[col] == value).to_numpy(dtype=bool)
+        counts = table.loc[mask].groupby(level, observed=True)['count'].sum()
+        counts = counts[counts > 0]
+        if isinstance(counts.index, pd.CategoricalIndex):
+            counts.index = counts.index.astype(counts.index.categories.dtype)
+        return counts.sort_index()
+
+    def options(self, level, selected=None):
+        """Sorted distinct values of level under the selected ancestors."""
+        return self.counts(level, selected).index.tolist()
+
+    def tree(self, levels, selected=None, top_k=TREE_TOP_K, max_level_nodes=TREE_MAX_LEVEL_NODES):
+        """Nodes of the count tree over levels beneath the selected ancestors, for a sunburst.
+
+        Returns a frame of id, parent, label and count (each node's count
+        includes its descendants), outermost level last. Each parent keeps its
+        top_k children, and each level at most max_level_nodes nodes, by
+        count; the rest are folded into one "Other" child that is not
+        expanded further. Missing values are labelled "Unknown".
+        """
+        selected = {col: value for col, value in (selected or {}).items() if value != "All"}
+        levels = [level for level in levels if any(level in table.columns for table in self.tables)]
+        table = self._table([*levels, *selected])
+        mask = np.ones(len(table), dtype=bool)
+        for col, value in selected.items():
+            mask &= (table[col] == value).to_numpy(dtype=bool)
+        table = table.loc[mask].groupby(levels, observed=True, dropna=False)['count'].sum().reset_index()
+
+        # Path ids of every row, one column per level
+        labels = table[levels].astype(object).fillna("Unknown").astype(str)
+        ids = labels.iloc[:, :1].copy()
+        for i in range(1, len(levels)):
+            ids[levels[i]] = ids[levels[i - 1]] + TREE_ID_SEPARATOR + labels[levels[i]]
+        counts = table['count'].to_numpy()
+
+        nodes = []
+        alive = np.ones(len(table), dtype=bool)
+        for i, level in enumerate(levels):
+            parent = ids[levels[i - 1]].to_numpy() if i else np.full(len(table), "", dtype=object)
+            frame = pd.DataFrame({'id': ids[level].to_numpy()[alive], 'parent': parent[alive],
+                                  'label': labels[level].to_numpy()[alive], 'count': counts[alive]})
+            level_nodes = frame.groupby(['id', 'parent', 'label'], sort=False)['count'].sum().reset_index()
+            level_nodes = level_nodes.sort_values('count', ascending=False, kind='stable')
+            keep = (level_nodes.groupby('parent', sort=False).cumcount() < top_k).to_numpy()
+            keep = keep & (np.cumsum(keep) <= max_level_nodes)
+            folded = level_nodes[~keep].groupby('parent', sort=False)['count'].sum().reset_index()
+            folded['id'] = folded['parent'] + TREE_ID_SEPARATOR + OTHER_ID
+            folded['label'] = OTHER_LABEL
+            nodes += [level_nodes[keep], folded[['id', 'parent', 'label', 'count']]]
+            alive &= np.isin(ids[level].to_numpy(), level_nodes['id'].to_numpy()[keep])
+        if not nodes:
+            return pd.DataFrame(columns=['id', 'parent', 'label', 'count'])
+        return pd.concat(nodes, ignore_index=True)
+
+
+# Day ordinal of a missing or invalid date; real dates before 1970 are negative too
+NO_DAY = np.iinfo(np.int64).min
+
+
+def _day_ordinals(df):
+    """Days since 1970-01-01 from event_year/month/day; NO_DAY where the date is missing or invalid."""
+    parts = [pd.to_numeric(df[col]).to_numpy(dtype=np.float64, na_value=np.nan)
+             for col in ['event_year', 'event_month', 'event_day']]
+    valid = ~np.isnan(parts[0]) & ~np.isnan(parts[1]) & ~np.isnan(parts[2])
+    year, month, day = (np.where(valid, part, 1).astype(np.int64) for part in parts)
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+    month_start = (year - 1970).astype('datetime64[Y]') + (np.clip(month, 1, 12) - 1).astype('timedelta64[M]')
+    dates = month_start.astype('datetime64[D]') + (np.clip(day, 1, 31) - 1).astype('timedelta64[D]')
+    # Days past the end of the month roll into the next one, e.g. February 30
+    valid &= dates.astype('datetime64[M]') == month_start
+    return np.where(valid, dates.astype(np.int64), NO_DAY)
+
+
+class DateIndex:
+    """Rows sorted by observation day for exact-day, range and calendar-day lookups.
+
+    Each lookup is a binary search returning a slice of row positions in
+    chronological order, so a result page is taken without scanning the frame.
+    Built once per dataset; where() restricts it to the filtered rows.
+    """
+
+    def __init__(self, df=None, n_rows=0, rows=None, days=None, calendar_rows=None, calendar_days=None):
+        if df is None:
+            self.n_rows, self.rows, self.days = n_rows, rows, days
+            self.calendar_rows, self.calendar_days = calendar_rows, calendar_days
+            return
+
+        self.n_rows = len(df)
+        ordinals = _day_ordinals(df)
+        order = np.argsort(ordinals, kind='stable')
+        order = order[np.count_nonzero(ordinals == NO_DAY):]
+        self.rows = order.astype(_row_dtype(len(df)))
+        self.days = ordinals[order]
+
+        # Same rows keyed by month and day of month, chronological within each key
+        dates = self.days.astype('datetime64[D]')
+        months = dates.astype('datetime64[M]')
+        calendar_day = (months.astype(np.int64) % 12) * 32 + (dates - months).astype(np.int64)
+        by_day = np.argsort(calendar_day, kind='stable')
+        self.calendar_rows = self.rows[by_day]
+        self.calendar_days = calendar_day[by_day]
+
+    @property
+    def years(self):
+        """Years with dated rows, latest first."""
+        years = np.unique(self.days.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64)) + 1970
+        return years[::-1].tolist()
+
+    def where(self, rows):
+        """Index of the dated rows among rows (e.g. FilterIndex.select), numbered by position in df.take(rows).
+
+        Dropping rows keeps both orders, so nothing is sorted again.
+        """
+        if rows is None:
+            return self
+        positions = np.full(self.n_rows, -1, dtype=np.int64)
+        positions[rows] = np.arange(len(rows))
+        kept, calendar_kept = positions[self.rows], positions[self.calendar_rows]
+        dtype = _row_dtype(len(rows))
+        return DateIndex(n_rows=len(rows), rows=kept[kept >= 0].astype(dtype), days=self.days[kept >= 0],
+                         calendar_rows=calendar_kept[calendar_kept >= 0].astype(dtype),
+                         calendar_days=self.calendar_days[calendar_kept >= 0])
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in [self.rows, self.days, self.calendar_rows, self.calendar_days])
+
+    @property
+    def first(self):
+        return None if not len(self.days) else pd.Timestamp(self.days[0], unit='D').date()
+
+    @property
+    def last(self):
+        return None if not len(self.days) else pd.Timestamp(self.days[-1], unit='D').date()
+
+    def between(self, start, end):
+        """Rows observed from start through end (inclusive), chronologically."""
+        lo = np.searchsorted(self.days, _ordinal(start), side='left')
+        hi = np.searchsorted(self.days, _ordinal(end), side='right')
+        return self.rows[lo:hi]
+
+    def on(self, year, month, day):
+        """Rows observed on one day."""
+        try:
+            date = pd.Timestamp(year=int(year), month=int(month), day=int(day))
+        except ValueError:
+            return self.rows[:0]
+        return self.between(date, date)
+
+    def on_calendar_day(self, month, day):
+        """Rows observed on month/day in any year, oldest first."""
+        key = (int(month) - 1) * 32 + int(day) - 1
+        lo = np.searchsorted(self.calendar_days, key, side='left')
+        hi = np.searchsorted(self.calendar_days, key, side='right')
+        return self.calendar_rows[lo:hi]
+
+
+def _ordinal(date):
+    return int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+
+
+def paginate(rows, page, page_size):
+    """Row positions of a 1-based page, and the number of pages."""
+    pages = max(1, -(-len(rows) // page_size))
+    page = min(max(int(page), 1), pages)
+    return rows[(page - 1) * page_size:page * page_size], pages
@@ -1,3 +1,20 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+def value_counts(series):
+    """value_counts without the zero rows reported for unused categories.
+
+    Categorical labels are returned as a plain index so plotting libraries do
+    not draw empty slots for categories absent from the filtered frame.
+    """
+    counts = series.value_counts()
+    counts = counts[counts > 0]
+    if isinstance(counts.index, pd.CategoricalIndex):
+        counts.index = counts.index.astype(counts.index.categories.dtype)
+    return counts
+
 def species_count(df):
     return df['species'].nunique()
 
@@ -8,31 +25,31 @@ def families_count(df):
     return df['family'].nunique()
 
 def kingdom_distribution(df):
-    return df['kingdom_grouped'].value_counts()
+    return value_counts(df['kingdom_grouped'])
 
 def top_phyla(df, n=10):
-    return df['phylum'].value_counts().head(n)
+    return value_counts(df['phylum']).head(n)
 
 def top_orders(df, n=10):
-    return df['order'].value_counts().head(n)
+    return value_counts(df['order']).head(n)
 
 def top_genera(df, n=15):
-    return df['genus'].value_counts().head(n)
+    return value_counts(df['genus']).head(n)
 
 def top_species(df, n=15):
-    return df['species'].value_counts().head(n)
+    return value_counts(df['species']).head(n)
 
 def observations_per_year(df):
-    return df['event_year'].value_counts().sort_index()
+    return value_counts(df['event_year']).sort_index()
 
 def observations_per_month(df):
-    return df['event_month'].value_counts().sort_index()
+    return value_counts(df['event_month']).sort_index()
 
 def country_counts(df, n=15):
-    return df['countryCode'].value_counts().head(n)
+    return value_counts(df['countryCode']).head(n)
 
 def state_counts(df, n=15):
-    return df['stateProvince'].value_counts().head(n)
+    return value_counts(df['stateProvince']).head(n)
 
 def observers_count(df):
     if 'recordedBy' in df.columns:
@@ -42,4 +59,126 @@ def observers_count(df):
 def images_count(df):
     if 'mediaType' in df.columns:
         return df['mediaType'].str.contains('StillImage', na=False).sum()
-    return 0
\ No newline at end of file
+    return 0
+
+def _code_counts(series):
+    """Count of each distinct value from one pass over the column's codes."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, labels = pd.factorize(series)
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    return counts, pd.Index(labels)
+
+def _ranked(counts, labels):
+    """Non-zero counts as a Series, largest first (the value_counts layout)."""
+    ranked = pd.Series(counts, index=labels)
+    ranked = ranked[ranked > 0].sort_values(ascending=False, kind='stable')
+    if isinstance(ranked.index, pd.CategoricalIndex):
+        ranked.index = ranked.index.astype(ranked.index.categories.dtype)
+    return ranked
+
+@dataclass(frozen=True)
+class OverviewSummary:
+    """Everything the Overview tab shows for one filter selection."""
+    observations: int
+    species: int
+    genera: int
+    families: int
+    countries: int | None
+    observers: int
+    images: int
+    kingdoms: pd.Series
+    phyla: pd.Series
+    # True when species/genera/families/observers are sketch estimates
+    approximate: bool = False
+
+    @property
+    def nbytes(self):
+        return int(self.kingdoms.memory_usage(deep=True) + self.phyla.memory_usage(deep=True))
+
+def overview_summary(df, estimates=None):
+    """Overview KPIs and kingdom/phylum distributions in one pass per column.
+
+    Each categorical column is counted once with a bincount over its codes;
+    distinct totals, distributions and the image count all come from those
+    counts. Plain text columns that only need a distinct total (recordedBy)
+    use nunique, which is cheaper than factorizing them. estimates, e.g. from
+    DistinctSketches.distinct, replaces the distinct totals of the columns it
+    holds, which are then not read at all.
+    """
+    estimates = estimates or {}
+    counted = ['kingdom_grouped', 'phylum', 'mediaType']
+    counts = {
+        col: _code_counts(df[col]) for col in
+        ['species', 'genus', 'family', 'countryCode', 'recordedBy', *counted]
+        if col in df.columns and col not in estimates
+        and (col in counted or isinstance(df[col].dtype, pd.CategoricalDtype))
+    }
+
+    def distinct(col, missing=0):
+        if col in estimates:
+            return estimates[col]
+        if col in counts:
+            return int(np.count_nonzero(counts[col][0]))
+        return int(df[col].nunique()) if col in df.columns else missing
+
+    images = 0
+    if 'mediaType' in counts:
+        media, labels = counts['mediaType']
+        images = int(media[np.asarray(labels.astype(str).str.contains('StillImage'), dtype=bool)].sum())
+
+    return OverviewSummary(
+        observations=len(df),
+        species=distinct('species'),
+        genera=distinct('genus'),
+        families=distinct('family'),
+        countries=distinct('countryCode', None),
+        observers=distinct('recordedBy'),
+        images=images,
+        kingdoms=_ranked(*counts['kingdom_grouped']) if 'kingdom_grouped' in counts else pd.Series(dtype=int),
+        phyla=_ranked(*counts['phylum']) if 'phylum' in counts else pd.Series(dtype=int),
+        approximate=bool(estimates),
+    )
+
+def _band(values, band_width, low, high):
+    """Index of the band_width-wide band of each value, counting from low."""
+    n_bands = int(np.ceil((high - low) / band_width))
+    return np.minimum(((values - low) // band_width).astype(np.int64), n_bands - 1), n_bands
+
+def latitude_richness(df, band_width=5.0, lon_band_width=None):
+    """Distinct species per latitude band, indexed by the band's southern edge.
+
+    With lon_band_width, returns a latitude x longitude band table instead
+    (bands without observations left out). Species are counted on their
+    codes: each (band, species) pair is deduplicated with a hash-based
+    unique, so the cost is linear in the number of rows.
+    """
+    lat = pd.to_numeric(df['decimalLatitude']).to_numpy(dtype=np.float64, na_value=np.nan)
+    if isinstance(df['species'].dtype, pd.CategoricalDtype):
+        codes, labels = df['species'].cat.codes.to_numpy(), df['species'].cat.categories
+    else:
+        codes, labels = pd.factorize(df['species'])
+    valid = (codes >= 0) & (lat >= -90) & (lat <= 90)
+    bands, n_bands = _band(lat[valid], band_width, -90, 90)
+    if lon_band_width is not None:
+        lon = pd.to_numeric(df['decimalLongitude']).to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+        inside = (lon >= -180) & (lon <= 180)
+        lon_bands, n_lon = _band(lon[inside], lon_band_width, -180, 180)
+        bands, codes = bands[inside] * n_lon + lon_bands, codes[valid][inside]
+        n_bands *= n_lon
+    else:
+        codes = codes[valid]
+
+    n_species = max(len(labels), 1)
+    pairs = pd.unique(bands * n_species + codes)
+    richness = np.bincount(pairs // n_species, minlength=n_bands)
+
+    lat_edges = -90 + band_width * np.arange(int(np.ceil(180 / band_width)))
+    if lon_band_width is None:
+        result = pd.Series(richness, index=pd.Index(lat_edges, name='latitude'), name='species')
+        return result[result > 0]
+    lon_edges = -180 + lon_band_width * np.arange(int(np.ceil(360 / lon_band_width)))
+    table = pd.DataFrame(richness.reshape(len(lat_edges), len(lon_edges)),
+                         index=pd.Index(lat_edges, name='latitude'), columns=pd.Index(lon_edges, name='longitude'))
+    return table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
@@ -1,34 +1,231 @@
+import csv
+import io
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from contextlib import contextmanager
+
+import numpy as np
 import pandas as pd
 
+TAXONOMY_COLUMNS = ['phylum', 'class', 'order', 'family', 'genus', 'species']
+
+# Layouts seen in GBIF eventDate values, tried in order against a sample
+DATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%SZ',
+    '%Y-%m-%dT%H:%M:%S.%fZ',
+]
+
+# Season of each month (Northern Hemisphere meteorological seasons)
+SEASONS = ['Winter', 'Spring', 'Summer', 'Fall']
+MONTH_SEASON = np.array([-1, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
+# Kingdoms kept as their own group in kingdom_grouped; the rest become "Other"
+KINGDOM_GROUPS = ['Animalia', 'Plantae', 'Fungi']
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
 def load_data(file_path):
     """Load the biodiversity dataset from a CSV file."""
     df = pd.read_csv(file_path)
     return df
 
-def clean_data(df):
-    """Clean the biodiversity dataset by handling missing values and standardizing formats."""
-    taxonomy_cols = ['phylum', 'class', 'order', 'family', 'genus', 'species']
-    
+@contextmanager
+def _stage(timings, name):
+    start = time.perf_counter()
+    yield
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+def normalize_labels(series, func=None):
+    """Fill missing/empty labels with "Unknown" and apply func, returning a categorical.
+
+    The column is factorized once (categoricals reuse their codes) and both
+    steps run on the unique labels only, so the cost follows the number of
+    distinct names rather than the number of rows.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+
+    # An all-missing column factorizes to empty float uniques; func expects strings
+    labels = pd.Series(uniques).astype(str).replace("", "Unknown")
+    if func is not None:
+        labels = func(labels)
+    categories = pd.Index(labels).append(pd.Index(["Unknown"])).unique()
+    # Missing values have code -1, which picks the trailing "Unknown" entry
+    recode = np.append(categories.get_indexer(labels), categories.get_loc("Unknown"))
+    return pd.Series(
+        pd.Categorical.from_codes(recode[codes], categories),
+        index=series.index,
+        name=series.name,
+    )
+
+def detect_date_format(values, sample_size=1000):
+    """Return the DATE_FORMATS entry that parses most of a sample of values, or None."""
+    sample = pd.Series(values).dropna()
+    sample = sample[sample != ""].head(sample_size)
+    best, best_count = None, 0
+    for fmt in DATE_FORMATS:
+        count = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+def _parse_iso8601(values):
+    # Offsets are normalized to naive UTC so mixed timezones cannot fail the parse
+    return pd.to_datetime(values, errors='coerce', format='ISO8601', utc=True).dt.tz_localize(None)
+
+def parse_dates(values):
+    """Parse dates with a detected fixed format in one vectorized pass.
+
+    The column is factorized first and only the distinct strings are parsed.
+    Values the detected format cannot read (other layouts further down the
+    file) are retried as general ISO 8601; date ranges stay NaT as before.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques)
+    fmt = detect_date_format(uniques)
+    if fmt is None:
+        parsed = _parse_iso8601(uniques)
+    else:
+        parsed = pd.to_datetime(uniques, format=fmt, errors='coerce')
+        retry = parsed.isna()
+        if retry.any():
+            parsed[retry] = _parse_iso8601(uniques[retry])
+
+    parsed = pd.DatetimeIndex(parsed).take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(parsed, index=values.index, name=values.name)
+
+def clean_data(df, drop_duplicates=True, drop_invalid_coords=True, timings=None):
+    """Clean the biodiversity dataset by handling missing values and standardizing formats.
+
+    Pass a dict as timings to receive the seconds spent in each stage.
+    """
     # Fill missing taxonomy values
-    for col in taxonomy_cols:
-        df[col] = df[col].fillna("Unknown")
-        df[col] = df[col].str.capitalize()
-    
+    with _stage(timings, 'taxonomy'):
+        for col in TAXONOMY_COLUMNS:
+            if col in df.columns:
+                df[col] = normalize_labels(df[col], lambda s: s.str.capitalize())
+
     # Replace missing country/state with 'Unknown'
-    df['countryCode'] = df['countryCode'].fillna("Unknown")
-    df['stateProvince'] = df['stateProvince'].fillna("Unknown").replace("", "Unknown")
-    
+    with _stage(timings, 'location'):
+        for col in ['countryCode', 'stateProvince']:
+            if col in df.columns:
+                df[col] = normalize_labels(df[col])
+
+    with _stage(timings, 'dates'):
+        if 'eventDate' in df.columns:
+            df['eventDate'] = parse_dates(df['eventDate'])
+
+    # Row filters come last so the column assignments above never hit a slice
+    with _stage(timings, 'duplicates'):
+        if drop_duplicates and 'gbifID' in df.columns:
+            df = df[~df['gbifID'].duplicated()]
+
+    with _stage(timings, 'coordinates'):
+        if drop_invalid_coords:
+            df = filter_coordinates(df)
+
+    return df
+
+def filter_coordinates(df):
+    """Drop rows with missing, out-of-range or zero coordinates."""
     # Drop rows with invalid latitude/longitude values
     df = df[
         (df['decimalLatitude'].between(-90, 90, inclusive='both')) &
         (df['decimalLongitude'].between(-180, 180, inclusive='both'))
     ]
-    
+
     # Remove (0,0) coordinates
     df = df[(df['decimalLatitude'] != 0) & (df['decimalLongitude'] != 0)]
-    
+
     return df
 
+def add_event_fields(df):
+    """Derive event_year/month/day, event_day_of_week, event_season and kingdom_grouped.
+
+    Dates come from eventDate, falling back to the interpreted year/month/day
+    columns; every field is computed with array operations over the chunk.
+    """
+    if 'eventDate' in df.columns:
+        dates = parse_dates(df['eventDate'])
+        df['eventDate'] = dates
+        year, month, day = dates.dt.year, dates.dt.month, dates.dt.day
+        weekday = dates.dt.dayofweek.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        year = month = day = pd.Series(np.nan, index=df.index)
+        weekday = np.full(len(df), np.nan)
+
+    for col, derived, fallback, valid in [('event_year', year, 'year', None), ('event_month', month, 'month', (1, 12)),
+                                          ('event_day', day, 'day', (1, 31))]:
+        if fallback in df.columns:
+            derived = derived.fillna(pd.to_numeric(df[fallback], errors='coerce'))
+            if valid is not None:
+                # Fallback values outside the calendar (month 13, day -1) count as missing
+                derived = derived.where(derived.between(*valid))
+        df[col] = derived.astype('Int16' if col == 'event_year' else 'Int8')
+
+    weekday_codes = np.where(np.isnan(weekday), -1, weekday).astype(np.int8)
+    df['event_day_of_week'] = pd.Categorical.from_codes(weekday_codes, DAY_NAMES)
+    months = df['event_month'].to_numpy(dtype=np.float64, na_value=np.nan)
+    month_codes = np.where((months >= 1) & (months <= 12), months, 0).astype(np.int64)
+    df['event_season'] = pd.Categorical.from_codes(MONTH_SEASON[month_codes], SEASONS)
+
+    if 'kingdom' in df.columns:
+        groups = KINGDOM_GROUPS + ['Other']
+        codes = pd.Index(groups).get_indexer(df['kingdom'].astype(object))
+        codes[(codes < 0) & df['kingdom'].notna().to_numpy()] = len(KINGDOM_GROUPS)
+        df['kingdom_grouped'] = pd.Categorical.from_codes(codes, groups)
+    return df
+
+def _dwca_core(zf):
+    """Name, delimiter, header lines and encoding of the core data file of an archive."""
+    names = zf.namelist()
+    if 'meta.xml' in names:
+        root = ET.fromstring(zf.read('meta.xml'))
+        core = root.find('{*}core')
+        location = core.find('{*}files/{*}location').text.strip()
+        sep = core.get('fieldsTerminatedBy', '\\t').encode().decode('unicode_escape')
+        return location, sep, int(core.get('ignoreHeaderLines', '1')), core.get('encoding', 'UTF-8')
+    if 'occurrence.txt' in names:
+        return 'occurrence.txt', '\t', 1, 'UTF-8'
+    # GBIF "simple" downloads: a single tab-separated file named after the download key
+    data_files = [name for name in names if name.endswith(('.csv', '.txt'))]
+    if len(data_files) != 1:
+        raise ValueError(f"Cannot find the occurrence file in archive ({names})")
+    return data_files[0], '\t', 1, 'UTF-8'
+
+def read_dwca(zip_path, columns=None, dtype=None, chunksize=500_000):
+    """Stream the occurrence core of a GBIF Darwin Core Archive zip in chunks.
+
+    The core file (occurrence.txt for DwC-A downloads) is decompressed on the
+    fly, never extracted to disk. Only the requested columns are parsed, and
+    each chunk gets the derived fields from add_event_fields.
+    """
+    wanted = None if columns is None else set(columns)
+    usecols = None if wanted is None else (lambda col: col in wanted)
+    with zipfile.ZipFile(zip_path) as zf:
+        name, sep, header_lines, encoding = _dwca_core(zf)
+        with zf.open(name) as raw:
+            text = io.TextIOWrapper(raw, encoding=encoding, newline='')
+            # DwC-A text files are not quoted, so quotes inside values are literal
+            reader = pd.read_csv(
+                text, sep=sep, header=0 if header_lines else None, skiprows=max(header_lines - 1, 0),
+                quoting=csv.QUOTE_NONE, usecols=usecols, dtype=dtype, chunksize=chunksize,
+            )
+            for chunk in reader:
+                yield add_event_fields(chunk)
+
 def preprocess_data(file_path):
     """Load and preprocess the biodiversity dataset."""
     df = load_data(file_path)
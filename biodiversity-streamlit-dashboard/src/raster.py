@@ -0,0 +1,92 @@
+import io
+
+import numpy as np
+from matplotlib.image import imsave
+
+from src.indexes import _codes
+
+# Size of the density image covering the Web Mercator world square
+RASTER_SIZE = 512
+
+# Intensity steps per colour layer in composite()
+RASTER_LEVELS = 16
+
+# Latitude limit of Web Mercator; the image spans [-MERCATOR_LAT, MERCATOR_LAT]
+MERCATOR_LAT = 85.05112878
+
+# Layer of the rows whose group is missing
+MISSING_LABEL = 'Unknown'
+
+# Colours of the rasterized groups, in group order (Plotly's default sequence)
+RASTER_COLORS = [
+    '#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A',
+    '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52',
+]
+
+
+def mercator_pixels(lat, lon, size=RASTER_SIZE):
+    """Flat pixel index of each point in a size x size Web Mercator image; -1 when off the map."""
+    valid = ~(np.isnan(lat) | np.isnan(lon)) & (np.abs(lat) <= MERCATOR_LAT)
+    x = np.floor((lon + 180.0) / 360.0 * size)
+    y = np.floor((1 - np.log(np.tan(np.pi / 4 + np.radians(np.where(valid, lat, 0)) / 2)) / np.pi) / 2 * size)
+    x, y = np.clip(x, 0, size - 1), np.clip(y, 0, size - 1)
+    return np.where(valid, y * size + x, -1).astype(np.int64)
+
+
+def rasterize(df, by='kingdom_grouped', size=RASTER_SIZE):
+    """Observation counts per pixel, one size x size layer per label of by.
+
+    A single bincount over (group, pixel): O(n) in the number of points and
+    independent of it in output size. Returns (layers, labels) for the labels
+    with at least one point on the map, so unused categories get no layer.
+    Rows missing a group go to a MISSING_LABEL layer, so every point is
+    drawn; without a by column there is one layer labelled 'Observations'.
+    """
+    lat = df['decimalLatitude'].to_numpy(dtype=float, na_value=np.nan)
+    lon = df['decimalLongitude'].to_numpy(dtype=float, na_value=np.nan)
+    pixels = mercator_pixels(lat, lon, size)
+    if by in df.columns:
+        groups, labels = _codes(df[by])
+        labels = [str(label) for label in labels]
+        if (groups < 0).any():
+            if MISSING_LABEL not in labels:
+                labels.append(MISSING_LABEL)
+            groups = np.where(groups < 0, labels.index(MISSING_LABEL), groups)
+    else:
+        groups, labels = np.zeros(len(df), dtype=np.int64), ['Observations']
+    keep = pixels >= 0
+    counts = np.bincount(groups[keep].astype(np.int64) * size * size + pixels[keep],
+                         minlength=len(labels) * size * size)
+    layers = counts.reshape(len(labels), size, size)
+    present = np.flatnonzero(layers.any(axis=(1, 2)))
+    return layers[present], [labels[i] for i in present]
+
+
+def composite(layers, colors=RASTER_COLORS, log_scale=True):
+    """RGBA uint8 image mixing the layers' colours by their relative intensity.
+
+    Each layer is scaled to [0, 1] against its densest pixel (after log1p
+    when log_scale), so sparse groups stay visible next to dense ones. A
+    pixel's colour is the intensity-weighted mean of its groups' colours and
+    its opacity follows the strongest of them; empty pixels are transparent.
+    """
+    layers = layers.astype(np.float32)
+    if log_scale:
+        layers = np.log1p(layers)
+    peaks = layers.max(axis=(1, 2))
+    intensity = layers / np.maximum(peaks, 1e-9)[:, None, None]
+    # Few distinct intensities keep the PNG small; empty pixels stay empty
+    intensity = np.where(intensity > 0, np.ceil(intensity * RASTER_LEVELS) / RASTER_LEVELS, 0)
+
+    rgb = np.array([[int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in colors], dtype=np.float32)
+    rgb = rgb[np.arange(len(layers)) % len(rgb)]
+    total = intensity.sum(axis=0)
+    mixed = np.tensordot(intensity, rgb, axes=(0, 0)) / np.maximum(total, 1e-9)[..., None]
+    alpha = np.where(total > 0, 0.35 + 0.65 * intensity.max(axis=0, initial=0), 0) * 255
+    return np.dstack([mixed, alpha]).astype(np.uint8)
+
+
+def png_bytes(image):
+    buffer = io.BytesIO()
+    imsave(buffer, image, format='png')
+    return buffer.getvalue()
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from src.indexes import _codes
+
+# Columns whose combinations form the strata: species by region
+SAMPLE_STRATA = ['species', 'countryCode']
+
+# Rows every stratum keeps (or all of them, if it has fewer)
+MIN_PER_STRATUM = 1
+
+SAMPLE_SEED = 0
+
+
+def _priorities(df, seed):
+    """Seeded pseudo-random rank key of each row, derived from its index label.
+
+    The same observation gets the same key on every rerun and under every
+    filter, so samples of overlapping selections share their rows.
+    """
+    labels = pd.util.hash_array(df.index.to_numpy())
+    return pd.util.hash_array(labels ^ pd.util.hash_array(np.array([seed], dtype=np.uint64))[0])
+
+
+def _strata(df, columns):
+    """Stratum id of each row (combinations of the columns present; missing values form their own)."""
+    ids = np.zeros(len(df), dtype=np.int64)
+    for col in columns:
+        if col in df.columns:
+            codes, labels = _codes(df[col])
+            ids = ids * (len(labels) + 1) + codes + 1
+            ids = np.unique(ids, return_inverse=True)[1].astype(np.int64)
+    return ids
+
+
+def stratum_count(df, strata=SAMPLE_STRATA):
+    """Number of non-empty strata in df; above the sample size not every one can be represented."""
+    return len(np.unique(_strata(df, strata)))
+
+
+def stratified_sample(df, n, strata=SAMPLE_STRATA, min_per_stratum=MIN_PER_STRATUM, seed=SAMPLE_SEED):
+    """Ascending positions of a deterministic sample of at most n rows of df.
+
+    Every stratum first gets min_per_stratum rows, so rare species and
+    sparse regions stay on the map; the rest of the budget is shared in
+    proportion to stratum size. When there are more strata than room,
+    the strata kept are chosen by the seeded hash too. Within a stratum the
+    rows with the lowest seeded priority are taken.
+    """
+    if len(df) <= n:
+        return np.arange(len(df))
+    groups = _strata(df, strata)
+    sizes = np.bincount(groups)
+    priority = _priorities(df, seed)
+
+    quota = np.minimum(sizes, min_per_stratum)
+    if quota.sum() > n:
+        # Not every stratum fits: keep the n strata whose first row ranks lowest
+        first = np.full(len(sizes), np.iinfo(np.uint64).max, dtype=np.uint64)
+        np.minimum.at(first, groups, priority)
+        kept = np.argsort(first, kind='stable')[:n]
+        quota = np.zeros_like(sizes)
+        quota[kept] = 1
+    else:
+        spare = sizes - quota
+        quota += np.floor((n - quota.sum()) * spare / max(spare.sum(), 1)).astype(np.int64)
+
+    order = np.lexsort((priority, groups))
+    sorted_groups = groups[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_groups, sorted_groups)
+    return np.sort(order[rank < quota[sorted_groups]])
@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+
+from src.indexes import _codes
+
+# Most grid cells drawn on a Folium map; finer grids are coarsened to fit
+GRID_MAX_CELLS = 1000
+
+# Species listed in a grid cell's popup
+GRID_TOP_SPECIES = 3
+
+# Most weighted points sent to a Folium HeatMap
+HEAT_MAX_POINTS = 10000
+
+
+def cell_degrees(zoom):
+    """Grid cell size for a web map zoom level: about 8 cells across one 256px tile."""
+    return 360.0 / 2 ** (int(zoom) + 3)
+
+
+def _cell_keys(lat, lon, size):
+    rows = np.floor((lat + 90.0) / size).astype(np.int64)
+    cols = np.floor((lon + 180.0) / size).astype(np.int64)
+    return rows * (int(np.ceil(360.0 / size)) + 1) + cols
+
+
+def grid_cells(df, size, top_n=GRID_TOP_SPECIES):
+    """Observations with coordinates binned into size x size degree cells.
+
+    One row per non-empty cell: the mean position of its points, the number
+    of observations and its top_n species as (name, count) pairs, most
+    observed first. Every point is counted, none are sampled.
+    """
+    lat = df['decimalLatitude'].to_numpy(dtype=float, na_value=np.nan)
+    lon = df['decimalLongitude'].to_numpy(dtype=float, na_value=np.nan)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    lat, lon = lat[valid], lon[valid]
+
+    keys, cells, counts = np.unique(_cell_keys(lat, lon, size), return_inverse=True, return_counts=True)
+    grid = pd.DataFrame({
+        'latitude': np.bincount(cells, lat, len(keys)) / counts,
+        'longitude': np.bincount(cells, lon, len(keys)) / counts,
+        'count': counts,
+    })
+
+    top = [[] for _ in range(len(keys))]
+    if 'species' in df.columns and len(keys):
+        species, names = _codes(df['species'][valid])
+        known = species >= 0
+        pairs, pair_counts = np.unique(cells[known] * len(names) + species[known], return_counts=True)
+        pair_cells = pairs // len(names)
+        # Within each cell, most observed species first
+        order = np.lexsort((-pair_counts, pair_cells))
+        pair_cells, pairs, pair_counts = pair_cells[order], pairs[order], pair_counts[order]
+        rank = np.arange(len(pairs)) - np.searchsorted(pair_cells, pair_cells)
+        keep = rank < top_n
+        for cell, code, count in zip(pair_cells[keep], pairs[keep] % len(names), pair_counts[keep]):
+            top[cell].append((names[code], int(count)))
+    grid['top_species'] = top
+    return grid
+
+
+def _coordinates(df):
+    lat = df['decimalLatitude'].to_numpy(dtype=float, na_value=np.nan)
+    lon = df['decimalLongitude'].to_numpy(dtype=float, na_value=np.nan)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    return lat[valid], lon[valid]
+
+
+def _fitting_size(lat, lon, size, max_cells):
+    """size, doubled until the points fall into at most max_cells cells."""
+    while size < 180 and len(np.unique(_cell_keys(lat, lon, size))) > max_cells:
+        size *= 2
+    return size
+
+
+def grid_for_zoom(df, zoom, max_cells=GRID_MAX_CELLS):
+    """grid_cells at the resolution of zoom, doubled in size until at most max_cells remain."""
+    lat, lon = _coordinates(df)
+    return grid_cells(df, _fitting_size(lat, lon, cell_degrees(zoom), max_cells))
+
+
+def heat_points(df, zoom, max_points=HEAT_MAX_POINTS):
+    """HeatMap input: [lat, lon, weight] rows, one per occupied heat cell.
+
+    Points are snapped to cells of 1/32 tile (about 8px, finer than the heat
+    radius) and duplicates collapse into a weight equal to their count, which
+    is what the heat layer sums anyway. Cells double in size until at most
+    max_points remain, so the payload is bounded whatever the row count.
+    """
+    lat, lon = _coordinates(df)
+    size = _fitting_size(lat, lon, cell_degrees(zoom) / 4, max_points)
+    keys, cells, counts = np.unique(_cell_keys(lat, lon, size), return_inverse=True, return_counts=True)
+    return np.column_stack([
+        np.round(np.bincount(cells, lat, len(keys)) / counts, 5),
+        np.round(np.bincount(cells, lon, len(keys)) / counts, 5),
+        counts,
+    ])
+
+
+# Columns SpatialIndex is built from
+SPATIAL_INDEX_COLUMNS = ['decimalLatitude', 'decimalLongitude']
+
+# Points per leaf and children per inner node of the packed R-tree
+NODE_SIZE = 64
+
+
+def _spread_bits(values):
+    """Interleave zeros between the low 16 bits of each value (for Morton codes)."""
+    values = values.astype(np.uint32)
+    for shift, mask in [(8, 0x00FF00FF), (4, 0x0F0F0F0F), (2, 0x33333333), (1, 0x55555555)]:
+        values = (values | (values << shift)) & mask
+    return values
+
+
+def _morton(lat, lon):
+    y = np.clip((lat + 90.0) / 180.0 * 65535, 0, 65535)
+    x = np.clip((lon + 180.0) / 360.0 * 65535, 0, 65535)
+    return _spread_bits(x) | (_spread_bits(y) << 1)
+
+
+def _ranges(starts, ends):
+    """Concatenation of arange(start, end) for each pair, without a Python loop."""
+    lengths = ends - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+class SpatialIndex:
+    """Packed R-tree over the float32 coordinates of the observations.
+
+    Points are sorted along a Z-order curve and packed NODE_SIZE to a leaf;
+    every level above holds the bounding boxes of NODE_SIZE nodes of the
+    level below. within() walks down from the root, testing only the
+    children of boxes that meet the viewport, then the points of the
+    leaves it reaches. About 12 bytes per point.
+    """
+
+    def __init__(self, df=None, n_rows=0, rows=None, lat=None, lon=None, leaf_starts=None, levels=None):
+        if df is None:
+            self.n_rows, self.rows, self.lat, self.lon = n_rows, rows, lat, lon
+            self.leaf_starts, self.levels = leaf_starts, levels
+            return
+
+        self.n_rows = len(df)
+        lat = df['decimalLatitude'].to_numpy(dtype=np.float32, na_value=np.nan)
+        lon = df['decimalLongitude'].to_numpy(dtype=np.float32, na_value=np.nan)
+        rows = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        order = np.argsort(_morton(lat[rows], lon[rows]), kind='stable')
+        self.rows = rows[order].astype(np.int32 if self.n_rows < 2**31 else np.int64)
+        self.lat, self.lon = lat[self.rows], lon[self.rows]
+
+        # Leaf boxes from the points, then each level from the one below, up to the root
+        self.leaf_starts = np.arange(0, len(self.rows) + NODE_SIZE, NODE_SIZE).clip(max=len(self.rows))
+        starts = self.leaf_starts[:-1]
+        boxes = [np.minimum.reduceat(self.lat, starts), np.minimum.reduceat(self.lon, starts),
+                 np.maximum.reduceat(self.lat, starts), np.maximum.reduceat(self.lon, starts)] if len(starts) else []
+        self.levels = [np.array(boxes, dtype=np.float32).reshape(4, -1)]
+        while self.levels[0].shape[1] > NODE_SIZE:
+            below = self.levels[0]
+            groups = np.arange(0, below.shape[1], NODE_SIZE)
+            self.levels.insert(0, np.stack([np.minimum.reduceat(below[0], groups), np.minimum.reduceat(below[1], groups),
+                                            np.maximum.reduceat(below[2], groups), np.maximum.reduceat(below[3], groups)]))
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def nbytes(self):
+        return int(self.rows.nbytes + self.lat.nbytes + self.lon.nbytes + self.leaf_starts.nbytes
+                   + sum(level.nbytes for level in self.levels))
+
+    def where(self, rows):
+        """Index of the points among rows (e.g. FilterIndex.select), numbered by position in df.take(rows).
+
+        The tree's boxes are kept as they are; they still contain every
+        remaining point, so only the point arrays are filtered.
+        """
+        if rows is None:
+            return self
+        positions = np.full(self.n_rows, -1, dtype=np.int64)
+        positions[rows] = np.arange(len(rows))
+        kept = positions[self.rows]
+        keep = kept >= 0
+        leaf_starts = np.concatenate([[0], np.cumsum(keep)])[self.leaf_starts]
+        return SpatialIndex(n_rows=len(rows), rows=kept[keep].astype(self.rows.dtype), lat=self.lat[keep],
+                            lon=self.lon[keep], leaf_starts=leaf_starts, levels=self.levels)
+
+    def within(self, south, west, north, east):
+        """Ascending row positions of the points inside the box (bounds included)."""
+        nodes = np.arange(self.levels[0].shape[1])
+        for depth, boxes in enumerate(self.levels):
+            nodes = nodes[nodes < boxes.shape[1]]
+            box = boxes[:, nodes]
+            nodes = nodes[(box[0] <= north) & (box[2] >= south) & (box[1] <= east) & (box[3] >= west)]
+            if depth < len(self.levels) - 1:
+                nodes = (nodes[:, None] * NODE_SIZE + np.arange(NODE_SIZE)).ravel()
+        points = _ranges(self.leaf_starts[nodes], self.leaf_starts[nodes + 1])
+        lat, lon = self.lat[points], self.lon[points]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(self.rows[points[inside]])
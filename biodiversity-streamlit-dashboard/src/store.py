@@ -0,0 +1,305 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.cube import CUBE_COLUMNS, CUBE_DIMS, CountCube
+from src.data_loader import STREAM_CHUNKSIZE, SeenIds, iter_clean_chunks, storage_schema
+
+# Version 2 keeps CountCube cells as the aggregates; older ones are rebuilt
+STORE_VERSION = 2
+MANIFEST = "manifest.json"
+
+# Rows per Parquet row group; parts are sorted by gbifID, so a lookup by id
+# only decodes the row groups whose id range can hold it
+PART_ROW_GROUP_SIZE = 16384
+
+
+def _interpreted_ns(df):
+    """lastInterpreted as int64 nanoseconds; missing stamps sort oldest."""
+    if 'lastInterpreted' not in df.columns:
+        return np.full(len(df), np.iinfo(np.int64).min, dtype=np.int64)
+    stamps = pd.to_datetime(df['lastInterpreted'], errors='coerce', utc=True, format='ISO8601')
+    stamps = stamps.dt.tz_localize(None).astype('datetime64[ns]')
+    return stamps.to_numpy().view(np.int64)
+
+
+def _newest_per_id(df):
+    """Keep one row per gbifID, preferring the latest lastInterpreted."""
+    if df['gbifID'].is_unique:
+        return df
+    order = np.argsort(_interpreted_ns(df), kind='stable')
+    return df.iloc[order].drop_duplicates(subset=['gbifID'], keep='last')
+
+
+def _cube_cells(df):
+    """CountCube cells of df; columns an export lacks count as missing."""
+    return CountCube(df.reindex(columns=CUBE_COLUMNS)).cells()
+
+
+class OccurrenceStore:
+    """Directory of Parquet parts, upserted by gbifID, described by a JSON manifest.
+
+    Every upsert appends one part. Rows it supersedes in older parts are not
+    rewritten: their gbifIDs go to that part's tombstone file and are skipped
+    on read. Parts are sorted by gbifID and keep their sorted ids in a .npy
+    file beside them, so an upsert binary-searches those (memory-mapped) for
+    the delta's ids and reads lastInterpreted and the cube columns only for
+    the ids found, from the row groups that can hold them. The CountCube
+    cells the dashboard's count charts read are adjusted by the delta
+    instead of rebuilt.
+    New files get unique names and the manifest is replaced last, so readers
+    see either the old or the new generation.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        manifest_path = self.path / MANIFEST
+        if manifest_path.exists():
+            self.manifest = json.loads(manifest_path.read_text())
+            if self.manifest['version'] < STORE_VERSION:
+                # Aggregates in an older layout: counts() rebuilds them until the next upsert
+                self.manifest.update(version=STORE_VERSION, aggregates=None)
+        else:
+            self.manifest = {'version': STORE_VERSION, 'generation': 0, 'next_part': 0,
+                             'parts': [], 'aggregates': None}
+
+    @staticmethod
+    def is_store(path):
+        return (Path(path) / MANIFEST).exists()
+
+    @property
+    def generation(self):
+        return self.manifest['generation']
+
+    def __len__(self):
+        return sum(part['rows'] - part['deleted'] for part in self.manifest['parts'])
+
+    def columns(self):
+        """Column names across all parts, in first-seen order."""
+        return list(dict.fromkeys(col for part in self.manifest['parts'] for col in part['columns']))
+
+    def _tombstones(self, part):
+        if not part['tombstones']:
+            return np.empty(0, dtype=np.int64)
+        return np.load(self.path / part['tombstones'])
+
+    def _read_part(self, part, columns=None):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        read_columns = None if columns is None else list(dict.fromkeys(['gbifID', *columns]))
+        table = pq.read_table(self.path / part['file'], columns=read_columns)
+        dead = self._tombstones(part)
+        if len(dead):
+            table = table.filter(pc.invert(pc.is_in(table['gbifID'], value_set=pa.array(dead))))
+        if columns is not None and 'gbifID' not in columns:
+            table = table.drop_columns(['gbifID'])
+        return table
+
+    def _part_ids(self, part):
+        """Sorted gbifIDs of a part, tombstoned ones included."""
+        if part.get('ids'):
+            return np.load(self.path / part['ids'], mmap_mode='r')
+        # Parts written before the id files existed
+        import pyarrow.parquet as pq
+        return np.sort(pq.read_table(self.path / part['file'], columns=['gbifID'])['gbifID'].to_numpy())
+
+    def _matching_ids(self, part, probe):
+        """The ids of the sorted array probe that are live rows of part."""
+        ids = self._part_ids(part)
+        found = probe[ids[np.searchsorted(ids, probe).clip(max=len(ids) - 1)] == probe]
+        return found[~np.isin(found, self._tombstones(part))]
+
+    def _read_rows(self, part, ids, columns):
+        """The rows of part with the given gbifIDs, as a DataFrame of gbifID and columns."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        return pq.read_table(self.path / part['file'], columns=['gbifID', *columns],
+                             filters=pc.field('gbifID').isin(pa.array(ids))).to_pandas()
+
+    def _write_part(self, table):
+        """Write table as a new part sorted by gbifID, with its id file; returns the manifest entry."""
+        import pyarrow.parquet as pq
+
+        table = table.sort_by('gbifID')
+        stem = f"part-{self.manifest['next_part']:05d}"
+        self.manifest['next_part'] += 1
+        pq.write_table(table, self.path / f"{stem}.parquet", row_group_size=PART_ROW_GROUP_SIZE)
+        ids = table['gbifID'].to_numpy().astype(np.int64)
+        np.save(self.path / f"{stem}.ids.npy", ids)
+        return {
+            'file': f"{stem}.parquet", 'ids': f"{stem}.ids.npy", 'rows': len(ids), 'deleted': 0,
+            'tombstones': None, 'columns': table.column_names, 'min_id': int(ids[0]), 'max_id': int(ids[-1]),
+        }
+
+    def read(self, columns=None):
+        """Return the live rows of every part as one DataFrame."""
+        import pyarrow as pa
+
+        tables = [
+            self._read_part(part, None if columns is None else [c for c in columns if c in part['columns']])
+            for part in self.manifest['parts']
+        ]
+        if not tables:
+            return pd.DataFrame(columns=columns)
+        return pa.concat_tables(tables, promote_options='default').to_pandas()
+
+    def counts(self):
+        """Observation counts of the live rows as CountCube cells (see CountCube.cells)."""
+        if not self.manifest['aggregates']:
+            if self.manifest['parts']:
+                return _cube_cells(self.read(CUBE_COLUMNS))
+            return pd.DataFrame(columns=[*CUBE_DIMS, 'count'])
+        return pd.read_parquet(self.path / self.manifest['aggregates'])
+
+    def cube(self):
+        """CountCube of the live rows, from the maintained counts without reading any part."""
+        return CountCube.from_cells(self.counts())
+
+    def _commit(self, obsolete):
+        self.manifest['generation'] += 1
+        tmp = self.path / (MANIFEST + ".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2))
+        os.replace(tmp, self.path / MANIFEST)
+        for name in obsolete:
+            if name and (self.path / name).exists():
+                (self.path / name).unlink()
+
+    def upsert(self, df, written=None):
+        """Insert new gbifIDs and replace existing ones with a newer lastInterpreted.
+
+        A stored row is only replaced by a strictly newer one, so re-ingesting
+        an unchanged export writes nothing. written is ingest()'s record of
+        the parts and ids it has written so far ({'parts': set, 'ids':
+        SeenIds}); those parts are only probed for ids seen there, and the
+        record is updated. Returns counts of inserted, updated and skipped
+        (not newer) rows.
+        """
+        import pyarrow as pa
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        df = _newest_per_id(df)
+        result = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        if df.empty:
+            return result
+
+        base = self.counts()
+        ids = df['gbifID'].to_numpy(np.int64)
+        order = np.argsort(ids)
+        sorted_ids = ids[order]
+        stamps = _interpreted_ns(df)
+        # Ids this ingest already wrote, the only ones its own parts can hold
+        repeated = sorted_ids if written is None else sorted_ids[written['ids'].contains(sorted_ids)]
+        keep = np.ones(len(df), dtype=bool)
+        removed = []
+        obsolete = []
+        generation = self.generation + 1
+
+        for part in self.manifest['parts']:
+            probe = repeated if written is not None and part['file'] in written['parts'] else sorted_ids
+            if (not len(probe) or part['rows'] == part['deleted']
+                    or part['max_id'] < probe[0] or part['min_id'] > probe[-1]):
+                continue
+            matched = self._matching_ids(part, probe)
+            if not len(matched):
+                continue
+            columns = [col for col in ['lastInterpreted', *CUBE_COLUMNS] if col in part['columns']]
+            existing = self._read_rows(part, matched, columns)
+
+            delta_rows = order[np.searchsorted(sorted_ids, existing['gbifID'].to_numpy(np.int64))]
+            newer = stamps[delta_rows] > _interpreted_ns(existing)
+            keep[delta_rows[~newer]] = False
+            replaced = existing[newer]
+            if replaced.empty:
+                continue
+
+            removed.append(replaced)
+            tombstones = np.union1d(self._tombstones(part), replaced['gbifID'].to_numpy(np.int64))
+            obsolete.append(part['tombstones'])
+            part['tombstones'] = f"{Path(part['file']).stem}.tomb-{generation}.npy"
+            np.save(self.path / part['tombstones'], tombstones)
+            part['deleted'] = len(tombstones)
+
+        delta = df[keep]
+        result['skipped'] = int((~keep).sum())
+        result['updated'] = int(sum(len(r) for r in removed))
+        result['inserted'] = len(delta) - result['updated']
+
+        if not delta.empty:
+            table = pa.Table.from_pandas(delta, preserve_index=False)
+            part = self._write_part(table.cast(storage_schema(table)))
+            self.manifest['parts'].append(part)
+            if written is not None:
+                written['parts'].add(part['file'])
+                written['ids'].add(delta['gbifID'].to_numpy(np.int64))
+
+        counts = [base, _cube_cells(delta)]
+        for rows in removed:
+            negative = _cube_cells(rows)
+            negative['count'] = -negative['count']
+            counts.append(negative)
+        counts = [c for c in counts if not c.empty]
+        counts = pd.concat(counts, ignore_index=True) if counts else base
+        if not counts.empty:
+            counts = counts.groupby(CUBE_DIMS, dropna=False).sum().reset_index()
+            counts = counts[counts['count'] != 0].reset_index(drop=True)
+        obsolete.append(self.manifest['aggregates'])
+        self.manifest['aggregates'] = f"aggregates-{generation}.parquet"
+        counts.to_parquet(self.path / self.manifest['aggregates'], index=False)
+
+        self._commit(obsolete)
+        return result
+
+    def ingest(self, file_path, chunksize=STREAM_CHUNKSIZE):
+        """Clean a new CSV export chunk by chunk and upsert it into the store.
+
+        Work scales with the size of the export, not of the store: parts are
+        probed by binary search in their id files, and only matched rows are
+        read. Parts written by earlier chunks of this call are probed only
+        for ids the export repeats. Those repeated rows are kept for upsert,
+        so the newest lastInterpreted wins rather than the first row read.
+        """
+        stats = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        written = {'parts': set(), 'ids': SeenIds()}
+        for chunk in iter_clean_chunks(file_path, chunksize, drop_invalid_coords=False, stats=stats,
+                                       drop_duplicates=False):
+            for key, value in self.upsert(chunk, written).items():
+                stats[key] += value
+        return stats
+
+    def compact(self):
+        """Rewrite parts that carry tombstones so they only hold live rows."""
+        obsolete = []
+        parts = []
+        for part in self.manifest['parts']:
+            if not part['tombstones']:
+                parts.append(part)
+                continue
+            table = self._read_part(part)
+            obsolete += [part['file'], part['tombstones'], part.get('ids')]
+            if table.num_rows:
+                parts.append(self._write_part(table))
+        self.manifest['parts'] = parts
+        if obsolete:
+            self._commit(obsolete)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Upsert a GBIF CSV export into an occurrence store.")
+    parser.add_argument("store", help="store directory, created if missing")
+    parser.add_argument("export", help="cleaned or raw GBIF CSV export")
+    parser.add_argument("--compact", action="store_true", help="fold tombstones back into the parts afterwards")
+    args = parser.parse_args()
+
+    store = OccurrenceStore(args.store)
+    print(store.ingest(args.export))
+    if args.compact:
+        store.compact()
@@ -1,203 +1,263 @@
+import base64
+import html
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import seaborn as sns
 import plotly.express as px
+import plotly.graph_objects as go
+from src.indexes import HierarchyIndex
+from src.metrics import latitude_richness, value_counts
+from src.raster import MERCATOR_LAT, RASTER_COLORS, composite, png_bytes, rasterize
+from src.spatial import grid_for_zoom, heat_points
+
+# Numeric fields compared by plot_correlation_heatmap
+NUMERIC_COLUMNS = [
+    'gbifID', 'decimalLatitude', 'decimalLongitude', 'coordinateUncertaintyInMeters',
+    'day', 'month', 'year', 'taxonKey', 'speciesKey', 'event_year', 'event_month', 'event_day',
+]
+
+# Ranks of the default sunburst
+SUNBURST_LEVELS = ['kingdom', 'phylum', 'class', 'order']
+
+# Columns read by each plot function, so callers can load only what they draw
+PLOT_COLUMNS = {
+    'plot_kingdom_distribution': ['kingdom_grouped'],
+    'plot_top_phyla': ['phylum'],
+    'plot_top_orders': ['order'],
+    'plot_species_richness': ['decimalLatitude', 'decimalLongitude', 'species'],
+    'plot_observations_per_year': ['event_year'],
+    'plot_observations_per_month': ['event_month'],
+    'plot_top_countries': ['countryCode'],
+    'plot_top_states': ['stateProvince'],
+    'plot_correlation_heatmap': NUMERIC_COLUMNS,
+    'plot_sunburst': SUNBURST_LEVELS,
+    'plot_top_genera': ['genus'],
+    'plot_top_species': ['species'],
+    'plot_taxonomy_pie': ['kingdom_grouped'],
+    'plot_folium_map': ['decimalLatitude', 'decimalLongitude', 'species', 'eventDate'],
+    'plot_plotly_map': ['decimalLatitude', 'decimalLongitude', 'species', 'kingdom_grouped'],
+    'plot_month_year_heatmap': ['event_year', 'event_month', 'gbifID'],
+    'plot_kingdom_over_time': ['event_year', 'kingdom_grouped'],
+    'plot_country_richness': ['countryCode', 'species'],
+    'plot_state_richness': ['stateProvince', 'species'],
+}
+
+def required_columns(*plots):
+    """Union of the columns read by the given plot functions, in first-seen order."""
+    columns = []
+    for plot in plots:
+        columns += PLOT_COLUMNS[plot.__name__]
+    return list(dict.fromkeys(columns))
+
+
+def _figure(figsize):
+    """A Figure and its Axes on the Agg canvas.
+
+    Built without pyplot, so no global figure state is shared and sessions
+    on different threads can draw at the same time.
+    """
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
 
-def plot_kingdom_distribution(df):
+def plot_kingdom_distribution(df, counts=None):
+    """Bar chart of observations per kingdom; counts may be precomputed (see metrics.overview_summary)."""
     if df.empty:
         return None
-    plt.figure(figsize=(8, 5))
-    sns.countplot(data=df, x='kingdom_grouped', order=df['kingdom_grouped'].value_counts().index)
-    plt.title("Distribution of Observations by Kingdom")
-    plt.xticks(rotation=30)
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    if counts is None:
+        counts = value_counts(df['kingdom_grouped'])
+    fig, ax = _figure((8, 5))
+    sns.barplot(x=counts.index, y=counts.values, order=counts.index, ax=ax)
+    ax.set_title("Distribution of Observations by Kingdom")
+    ax.tick_params(axis='x', rotation=30)
+    fig.tight_layout()
     return fig
 
-def plot_top_phyla(df, top_n=10):
+def plot_top_phyla(df, top_n=10, counts=None):
     if df.empty:
         return None
-    top_phyla = df['phylum'].value_counts().head(top_n)
+    if counts is None:
+        counts = value_counts(df['phylum'])
+    top_phyla = counts.head(top_n)
     if top_phyla.empty:
         return None
-    plt.figure(figsize=(8, 5))
-    sns.barplot(x=top_phyla.values, y=top_phyla.index)
-    plt.title(f"Top {top_n} Most Common Phyla")
-    plt.xlabel("Count")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((8, 5))
+    sns.barplot(x=top_phyla.values, y=top_phyla.index, ax=ax)
+    ax.set_title(f"Top {top_n} Most Common Phyla")
+    ax.set_xlabel("Count")
+    fig.tight_layout()
     return fig
 
 def plot_top_orders(df):
     if df.empty:
         return None
-    top_orders = df['order'].value_counts().head(10)
+    top_orders = value_counts(df['order']).head(10)
     if top_orders.empty:
         return None
-    plt.figure(figsize=(8, 5))
-    sns.barplot(x=top_orders.values, y=top_orders.index)
-    plt.title("Top 10 Orders")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((8, 5))
+    sns.barplot(x=top_orders.values, y=top_orders.index, ax=ax)
+    ax.set_title("Top 10 Orders")
+    fig.tight_layout()
     return fig
 
-def plot_species_richness(df):
-    if df.empty or 'decimalLatitude' not in df.columns or 'species' not in df.columns:
-        return None
-    lat_richness = df.groupby('decimalLatitude')['species'].nunique()
-    if lat_richness.empty:
+def plot_species_richness(df, richness=None, band_width=5.0):
+    """Species per latitude band; a latitude x longitude table from latitude_richness draws a heatmap."""
+    if richness is None:
+        if df.empty or 'decimalLatitude' not in df.columns or 'species' not in df.columns:
+            return None
+        richness = latitude_richness(df, band_width)
+    if richness.empty:
         return None
-    plt.figure(figsize=(10, 5))
-    plt.scatter(lat_richness.index, lat_richness.values, alpha=0.6)
-    plt.title("Species Richness Across Latitude")
-    plt.xlabel("Latitude")
-    plt.ylabel("Unique Species Count")
-    plt.grid(True)
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    if isinstance(richness, pd.DataFrame):
+        fig, ax = _figure((12, 6))
+        sns.heatmap(richness.iloc[::-1], cmap='viridis', mask=richness.iloc[::-1] == 0, ax=ax)
+        ax.set_title("Species Richness by Latitude and Longitude Band")
+        ax.set_xlabel("Longitude band start")
+        ax.set_ylabel("Latitude band start")
+    else:
+        fig, ax = _figure((10, 5))
+        ax.bar(richness.index + band_width / 2, richness.values, width=band_width * 0.9, alpha=0.8)
+        ax.set_title("Species Richness Across Latitude")
+        ax.set_xlabel("Latitude")
+        ax.set_ylabel("Unique Species Count")
+        ax.grid(True)
+    fig.tight_layout()
     return fig
 
-def plot_observations_per_year(df):
-    if df.empty or 'event_year' not in df.columns:
-        return None
-    yearly_counts = df['event_year'].value_counts().sort_index()
-    if yearly_counts.empty:
+def plot_observations_per_year(df, counts=None):
+    """Line chart of observations per year; counts may come from CountCube.totals('event_year')."""
+    if counts is None:
+        if df.empty or 'event_year' not in df.columns:
+            return None
+        counts = value_counts(df['event_year']).sort_index()
+    if counts.empty:
         return None
-    plt.figure(figsize=(10, 5))
-    plt.plot(yearly_counts.index, yearly_counts.values, marker='o')
-    plt.title("Observations per Year")
-    plt.xlabel("Year")
-    plt.ylabel("Count")
-    plt.grid(True)
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((10, 5))
+    ax.plot(counts.index, counts.values, marker='o')
+    ax.set_title("Observations per Year")
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Count")
+    ax.grid(True)
+    fig.tight_layout()
     return fig
 
-def plot_observations_per_month(df):
-    if df.empty or 'event_month' not in df.columns:
-        return None
-    monthly_counts = df['event_month'].value_counts().sort_index()
-    if monthly_counts.empty:
+def plot_observations_per_month(df, counts=None):
+    if counts is None:
+        if df.empty or 'event_month' not in df.columns:
+            return None
+        counts = value_counts(df['event_month']).sort_index()
+    if counts.empty:
         return None
-    plt.figure(figsize=(10, 5))
-    sns.barplot(x=monthly_counts.index, y=monthly_counts.values)
-    plt.title("Seasonality: Observations per Month")
-    plt.xlabel("Month")
-    plt.ylabel("Count")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((10, 5))
+    sns.barplot(x=counts.index, y=counts.values, ax=ax)
+    ax.set_title("Seasonality: Observations per Month")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
     return fig
 
-def plot_top_countries(df):
-    if df.empty or 'countryCode' not in df.columns:
-        return None
-    top_countries = df['countryCode'].value_counts().head(15)
+def plot_top_countries(df, counts=None):
+    if counts is None:
+        if df.empty or 'countryCode' not in df.columns:
+            return None
+        counts = value_counts(df['countryCode'])
+    top_countries = counts.head(15)
     if top_countries.empty:
         return None
-    plt.figure(figsize=(8, 6))
-    sns.barplot(x=top_countries.values, y=top_countries.index)
-    plt.title("Top 15 Countries by Observation Count")
-    plt.xlabel("Count")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((8, 6))
+    sns.barplot(x=top_countries.values, y=top_countries.index, ax=ax)
+    ax.set_title("Top 15 Countries by Observation Count")
+    ax.set_xlabel("Count")
+    fig.tight_layout()
     return fig
 
-def plot_top_states(df):
-    if df.empty or 'stateProvince' not in df.columns:
-        return None
-    top_states = df['stateProvince'].value_counts().head(15)
+def plot_top_states(df, counts=None):
+    if counts is None:
+        if df.empty or 'stateProvince' not in df.columns:
+            return None
+        counts = value_counts(df['stateProvince'])
+    top_states = counts.head(15)
     if top_states.empty:
         return None
-    plt.figure(figsize=(8, 6))
-    sns.barplot(x=top_states.values, y=top_states.index)
-    plt.title("Top 15 States/Provinces by Observation Count")
-    plt.xlabel("Count")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((8, 6))
+    sns.barplot(x=top_states.values, y=top_states.index, ax=ax)
+    ax.set_title("Top 15 States/Provinces by Observation Count")
+    ax.set_xlabel("Count")
+    fig.tight_layout()
     return fig
 
 def plot_correlation_heatmap(df):
     if df.empty:
         return None
-    numeric_df = df.select_dtypes(include=['float64', 'int64'])
+    numeric_df = df[[c for c in NUMERIC_COLUMNS if c in df.columns]].select_dtypes(include='number')
     if numeric_df.shape[1] < 2:
         return None
-    plt.figure(figsize=(10, 6))
-    sns.heatmap(numeric_df.corr(), annot=False, cmap='coolwarm')
-    plt.title("Correlation Heatmap for Numerical Variables")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((10, 6))
+    sns.heatmap(numeric_df.corr(), annot=False, cmap='coolwarm', ax=ax)
+    ax.set_title("Correlation Heatmap for Numerical Variables")
+    fig.tight_layout()
     return fig
 
 
-def plot_sunburst(df):
+def plot_sunburst(df, nodes=None, levels=SUNBURST_LEVELS):
+    """Sunburst of the taxonomy over levels.
+
+    nodes is a pruned count tree from HierarchyIndex.tree (built from df when
+    not given), so the chart has a bounded number of wedges at any data size.
+    """
     if df.empty:
         return None
-    # Hierarchy: Kingdom -> Phylum -> Class -> Order
-    # Group by these columns and count
-    cols = ['kingdom', 'phylum', 'class', 'order']
-    # Ensure columns exist
-    valid_cols = [c for c in cols if c in df.columns]
-    if not valid_cols:
+    if nodes is None:
+        levels = [c for c in levels if c in df.columns]
+        if not levels:
+            return None
+        nodes = HierarchyIndex(df).tree(levels)
+    if nodes.empty:
         return None
-        
-    # Limit data for performance if needed, but sunburst handles aggregation well.
-    # However, too many nodes can be slow.
-    # Let's aggregate first.
-    df_grouped = df.groupby(valid_cols).size().reset_index(name='count')
-    
-    fig = px.sunburst(
-        df_grouped,
-        path=valid_cols,
-        values='count',
-        title="Taxonomic Hierarchy (Kingdom -> Order)",
-        height=700
+
+    fig = go.Figure(go.Sunburst(
+        ids=nodes['id'], labels=nodes['label'], parents=nodes['parent'], values=nodes['count'],
+        branchvalues='total',
+    ))
+    fig.update_layout(
+        title=f"Taxonomic Hierarchy ({levels[0].title()} -> {levels[-1].title()})",
+        height=700,
     )
     return fig
 
 def plot_top_genera(df, top_n=10):
     if df.empty or 'genus' not in df.columns:
         return None
-    top_genera = df['genus'].value_counts().head(top_n)
+    top_genera = value_counts(df['genus']).head(top_n)
     if top_genera.empty:
         return None
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=top_genera.values, y=top_genera.index, palette="viridis")
-    plt.title(f"Top {top_n} Genera")
-    plt.xlabel("Count")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((10, 6))
+    sns.barplot(x=top_genera.values, y=top_genera.index, palette="viridis", ax=ax)
+    ax.set_title(f"Top {top_n} Genera")
+    ax.set_xlabel("Count")
+    fig.tight_layout()
     return fig
 
 def plot_top_species(df, top_n=10):
     if df.empty or 'species' not in df.columns:
         return None
-    top_species = df['species'].value_counts().head(top_n)
+    top_species = value_counts(df['species']).head(top_n)
     if top_species.empty:
         return None
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=top_species.values, y=top_species.index, palette="magma")
-    plt.title(f"Top {top_n} Species")
-    plt.xlabel("Count")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((10, 6))
+    sns.barplot(x=top_species.values, y=top_species.index, palette="magma", ax=ax)
+    ax.set_title(f"Top {top_n} Species")
+    ax.set_xlabel("Count")
+    fig.tight_layout()
     return fig
 
 def plot_taxonomy_pie(df, column='kingdom_grouped'):
     if df.empty or column not in df.columns:
         return None
-    counts = df[column].value_counts()
+    counts = value_counts(df[column])
     if counts.empty:
         return None
         
@@ -209,73 +269,119 @@ def plot_taxonomy_pie(df, column='kingdom_grouped'):
     return fig
 
 import folium
-from folium.plugins import MarkerCluster, HeatMap
+from folium.plugins import HeatMap
 from streamlit_folium import st_folium
 
-def plot_folium_map(df, map_type="Cluster"):
-    if df.empty or not {'decimalLatitude', 'decimalLongitude'}.issubset(df.columns):
-        return None
-    
-    # Drop invalid coordinates
+# Folium maps showing at most this many observations draw each one
+DETAIL_POINTS = 500
+
+def _cell_popup(cell):
+    lines = [f"<b>{cell.count:,} observations</b>"]
+    lines += [f"{html.escape(str(name))} ({count:,})" for name, count in cell.top_species]
+    return "<br>".join(lines)
+
+
+def folium_layer(df, map_type="Cluster", zoom=2):
+    """FeatureGroup of the observations with coordinates, drawn for a map at zoom.
+
+    Heatmap weighs every point through zoom-sized weighted cells (see
+    spatial.heat_points). Cluster and Markers draw each observation when
+    there are at most DETAIL_POINTS, otherwise one marker per grid cell (see
+    spatial.grid_for_zoom): every observation is counted while the number of
+    markers stays bounded. Cluster shows each cell's count in a bubble,
+    Markers a circle sized by it; both list the top species in the popup.
+    """
+    layer = folium.FeatureGroup(name="Observations")
     mdf = df.dropna(subset=['decimalLatitude', 'decimalLongitude'])
     if mdf.empty:
-        return None
-        
-    # Center map
-    center_lat = mdf['decimalLatitude'].mean()
-    center_lon = mdf['decimalLongitude'].mean()
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=2)
-    
-    # Limit points for performance if needed (Folium can be slow with > 1000 markers)
-    # Heatmap handles many points well, Cluster handles moderate amount.
-    # Let's cap at 2000 for markers to be safe, but allow more for heatmap.
-    
+        return layer
+
     if map_type == "Heatmap":
-        heat_data = mdf[['decimalLatitude', 'decimalLongitude']].values.tolist()
-        HeatMap(heat_data).add_to(m)
-        
-    elif map_type == "Cluster":
-        marker_cluster = MarkerCluster().add_to(m)
-        # Cap at 1000 for performance in cluster mode if not filtered enough
-        if len(mdf) > 1000:
-            mdf_sampled = mdf.sample(1000)
-        else:
-            mdf_sampled = mdf
-            
-        # Optimize iteration
-        locations = mdf_sampled[['decimalLatitude', 'decimalLongitude']].values.tolist()
-        species_list = mdf_sampled['species'].fillna('Unknown').tolist() if 'species' in mdf_sampled.columns else ['Observation'] * len(mdf_sampled)
-        dates_list = mdf_sampled['eventDate'].astype(str).tolist() if 'eventDate' in mdf_sampled.columns else [''] * len(mdf_sampled)
-        
+        HeatMap(heat_points(mdf, zoom).tolist()).add_to(layer)
+        return layer
+
+    if len(mdf) <= DETAIL_POINTS:
+        locations = mdf[['decimalLatitude', 'decimalLongitude']].values.tolist()
+        species_list = mdf['species'].astype(str).tolist() if 'species' in mdf.columns else ['Observation'] * len(mdf)
+        dates_list = mdf['eventDate'].astype(str).tolist() if 'eventDate' in mdf.columns else [''] * len(mdf)
         for loc, species, date in zip(locations, species_list, dates_list):
-            popup_text = f"{species}<br>{date}"
-            folium.Marker(
-                location=loc,
-                popup=popup_text,
-            ).add_to(marker_cluster)
-            
-    elif map_type == "Markers":
-        # Cap strictly for markers without cluster
-        if len(mdf) > 500:
-            mdf_sampled = mdf.sample(500)
+            folium.CircleMarker(location=loc, radius=5, weight=1, fill=True, fill_opacity=0.8,
+                                popup=f"{html.escape(species)}<br>{html.escape(date)}").add_to(layer)
+        return layer
+
+    grid = grid_for_zoom(mdf, zoom)
+    largest = grid['count'].max()
+    for cell in grid.itertuples(index=False):
+        location = [cell.latitude, cell.longitude]
+        popup = folium.Popup(_cell_popup(cell), max_width=300)
+        if map_type == "Cluster":
+            diameter = int(24 + 24 * np.sqrt(cell.count / largest))
+            icon = folium.DivIcon(
+                html=(f'<div style="width:{diameter}px;height:{diameter}px;line-height:{diameter}px;'
+                      'border-radius:50%;background:rgba(110,204,57,0.75);text-align:center;'
+                      f'font:bold 11px sans-serif">{cell.count:,}</div>'),
+                icon_size=(diameter, diameter), icon_anchor=(diameter // 2, diameter // 2),
+            )
+            folium.Marker(location=location, icon=icon, popup=popup).add_to(layer)
         else:
-            mdf_sampled = mdf
-            
-        # Optimize iteration
-        locations = mdf_sampled[['decimalLatitude', 'decimalLongitude']].values.tolist()
-        species_list = mdf_sampled['species'].fillna('Unknown').tolist() if 'species' in mdf_sampled.columns else ['Observation'] * len(mdf_sampled)
-        
-        for loc, species in zip(locations, species_list):
-            popup_text = f"{species}"
-            folium.Marker(
-                location=loc,
-                popup=popup_text,
-            ).add_to(m)
-            
+            folium.CircleMarker(
+                location=location, radius=float(3 + 12 * np.sqrt(cell.count / largest)),
+                weight=1, fill=True, fill_opacity=0.6, popup=popup, tooltip=f"{cell.count:,} observations",
+            ).add_to(layer)
+    return layer
+
+
+def folium_base_map(df, zoom=2):
+    """Empty Folium map centered on df's observations, or None when none have coordinates."""
+    if df.empty or not {'decimalLatitude', 'decimalLongitude'}.issubset(df.columns):
+        return None
+    mdf = df.dropna(subset=['decimalLatitude', 'decimalLongitude'])
+    if mdf.empty:
+        return None
+    return folium.Map(location=[mdf['decimalLatitude'].mean(), mdf['decimalLongitude'].mean()], zoom_start=zoom)
+
+
+def plot_folium_map(df, map_type="Cluster", zoom=2):
+    """Folium map of df's observations (see folium_layer)."""
+    m = folium_base_map(df, zoom)
+    if m is None:
+        return None
+    folium_layer(df, map_type, zoom).add_to(m)
     return m
 
-def plot_plotly_map(df):
-    # Return a Plotly mapbox scatter if latitude/longitude present
+# Above this many points plot_plotly_map draws a density image of all of them
+SCATTER_MAX_POINTS = 5000
+
+
+def _density_map(df, log_scale=True):
+    """Tile map with every observation rasterized per kingdom (see raster.rasterize) as an image layer."""
+    layers, labels = rasterize(df)
+    source = "data:image/png;base64," + base64.b64encode(png_bytes(composite(layers, log_scale=log_scale))).decode()
+    counts = layers.sum(axis=(1, 2))
+    # Empty traces only carry the legend; the points are all in the image
+    fig = go.Figure([
+        go.Scattermap(lat=[None], lon=[None], mode='markers', name=f"{label} ({count:,})",
+                      marker={'size': 10, 'color': RASTER_COLORS[i % len(RASTER_COLORS)]})
+        for i, (label, count) in enumerate(zip(labels, counts))
+    ])
+    corners = [[-180, MERCATOR_LAT], [180, MERCATOR_LAT], [180, -MERCATOR_LAT], [-180, -MERCATOR_LAT]]
+    fig.update_layout(
+        title=f"Global Observations Distribution ({int(counts.sum()):,} observations)",
+        map={'style': 'carto-positron', 'zoom': 0.5, 'center': {'lat': 20, 'lon': 0},
+             'layers': [{'sourcetype': 'image', 'source': source, 'coordinates': corners}]},
+        height=600, margin={'l': 0, 'r': 0, 't': 40, 'b': 0}, showlegend=True,
+    )
+    return fig
+
+
+def plot_plotly_map(df, log_scale=True):
+    """Global map of the observations.
+
+    Up to SCATTER_MAX_POINTS they are drawn as single markers; above that
+    every point is rasterized into a per-kingdom density image, so the whole
+    selection is visible with a small, fixed-size payload. log_scale applies
+    to the density image.
+    """
     if df.empty or not {'decimalLatitude', 'decimalLongitude'}.issubset(df.columns):
         return None
     
@@ -283,9 +389,8 @@ def plot_plotly_map(df):
     if mdf.empty:
         return None
         
-    # Limit points for performance if too many
-    if len(mdf) > 5000:
-        mdf = mdf.sample(5000)
+    if len(mdf) > SCATTER_MAX_POINTS:
+        return _density_map(mdf, log_scale)
         
     fig = px.scatter_geo(
         mdf,
@@ -298,32 +403,32 @@ def plot_plotly_map(df):
     )
     return fig
 
-def plot_month_year_heatmap(df):
-    if df.empty or 'event_year' not in df.columns or 'event_month' not in df.columns:
-        return None
-    
-    # Pivot table for heatmap
-    heatmap_data = df.pivot_table(index='event_month', columns='event_year', values='gbifID', aggfunc='count')
+def plot_month_year_heatmap(df, counts=None):
+    """Month x year heatmap; counts may be a month-by-year table, e.g. from CountCube."""
+    if counts is None:
+        if df.empty or 'event_year' not in df.columns or 'event_month' not in df.columns:
+            return None
+        # Pivot table for heatmap
+        counts = df.pivot_table(index='event_month', columns='event_year', values='gbifID', aggfunc='count')
     
-    if heatmap_data.empty:
+    if counts.empty:
         return None
         
-    plt.figure(figsize=(12, 6))
-    sns.heatmap(heatmap_data, cmap='YlGnBu', annot=False)
-    plt.title("Observation Frequency: Month vs Year")
-    plt.xlabel("Year")
-    plt.ylabel("Month")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((12, 6))
+    sns.heatmap(counts, cmap='YlGnBu', annot=False, ax=ax)
+    ax.set_title("Observation Frequency: Month vs Year")
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Month")
+    fig.tight_layout()
     return fig
 
-def plot_kingdom_over_time(df):
-    if df.empty or 'event_year' not in df.columns or 'kingdom_grouped' not in df.columns:
-        return None
-        
-    # Group by Year and Kingdom
-    yearly_kingdom = df.groupby(['event_year', 'kingdom_grouped']).size().reset_index(name='count')
+def plot_kingdom_over_time(df, counts=None):
+    if counts is None:
+        if df.empty or 'event_year' not in df.columns or 'kingdom_grouped' not in df.columns:
+            return None
+        # Group by Year and Kingdom
+        counts = df.groupby(['event_year', 'kingdom_grouped'], observed=True).size()
+    yearly_kingdom = counts.reset_index(name='count')
     
     if yearly_kingdom.empty:
         return None
@@ -338,38 +443,38 @@ def plot_kingdom_over_time(df):
     )
     return fig
 
-def plot_country_richness(df):
-    if df.empty or 'countryCode' not in df.columns or 'species' not in df.columns:
-        return None
-        
-    richness = df.groupby('countryCode')['species'].nunique().sort_values(ascending=False).head(15)
+def plot_country_richness(df, richness=None):
+    """Top countries by distinct species; richness may be precomputed (e.g. sketch estimates)."""
+    if richness is None:
+        if df.empty or 'countryCode' not in df.columns or 'species' not in df.columns:
+            return None
+        richness = df.groupby('countryCode', observed=True)['species'].nunique()
+    richness = richness.sort_values(ascending=False).head(15)
+    richness.index = richness.index.astype(str)
     
     if richness.empty:
         return None
         
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=richness.values, y=richness.index, palette="viridis")
-    plt.title("Top 15 Countries by Species Richness")
-    plt.xlabel("Unique Species Count")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((10, 6))
+    sns.barplot(x=richness.values, y=richness.index, palette="viridis", ax=ax)
+    ax.set_title("Top 15 Countries by Species Richness")
+    ax.set_xlabel("Unique Species Count")
+    fig.tight_layout()
     return fig
 
 def plot_state_richness(df):
     if df.empty or 'stateProvince' not in df.columns or 'species' not in df.columns:
         return None
         
-    richness = df.groupby('stateProvince')['species'].nunique().sort_values(ascending=False).head(15)
+    richness = df.groupby('stateProvince', observed=True)['species'].nunique().sort_values(ascending=False).head(15)
+    richness.index = richness.index.astype(str)
     
     if richness.empty:
         return None
         
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=richness.values, y=richness.index, palette="magma")
-    plt.title("Top 15 States by Species Richness")
-    plt.xlabel("Unique Species Count")
-    plt.tight_layout()
-    fig = plt.gcf()
-    plt.close()
+    fig, ax = _figure((10, 6))
+    sns.barplot(x=richness.values, y=richness.index, palette="magma", ax=ax)
+    ax.set_title("Top 15 States by Species Richness")
+    ax.set_xlabel("Unique Species Count")
+    fig.tight_layout()
     return fig
\ No newline at end of file
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_PATH = Path(__file__).parent.parent / "data" / "dataset_sample.csv"
+
+
+def make_gbif_frame(n_rows, n_species=2000, seed=0):
+    """Build a GBIF-shaped frame of n_rows by resampling the bundled sample.
+
+    Identifiers, coordinates and dates are regenerated so every row is unique,
+    and species names are spread over n_species labels to mimic real exports.
+    """
+    rng = np.random.default_rng(seed)
+    sample = pd.read_csv(SAMPLE_PATH)
+    df = sample.iloc[rng.integers(0, len(sample), n_rows)].reset_index(drop=True)
+
+    df['gbifID'] = np.arange(1_000_000, 1_000_000 + n_rows)
+    df['occurrenceID'] = "http://www.inaturalist.org/observations/" + df['gbifID'].astype(str)
+    df['species'] = df['genus'] + " sp" + pd.Series(rng.integers(0, n_species, n_rows)).astype(str)
+    df['decimalLatitude'] = (df['decimalLatitude'] + rng.normal(0, 2, n_rows)).clip(-89.9, 89.9).round(6)
+    df['decimalLongitude'] = (df['decimalLongitude'] + rng.normal(0, 2, n_rows)).clip(-179.9, 179.9).round(6)
+    df['recordedBy'] = "Observer " + pd.Series(rng.integers(0, n_rows // 10 + 1, n_rows)).astype(str)
+
+    dates = pd.Timestamp("2000-01-01") + pd.to_timedelta(rng.integers(0, 24 * 365, n_rows), unit="D")
+    df['eventDate'] = dates.strftime("%Y-%m-%d %H:%M:%S")
+    df['event_year'] = df['year'] = dates.year
+    df['event_month'] = df['month'] = dates.month
+    df['event_day'] = df['day'] = dates.day
+    df['event_day_of_week'] = dates.day_name()
+    return df
@@ -0,0 +1,97 @@
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.cache import FigureCache, ResultCache, filter_key, fingerprint
+
+
+def test_filter_key_normalizes():
+    a = {"kingdom": "Plantae", "phylum": "All", "year_range": [2010, 2020], "has_image": False}
+    b = {"has_image": False, "year_range": (2010, 2020), "kingdom": "Plantae", "state": "All"}
+    assert filter_key(a) == filter_key(b)
+    assert filter_key(a) != filter_key({**a, "has_image": True})
+
+
+def test_hits_misses_and_none_results():
+    cache = ResultCache()
+    calls = []
+    for _ in range(3):
+        assert cache.get('all', lambda: calls.append(1)) is None
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_evicts_least_recently_used_within_budget():
+    cache = ResultCache(max_bytes=3000)
+    for key in 'abc':
+        cache.get(key, lambda: np.zeros(100))  # 800 bytes each
+    cache.get('a', lambda: None)  # touch a, leaving b the oldest
+    cache.get('d', lambda: np.zeros(100))
+    assert cache.nbytes <= 3000
+    assert cache.evictions == 1
+    assert cache.get('b', lambda: 'recomputed') == 'recomputed'
+
+    big = np.zeros(1000)
+    assert cache.get('big', lambda: big) is big
+    assert 'big' not in cache._entries
+
+
+def test_shared_across_threads():
+    cache = ResultCache()
+    results = []
+
+    def session():
+        for i in range(200):
+            results.append(cache.get(i % 10, lambda i=i: np.full(4, i % 10)))
+
+    threads = [threading.Thread(target=session) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 800
+    assert all((r == r[0]).all() for r in results)
+    assert cache.hits + cache.misses == 800
+    assert len(cache) == 10
+
+
+def test_fingerprint_follows_the_data():
+    df = pd.DataFrame({"species": ["a", "b", "c"], "event_year": [2001, 2002, 2003]})
+    assert fingerprint("plot", df) == fingerprint("plot", df.copy())
+    changed = df.copy()
+    changed.loc[1, "species"] = "z"
+    assert fingerprint("plot", df) != fingerprint("plot", changed)
+    assert fingerprint("plot", df) != fingerprint("plot", df.iloc[:2])
+    assert fingerprint("plot", df) != fingerprint("other", df)
+
+
+def test_figure_cache_tiers(tmp_path):
+    renders = []
+
+    def render(data=b"x" * 1000):
+        renders.append(1)
+        return data
+
+    cache = FigureCache(tmp_path, max_disk_bytes=2500)
+    assert cache.get("a", render) == b"x" * 1000
+    assert cache.get("a", render) == b"x" * 1000
+    assert len(renders) == 1
+    assert cache.get("empty", lambda: None) is None
+
+    # A new process finds the figure on disk
+    reloaded = FigureCache(tmp_path, max_disk_bytes=2500)
+    assert reloaded.get("a", render) == b"x" * 1000
+    assert (len(renders), reloaded.disk_hits) == (1, 1)
+
+    for key in "bcd":
+        reloaded.get(key, render)
+    files = [f for f in tmp_path.iterdir()]
+    assert sum(f.stat().st_size for f in files) <= 2500
+    assert (tmp_path / "d").exists()
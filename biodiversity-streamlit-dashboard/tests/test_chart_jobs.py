@@ -0,0 +1,30 @@
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.components.tabs import ChartJobs
+
+
+def test_jobs_render_concurrently_and_place_in_completion_order():
+    placed = []
+
+    def chart(name, seconds):
+        def render():
+            time.sleep(seconds)
+            return name
+        return render
+
+    jobs = ChartJobs()
+    start = time.perf_counter()
+    for name, seconds in [("slow", 0.6), ("fast", 0.1), ("medium", 0.3), ("none", 0.2)]:
+        jobs.add(chart(name, seconds) if name != "none" else lambda: None,
+                 lambda slot, result: placed.append(result))
+    jobs.run()
+    elapsed = time.perf_counter() - start
+
+    assert placed == ["fast", "medium", "slow"]
+    assert elapsed < 1.0  # bounded by the slowest job, not the 1.2s sum
@@ -0,0 +1,102 @@
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.data_loader import read_dataset
+from src.preprocessing import add_event_fields, clean_data, detect_date_format, parse_dates
+from tests.synthetic import make_gbif_frame
+
+
+def legacy_clean_data(df):
+    """Row-wise cleaning the loader used before the shared pipeline."""
+    for col in ['phylum', 'class', 'order', 'family', 'genus', 'species']:
+        df[col] = df[col].fillna("Unknown")
+        df[col] = df[col].str.capitalize()
+    df['countryCode'] = df['countryCode'].fillna("Unknown")
+    df['stateProvince'] = df['stateProvince'].fillna("Unknown").replace("", "Unknown")
+    df = df.drop_duplicates(subset=['gbifID'])
+    df['eventDate'] = pd.to_datetime(df['eventDate'], errors='coerce')
+    return df
+
+
+def _frame(n_rows):
+    df = make_gbif_frame(n_rows)
+    df.loc[::7, 'family'] = None
+    df.loc[::11, 'stateProvince'] = None
+    df.loc[::13, 'species'] = df.loc[::13, 'species'].str.lower()
+    return df
+
+
+def test_matches_legacy_cleaning():
+    df = _frame(5000)
+    expected = legacy_clean_data(df.copy())
+    timings = {}
+    result = clean_data(df.copy(), drop_invalid_coords=False, timings=timings)
+
+    for col in ['family', 'species', 'countryCode', 'stateProvince']:
+        assert result[col].astype(str).tolist() == expected[col].tolist()
+    assert (result['eventDate'] == expected['eventDate']).all()
+    assert set(timings) == {'taxonomy', 'location', 'dates', 'duplicates', 'coordinates'}
+
+
+def test_all_empty_columns_become_unknown(tmp_path):
+    df = make_gbif_frame(50)
+    df['genus'] = None
+    df['stateProvince'] = None
+    result = clean_data(df.copy(), drop_invalid_coords=False)
+    assert (result['genus'] == "Unknown").all()
+    assert (result['stateProvince'] == "Unknown").all()
+
+    # Read back from CSV the empty columns come in as all-NaN floats
+    df.to_csv(tmp_path / "empty.csv", index=False)
+    loaded = read_dataset(tmp_path / "empty.csv", use_snapshot=False)
+    assert (loaded['genus'] == "Unknown").all()
+
+
+def test_bad_fallback_months_are_missing():
+    df = pd.DataFrame({'eventDate': [None, None, None, "2020-07-04"],
+                       'year': [2020, 2020, 2020, 2020], 'month': [13, -1, 200, 13], 'day': [1, 40, 2, 1]})
+    df = add_event_fields(df)
+    assert df['event_month'].isna().tolist() == [True, True, True, False]
+    assert df['event_season'].isna().tolist() == [True, True, True, False]
+    assert df['event_season'].iloc[3] == "Summer"
+    assert df['event_day'].isna().tolist() == [False, True, False, False]
+
+
+def test_parse_dates_mixed_layouts():
+    values = pd.Series(["2014-07-14 00:00:00", "2014-07-15", None, "2014-07-16/2014-07-18"])
+    assert detect_date_format(values) == '%Y-%m-%d %H:%M:%S'
+    parsed = parse_dates(values)
+    assert parsed.iloc[1] == pd.Timestamp("2014-07-15")
+    assert parsed.iloc[2:].isna().all()
+
+
+def _benchmark(legacy_df, unified_df, label):
+    start = time.perf_counter()
+    legacy_clean_data(legacy_df)
+    legacy = time.perf_counter() - start
+
+    timings = {}
+    start = time.perf_counter()
+    clean_data(unified_df, drop_invalid_coords=False, timings=timings)
+    unified = time.perf_counter() - start
+
+    stages = ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in timings.items())
+    print(f"{label}: legacy {legacy:.2f}s -> unified {unified:.2f}s ({legacy / unified:.1f}x)")
+    print(f"  {stages}")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = _frame(rows)
+    text_cols = ['phylum', 'class', 'order', 'family', 'genus', 'species', 'countryCode', 'stateProvince']
+    as_object = df.astype({col: object for col in text_cols})
+    _benchmark(as_object.copy(), as_object.copy(), f"{rows:,} rows, object strings")
+    # The loader hands clean_data categoricals from the declared schema
+    _benchmark(as_object.copy(), df.astype({col: 'category' for col in text_cols}), f"{rows:,} rows, typed schema")
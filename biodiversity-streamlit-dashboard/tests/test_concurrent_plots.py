@@ -0,0 +1,53 @@
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from matplotlib.figure import Figure
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src import visualizations
+from src.data_loader import read_dataset
+
+SAMPLE = read_dataset(project_root / "data" / "dataset_sample.csv", use_snapshot=False)
+
+# Folium maps carry random element ids, so only the charts are compared byte for byte
+CHARTS = [name for name in sorted(visualizations.PLOT_COLUMNS) if name != 'plot_folium_map']
+
+
+def render(name):
+    fig = getattr(visualizations, name)(SAMPLE)
+    if isinstance(fig, Figure):
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+    return fig.to_json()
+
+
+def test_plots_render_identically_from_many_threads():
+    expected = {name: render(name) for name in CHARTS}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda name: (name, render(name)), CHARTS * 3))
+    for name, output in results:
+        assert output == expected[name], name
+
+
+def test_plots_leave_no_pyplot_figures():
+    import matplotlib.pyplot as plt
+
+    for name in CHARTS:
+        render(name)
+    assert plt.get_fignums() == []
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    for workers in (1, threads):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(render, CHARTS * 4))
+        print(f"{workers} thread(s): {len(CHARTS) * 4} charts in {time.perf_counter() - start:.2f}s")
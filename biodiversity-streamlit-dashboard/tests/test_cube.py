@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.cube import CUBE_COLUMNS, CountCube
+from src.metrics import value_counts
+from src.preprocessing import clean_data
+from tests.synthetic import make_gbif_frame
+from tests.test_indexes import _random_filters, chained_filter
+
+
+def _frame(n_rows):
+    df = make_gbif_frame(n_rows)
+    df.loc[::17, 'decimalLatitude'] = None
+    df.loc[::23, 'event_year'] = None
+    df.loc[::29, 'event_month'] = None
+    df = df.astype({'event_year': 'Int16', 'event_month': 'Int8'})
+    return clean_data(df, drop_invalid_coords=False)[[*CUBE_COLUMNS, 'gbifID']]
+
+
+def test_cube_totals_match_row_aggregates():
+    df = _frame(5000)
+    cube = CountCube(df)
+    assert cube.total() == len(df)
+    assert len(cube) < len(df)
+
+    rng = np.random.default_rng(2)
+    for _ in range(50):
+        filters = _random_filters(df, rng)
+        rows = chained_filter(df, filters)
+        view = cube.where(filters)
+        assert view.total() == len(rows)
+
+        assert view.totals('event_year').to_dict() == value_counts(rows['event_year']).to_dict()
+        assert view.top('countryCode', 15).to_dict() == value_counts(rows['countryCode']).head(15).to_dict()
+        by_kingdom = rows.groupby(['event_year', 'kingdom_grouped'], observed=True).size()
+        by_kingdom.index = by_kingdom.index.set_levels(by_kingdom.index.levels[1].astype(str), level=1)
+        assert view.totals(['event_year', 'kingdom_grouped']).to_dict() == by_kingdom.to_dict()
+
+
+def test_heatmap_table_matches_pivot():
+    df = _frame(2000)
+    expected = df.pivot_table(index='event_month', columns='event_year', values='gbifID', aggfunc='count')
+    table = CountCube(df[CUBE_COLUMNS]).totals(['event_month', 'event_year']).unstack('event_year')
+    pd.testing.assert_frame_equal(table.astype(float), expected.astype(float), check_names=False,
+                                  check_index_type=False, check_column_type=False)
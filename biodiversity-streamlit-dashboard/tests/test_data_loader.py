@@ -1,6 +1,12 @@
+import os
+import shutil
+
 import pytest
 import pandas as pd
-from src.data_loader import load_data
+from src import data_loader
+from src.data_loader import (
+    SeenIds, load_data, open_dataset, read_dataset, snapshot_is_fresh, snapshot_path, stream_csv_to_parquet,
+)
 
 def test_load_data():
     # Test loading the dataset
@@ -20,4 +26,113 @@ def test_load_data_missing_values():
     df = load_data("data/dataset_sample.csv")
     # We expect taxonomy columns to be filled, but numeric columns might still have NaNs
     assert not df['species'].isnull().any(), "Species column should not have missing values"
-    assert not df['kingdom'].isnull().any(), "Kingdom column should not have missing values"
\ No newline at end of file
+    assert not df['kingdom'].isnull().any(), "Kingdom column should not have missing values"
+
+def _copy_sample(tmp_path):
+    target = tmp_path / "gbif_cleaned.csv"
+    shutil.copyfile("data/dataset_sample.csv", target)
+    return target
+
+def test_snapshot_written_and_reused(tmp_path):
+    csv_path = _copy_sample(tmp_path)
+    df = read_dataset(csv_path)
+    assert snapshot_path(csv_path).exists()
+    assert snapshot_is_fresh(csv_path)
+
+    cached = read_dataset(csv_path)
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), cached, check_dtype=False)
+
+def test_snapshot_invalidated_by_content_change(tmp_path):
+    csv_path = _copy_sample(tmp_path)
+    read_dataset(csv_path)
+
+    lines = csv_path.read_text().splitlines(keepends=True)
+    csv_path.write_text("".join(lines[:-1]))
+    assert not snapshot_is_fresh(csv_path)
+    assert len(read_dataset(csv_path)) == len(lines) - 2
+
+def test_snapshot_survives_touch(tmp_path):
+    csv_path = _copy_sample(tmp_path)
+    read_dataset(csv_path)
+
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert snapshot_is_fresh(csv_path)
+
+def test_snapshot_invalidated_by_version(tmp_path, monkeypatch):
+    csv_path = _copy_sample(tmp_path)
+    read_dataset(csv_path)
+
+    monkeypatch.setattr(data_loader, "SNAPSHOT_VERSION", data_loader.SNAPSHOT_VERSION + 1)
+    assert not snapshot_is_fresh(csv_path)
+
+def test_seen_ids():
+    seen = SeenIds()
+    assert seen.add_new([3, 1, 2]).all()
+    assert seen.add_new([2, 4, 5, 1]).tolist() == [False, True, True, False]
+    assert seen.add_new([6]).all()
+    assert len(seen) == 6
+    assert seen.contains([1, 6, 7]).tolist() == [True, True, False]
+
+def test_stream_csv_to_parquet(tmp_path):
+    sample = pd.read_csv("data/dataset_sample.csv")
+    sample.loc[0, 'decimalLatitude'] = 95.0
+    sample.loc[1, ['decimalLatitude', 'decimalLongitude']] = 0.0
+    # Repeat a block of rows so duplicates span chunk boundaries
+    source = pd.concat([sample, sample.iloc[10:30]], ignore_index=True)
+    csv_path = tmp_path / "export.csv"
+    source.to_csv(csv_path, index=False)
+
+    out_path = tmp_path / "export.parquet"
+    stats = stream_csv_to_parquet(csv_path, out_path, chunksize=7)
+    assert stats['rows_read'] == len(source)
+    assert stats['duplicates'] == 20
+    assert stats['invalid_coords'] == 2
+
+    streamed = pd.read_parquet(out_path)
+    assert len(streamed) == stats['rows_written'] == len(sample) - 2
+    assert streamed['gbifID'].is_unique
+    assert streamed['species'].dtype == 'category'
+
+    expected = read_dataset(csv_path, use_snapshot=False)
+    expected = expected[~expected['gbifID'].isin(sample['gbifID'].iloc[:2])]
+    assert sorted(streamed['species'].astype(str)) == sorted(expected['species'].astype(str))
+
+def test_large_source_snapshot_is_streamed(tmp_path, monkeypatch):
+    csv_path = _copy_sample(tmp_path)
+    monkeypatch.setattr(data_loader, "STREAM_THRESHOLD_BYTES", 0)
+    monkeypatch.setattr(data_loader, "STREAM_CHUNKSIZE", 10)
+    streamed = read_dataset(csv_path)
+    assert snapshot_is_fresh(csv_path)
+    assert len(streamed) == len(read_dataset(csv_path, use_snapshot=False))
+
+def test_stale_large_source_opens_without_loading(tmp_path, monkeypatch):
+    csv_path = _copy_sample(tmp_path)
+    monkeypatch.setattr(data_loader, "STREAM_THRESHOLD_BYTES", 0)
+    monkeypatch.setattr(data_loader, "STREAM_CHUNKSIZE", 10)
+
+    def read_whole(*args, **kwargs):
+        raise AssertionError("open_dataset should not read the whole dataset")
+
+    monkeypatch.setattr(data_loader, "read_dataset", read_whole)
+    dataset = open_dataset(csv_path)
+    assert snapshot_is_fresh(csv_path)
+    assert dataset.loaded_columns == []
+    assert dataset.frame(['species'])['species'].dtype == 'category'
+
+def test_lazy_dataset_reads_columns_on_demand(tmp_path):
+    csv_path = _copy_sample(tmp_path)
+    dataset = open_dataset(csv_path)
+    assert dataset.loaded_columns == []
+
+    overview = dataset.frame(['kingdom_grouped', 'species'])
+    assert list(overview.columns) == ['kingdom_grouped', 'species']
+    assert dataset.loaded_columns == ['kingdom_grouped', 'species']
+
+    dataset.frame(['species', 'event_year', 'not_a_column'])
+    assert dataset.loaded_columns == ['kingdom_grouped', 'species', 'event_year']
+
+    full = dataset.frame()
+    expected = read_dataset(csv_path)
+    assert list(full.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(full, expected.reset_index(drop=True))
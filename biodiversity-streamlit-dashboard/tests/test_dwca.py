@@ -0,0 +1,77 @@
+import sys
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.data_loader import read_dataset
+from src.preprocessing import read_dwca
+from src.store import OccurrenceStore
+from tests.synthetic import make_gbif_frame
+
+DERIVED = ['event_year', 'event_month', 'event_day', 'event_day_of_week', 'event_season', 'kingdom_grouped']
+
+META = """<?xml version="1.0" encoding="utf-8"?>
+<archive xmlns="http://rs.tdwg.org/dwc/text/" metadata="metadata.xml">
+  <core encoding="UTF-8" fieldsTerminatedBy="\\t" linesTerminatedBy="\\n" fieldsEnclosedBy=""
+        ignoreHeaderLines="1" rowType="http://rs.tdwg.org/dwc/terms/Occurrence">
+    <files><location>occurrence.txt</location></files>
+    <id index="0" />
+  </core>
+</archive>
+"""
+
+
+def _archive(tmp_path, df, name="download.zip", meta=True):
+    """Zip df as a raw DwC-A download: no derived columns, extra unused terms."""
+    raw = df.drop(columns=DERIVED).assign(occurrenceRemarks='seen "near" the river', license='CC_BY_4_0')
+    path = tmp_path / name
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('occurrence.txt', raw.to_csv(sep='\t', index=False))
+        if meta:
+            zf.writestr('meta.xml', META)
+    return path
+
+
+def test_read_dwca_derives_event_fields(tmp_path):
+    df = make_gbif_frame(500)
+    df.loc[::50, 'kingdom'] = "Chromista"
+    chunks = list(read_dwca(_archive(tmp_path, df), columns=['gbifID', 'kingdom', 'eventDate'], chunksize=200))
+    assert len(chunks) == 3
+    result = pd.concat(chunks, ignore_index=True)
+
+    assert 'license' not in result.columns
+    assert result['event_year'].tolist() == df['event_year'].tolist()
+    assert result['event_month'].tolist() == df['event_month'].tolist()
+    assert result['event_day_of_week'].astype(str).tolist() == df['event_day_of_week'].tolist()
+    seasons = {12: 'Winter', 1: 'Winter', 2: 'Winter', 3: 'Spring', 4: 'Spring', 5: 'Spring',
+               6: 'Summer', 7: 'Summer', 8: 'Summer', 9: 'Fall', 10: 'Fall', 11: 'Fall'}
+    assert result['event_season'].astype(str).tolist() == df['event_month'].map(seasons).tolist()
+    assert (result['kingdom_grouped'].astype(str)[::50] == "Other").all()
+
+
+def test_read_dwca_year_fallback(tmp_path):
+    df = make_gbif_frame(20)
+    df.loc[:4, 'eventDate'] = None
+    result = next(read_dwca(_archive(tmp_path, df, meta=False)))
+    assert result['event_year'].tolist() == df['year'].tolist()
+    assert result['event_day_of_week'][:5].isna().all()
+
+
+def test_archive_loads_and_ingests(tmp_path):
+    df = make_gbif_frame(300)
+    path = _archive(tmp_path, df)
+
+    loaded = read_dataset(path)
+    assert len(loaded) == 300
+    assert loaded['species'].dtype == 'category'
+    assert str(loaded['event_year'].dtype) == 'Int16'
+    assert (tmp_path / "download.parquet").exists()
+
+    store = OccurrenceStore(tmp_path / "store")
+    assert store.ingest(path, chunksize=100)['inserted'] == 300
+    assert store.counts()['count'].sum() == 300
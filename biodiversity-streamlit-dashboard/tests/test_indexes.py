@@ -0,0 +1,207 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.indexes import FILTER_INDEX_COLUMNS, TREE_ID_SEPARATOR, DateIndex, FilterIndex, HierarchyIndex, paginate
+from src.preprocessing import clean_data
+from tests.synthetic import make_gbif_frame
+
+
+def chained_filter(df, filters):
+    """The per-rerun boolean masks app.main applied before FilterIndex."""
+    if filters["kingdom"] != "All":
+        df = df[df["kingdom_grouped"] == filters["kingdom"]]
+    if filters["phylum"] != "All":
+        df = df[df["phylum"] == filters["phylum"]]
+    if filters["country"] != "All":
+        df = df[df["countryCode"] == filters["country"]]
+    if filters["state"] != "All":
+        df = df[df["stateProvince"] == filters["state"]]
+    if filters["year_range"]:
+        df = df[(df["event_year"] >= filters["year_range"][0]) & (df["event_year"] <= filters["year_range"][1])]
+    if filters["has_image"]:
+        df = df[df['mediaType'].str.contains('StillImage', na=False)]
+    if filters["valid_coords"]:
+        df = df.dropna(subset=['decimalLatitude', 'decimalLongitude'])
+    return df
+
+
+def _frame(n_rows):
+    df = make_gbif_frame(n_rows)
+    df.loc[::17, 'decimalLatitude'] = None
+    df.loc[::23, 'event_year'] = None
+    df['event_year'] = df['event_year'].astype('Int16')
+    return clean_data(df, drop_invalid_coords=False)[FILTER_INDEX_COLUMNS]
+
+
+def _random_filters(df, rng):
+    def pick(col):
+        return rng.choice(["All", str(df[col].iloc[rng.integers(len(df))])])
+
+    first = int(rng.integers(2000, 2024))
+    return {
+        "kingdom": pick('kingdom_grouped'),
+        "phylum": pick('phylum'),
+        "country": pick('countryCode'),
+        "state": pick('stateProvince'),
+        "year_range": (first, first + int(rng.integers(0, 24))) if rng.random() < 0.7 else None,
+        "has_image": bool(rng.random() < 0.5),
+        "valid_coords": bool(rng.random() < 0.5),
+    }
+
+
+def test_select_matches_chained_masks():
+    df = _frame(5000)
+    index = FilterIndex(df)
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        filters = _random_filters(df, rng)
+        expected = chained_filter(df, filters)
+        rows = index.select(filters)
+        result = df if rows is None else df.take(rows)
+        pd.testing.assert_frame_equal(result, expected)
+
+
+def test_select_unfiltered_and_unknown_values():
+    df = _frame(500)
+    index = FilterIndex(df)
+    filters = {"kingdom": "All", "phylum": "All", "country": "All", "state": "All",
+               "year_range": None, "has_image": False, "valid_coords": False}
+    assert index.select(filters) is None
+    assert len(index.select({**filters, "country": "Atlantis"})) == 0
+
+
+def test_hierarchy_matches_unique_scans():
+    df = clean_data(make_gbif_frame(3000), drop_invalid_coords=False)
+    df.loc[::9, 'genus'] = "Unknown"
+    hierarchy = HierarchyIndex(df)
+
+    def scan(level, **selected):
+        rows = df
+        for col, value in selected.items():
+            rows = rows[rows[col] == value]
+        return sorted(rows[level].unique().tolist())
+
+    assert hierarchy.options('kingdom_grouped') == scan('kingdom_grouped')
+    for kingdom in scan('kingdom_grouped'):
+        assert hierarchy.options('phylum', {'kingdom_grouped': kingdom}) == scan('phylum', kingdom_grouped=kingdom)
+    for country in scan('countryCode')[:5]:
+        assert hierarchy.options('stateProvince', {'countryCode': country}) == scan('stateProvince', countryCode=country)
+    for family in scan('family')[:5]:
+        selected = {'kingdom_grouped': "All", 'family': family, 'genus': "Unknown"}
+        assert hierarchy.options('species', selected) == scan('species', family=family, genus="Unknown")
+
+    counts = hierarchy.counts('countryCode')
+    assert counts.sum() == len(df)
+    assert counts.to_dict() == df['countryCode'].astype(str).value_counts().to_dict()
+
+
+def test_hierarchy_tree_prunes_into_other():
+    df = clean_data(make_gbif_frame(5000), drop_invalid_coords=False)
+    hierarchy = HierarchyIndex(df)
+    levels = ['kingdom', 'phylum', 'class', 'order', 'family', 'genus']
+    nodes = hierarchy.tree(levels, top_k=3, max_level_nodes=20)
+
+    depth = nodes['id'].str.count(TREE_ID_SEPARATOR)
+    other = nodes['label'] == "Other"
+    # Each ring, plus the unexpanded "Other" wedges inside it, covers every observation
+    for d in range(len(levels)):
+        assert nodes.loc[depth == d, 'count'].sum() + nodes.loc[other & (depth < d), 'count'].sum() == len(df)
+    assert nodes['id'].is_unique
+    assert (nodes[~other].groupby('parent').size() <= 3).all()
+    assert (depth[~other].value_counts() <= 20).all()
+    assert other.any()
+    # Every parent is a node of the level above, except the roots
+    assert set(nodes.loc[depth > 0, 'parent']) <= set(nodes.loc[~other, 'id'])
+
+    family = df['family'].iloc[0]
+    subtree = hierarchy.tree(['family', 'genus', 'species'], {'family': family, 'order': "All"})
+    assert subtree.loc[subtree['parent'] == "", 'label'].tolist() == [family]
+    assert subtree.loc[subtree['parent'] == "", 'count'].item() == (df['family'] == family).sum()
+
+    # Levels outside the first table are looked up in the table that holds them
+    regions = hierarchy.tree(['countryCode', 'stateProvince'])
+    roots = regions[regions['parent'] == ""]
+    assert roots['count'].sum() == len(df)
+    assert set(roots['label']) <= set(df['countryCode'].astype(str)) | {"Other"}
+
+
+def test_hierarchy_tree_keeps_a_taxon_named_other():
+    df = pd.DataFrame({
+        'family': ["Felidae"] * 6,
+        'genus': ["Panthera", "Panthera", "Other", "Other", "Lynx", "Felis"],
+    })
+    nodes = HierarchyIndex(df).tree(['family', 'genus'], top_k=2)
+    assert nodes['id'].is_unique
+    genera = nodes[nodes['parent'] != ""]
+    assert sorted(genera['label']) == ["Other", "Other", "Panthera"]
+    assert genera['count'].sum() == 6
+
+
+def test_date_index_lookups():
+    df = make_gbif_frame(3000)[['event_year', 'event_month', 'event_day']]
+    df.loc[::31, 'event_day'] = None
+    df.loc[1, ['event_month', 'event_day']] = [2, 30]
+    index = DateIndex(df)
+    dates = pd.to_datetime(df.rename(columns={'event_year': 'year', 'event_month': 'month', 'event_day': 'day'}),
+                           errors='coerce')
+    assert len(index) == dates.notna().sum()
+
+    day = dates.dropna().iloc[10]
+    rows = index.on(day.year, day.month, day.day)
+    assert rows.tolist() == np.flatnonzero(dates == day).tolist()
+    assert len(index.on(2010, 2, 30)) == 0
+
+    start, end = pd.Timestamp("2005-03-01"), pd.Timestamp("2006-02-28")
+    rows = index.between(start.date(), end.date())
+    assert sorted(rows.tolist()) == np.flatnonzero((dates >= start) & (dates <= end)).tolist()
+    assert dates.iloc[rows].is_monotonic_increasing
+
+    rows = index.on_calendar_day(7, 14)
+    expected = (dates.dt.month == 7) & (dates.dt.day == 14)
+    assert sorted(rows.tolist()) == np.flatnonzero(expected).tolist()
+    assert dates.iloc[rows].is_monotonic_increasing
+    assert index.years == sorted(dates.dropna().dt.year.unique().tolist(), reverse=True)
+
+    # Restricting to filtered rows matches an index built from them
+    rows = np.flatnonzero(df['event_month'].to_numpy() % 3 == 0)
+    restricted, rebuilt = index.where(rows), DateIndex(df.take(rows))
+    for name in ['rows', 'days', 'calendar_rows', 'calendar_days']:
+        assert getattr(restricted, name).tolist() == getattr(rebuilt, name).tolist()
+    assert restricted.years == rebuilt.years
+    assert index.where(None) is index
+
+    old = DateIndex(pd.DataFrame({'event_year': [1969, 1890, None], 'event_month': [12, 5, 1], 'event_day': [31, 2, 1]}))
+    assert old.rows.tolist() == [1, 0] and old.years == [1969, 1890]
+
+    page, pages = paginate(np.arange(250), 3, 100)
+    assert (page.tolist(), pages) == (list(range(200, 250)), 3)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    df = _frame(rows)
+    start = time.perf_counter()
+    index = FilterIndex(df)
+    print(f"{rows:,} rows: index built in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(1)
+    chained = indexed = 0.0
+    for _ in range(20):
+        filters = _random_filters(df, rng)
+        start = time.perf_counter()
+        chained_filter(df, filters)
+        chained += time.perf_counter() - start
+        start = time.perf_counter()
+        selected = index.select(filters)
+        if selected is not None:
+            df.take(selected)
+        indexed += time.perf_counter() - start
+    print(f"per filter change: chained masks {chained / 20 * 1000:.0f} ms -> index {indexed / 20 * 1000:.0f} ms")
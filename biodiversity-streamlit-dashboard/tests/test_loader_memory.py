@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.data_loader import memory_report, read_csv_typed
+from tests.synthetic import make_gbif_frame
+
+
+def test_typed_schema_dtypes(tmp_path):
+    csv_path = tmp_path / "gbif.csv"
+    make_gbif_frame(1000).to_csv(csv_path, index=False)
+    df = read_csv_typed(csv_path)
+
+    assert df['kingdom_grouped'].dtype == 'category'
+    assert df['species'].dtype == 'category'
+    assert df['decimalLatitude'].dtype == 'float32'
+    assert str(df['event_year'].dtype) == 'Int16'
+    assert str(df['event_month'].dtype) == 'Int8'
+
+
+def test_memory_report(tmp_path):
+    csv_path = tmp_path / "gbif.csv"
+    make_gbif_frame(20_000).to_csv(csv_path, index=False)
+    report = memory_report(csv_path)
+
+    print(report.sort_values('inferred_bytes', ascending=False).to_string())
+    assert report.loc['Total', 'typed_bytes'] < report.loc['Total', 'inferred_bytes']
+
+
+if __name__ == "__main__":
+    import tempfile
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "gbif.csv"
+        make_gbif_frame(rows).to_csv(csv_path, index=False)
+        report = memory_report(csv_path)
+        print(report.sort_values('inferred_bytes', ascending=False).to_string())
+        total = report.loc['Total']
+        print(f"\n{rows:,} rows: {total['inferred_bytes'] / 2**20:.1f} MiB inferred -> "
+              f"{total['typed_bytes'] / 2**20:.1f} MiB typed ({total['ratio']}x smaller)")
@@ -0,0 +1,103 @@
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src import metrics
+from src.cache import ResultCache
+from src.data_loader import GBIF_SCHEMA
+from src.preprocessing import clean_data
+from tests.synthetic import make_gbif_frame
+
+
+def scan_overview(df):
+    """The separate scans the Overview tab made before overview_summary."""
+    return {
+        'species': metrics.species_count(df),
+        'genera': metrics.genera_count(df),
+        'families': metrics.families_count(df),
+        'countries': df['countryCode'].nunique(),
+        'observers': metrics.observers_count(df),
+        'images': metrics.images_count(df),
+        'kingdoms': metrics.kingdom_distribution(df),
+        'phyla': metrics.value_counts(df['phylum']),
+    }
+
+
+def _frame(n_rows):
+    df = make_gbif_frame(n_rows)
+    df.loc[::5, 'mediaType'] = None
+    df.loc[::7, 'recordedBy'] = None
+    categorical = {col: dtype for col, dtype in GBIF_SCHEMA.items() if dtype == 'category' and col in df.columns}
+    return clean_data(df.astype(categorical), drop_invalid_coords=False)
+
+
+def test_summary_matches_separate_scans():
+    df = _frame(5000)
+    summary = metrics.overview_summary(df)
+    expected = scan_overview(df)
+
+    assert summary.observations == len(df)
+    for name in ['species', 'genera', 'families', 'countries', 'observers', 'images']:
+        assert getattr(summary, name) == expected[name], name
+    assert summary.kingdoms.to_dict() == expected['kingdoms'].to_dict()
+    assert summary.phyla.to_dict() == expected['phyla'].to_dict()
+    assert summary.phyla.is_monotonic_decreasing
+
+
+def test_summary_of_filtered_and_empty_frames():
+    df = _frame(500)
+    subset = df[df['kingdom_grouped'] == df['kingdom_grouped'].iloc[0]]
+    summary = metrics.overview_summary(subset)
+    assert summary.species == subset['species'].nunique()
+    assert list(summary.kingdoms.index) == [df['kingdom_grouped'].iloc[0]]
+
+    empty = metrics.overview_summary(df.iloc[:0])
+    assert (empty.observations, empty.species, empty.images, len(empty.phyla)) == (0, 0, 0, 0)
+
+
+def test_latitude_richness_matches_band_groupby():
+    df = _frame(5000)
+    df.loc[::13, 'decimalLatitude'] = None
+    richness = metrics.latitude_richness(df, band_width=10)
+    bands = (df['decimalLatitude'] // 10 * 10).clip(upper=80)
+    expected = df.groupby(bands, observed=True)['species'].nunique()
+    assert richness.to_dict() == {int(k): v for k, v in expected[expected > 0].items()}
+
+    table = metrics.latitude_richness(df, band_width=10, lon_band_width=30)
+    assert table.index.isin(richness.index).all()
+    lon_bands = (df['decimalLongitude'] // 30 * 30).clip(upper=150)
+    cell = df[(bands == table.index[0]) & (lon_bands == table.columns[0])]
+    assert table.iloc[0, 0] == cell['species'].nunique()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    df = _frame(rows)
+
+    start = time.perf_counter()
+    scan_overview(df)
+    scans = time.perf_counter() - start
+
+    start = time.perf_counter()
+    metrics.overview_summary(df)
+    single = time.perf_counter() - start
+    print(f"{rows:,} rows: separate scans {scans:.2f}s -> single pass {single:.2f}s ({scans / single:.1f}x)")
+
+    # Reruns and other sessions with the same filters hit the cached summary
+    cache = ResultCache()
+    cache.get('overview', lambda: metrics.overview_summary(df))
+    start = time.perf_counter()
+    cache.get('overview', lambda: metrics.overview_summary(df))
+    print(f"cached summary: {(time.perf_counter() - start) * 1e6:.0f} us")
+
+    start = time.perf_counter()
+    df.groupby('decimalLatitude')['species'].nunique()
+    raw = time.perf_counter() - start
+    start = time.perf_counter()
+    metrics.latitude_richness(df, band_width=1)
+    banded = time.perf_counter() - start
+    print(f"latitude richness: raw-latitude groupby {raw:.2f}s -> 1 degree bands {banded:.2f}s")
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.data_loader import partition_paths, read_dataset, read_partitions, source_version
+from tests.synthetic import make_gbif_frame
+
+
+def _write_partitions(directory, n_parts, rows_per_part, overlap=0):
+    directory.mkdir(exist_ok=True)
+    for i in range(n_parts):
+        part = make_gbif_frame(rows_per_part, seed=i)
+        part['gbifID'] += i * (rows_per_part - overlap)
+        sep = '\t' if i % 2 else ','
+        part.to_csv(directory / f"occurrence-{i:03d}.csv", index=False, sep=sep)
+    return directory
+
+
+def test_partitions_merge_with_global_dedup(tmp_path):
+    directory = _write_partitions(tmp_path / "export", n_parts=3, rows_per_part=40, overlap=10)
+    df = read_partitions(partition_paths(directory), max_workers=2)
+
+    assert len(df) == 3 * 40 - 2 * 10
+    assert df['gbifID'].is_unique
+    assert df['species'].dtype == 'category'
+    assert df['kingdom_grouped'].dtype == 'category'
+    # First partition wins for duplicated ids
+    first = pd.read_csv(directory / "occurrence-000.csv")
+    merged = df.set_index('gbifID').loc[first['gbifID'], 'species'].astype(str)
+    assert merged.tolist() == first['species'].str.capitalize().tolist()
+
+
+def test_glob_and_directory_sources(tmp_path):
+    directory = _write_partitions(tmp_path / "export", n_parts=2, rows_per_part=20)
+    (directory / "notes.md").write_text("not a partition")
+
+    assert len(partition_paths(directory)) == 2
+    assert partition_paths(directory / "occurrence-001.*") == [str(directory / "occurrence-001.csv")]
+    assert partition_paths(directory / "occurrence-000.csv") is None
+
+    assert len(read_dataset(str(directory / "*.csv"))) == 40
+    version = source_version(directory)
+    stat = os.stat(directory / "occurrence-001.csv")
+    os.utime(directory / "occurrence-001.csv", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert source_version(directory) != version
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    parts = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = _write_partitions(Path(tmp) / "export", parts, rows)
+        baseline = None
+        workers = 1
+        while workers <= min(parts, os.cpu_count() or 1):
+            start = time.perf_counter()
+            read_partitions(partition_paths(directory), max_workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>3} workers: {elapsed:.2f}s ({baseline / elapsed:.1f}x)")
+            workers *= 2
@@ -0,0 +1,91 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src import visualizations
+from src.raster import RASTER_COLORS, composite, mercator_pixels, rasterize
+
+
+def _frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'decimalLatitude': rng.uniform(-89, 89, n_rows),
+        'decimalLongitude': rng.uniform(-180, 180, n_rows),
+        'kingdom_grouped': rng.choice(['Animalia', 'Plantae', 'Fungi'], n_rows),
+    })
+
+
+def test_rasterize_counts_every_point_on_the_map():
+    df = _frame(50000)
+    df.loc[::11, 'decimalLongitude'] = None
+    layers, labels = rasterize(df, size=128)
+    assert layers.shape == (3, 128, 128)
+    on_map = df['decimalLongitude'].notna() & (df['decimalLatitude'].abs() <= 85.05112878)
+    assert layers.sum() == on_map.sum()
+    for label, layer in zip(labels, layers):
+        assert layer.sum() == (on_map & (df['kingdom_grouped'] == label)).sum()
+    assert mercator_pixels(np.array([0.0]), np.array([0.0]), 128)[0] == 64 * 128 + 64
+
+
+def test_unused_categories_get_no_layer():
+    df = _frame(1000)
+    df['kingdom_grouped'] = pd.Categorical(df['kingdom_grouped'], categories=['Animalia', 'Bacteria', 'Fungi', 'Plantae'])
+    # Fungi only occurs off the Web Mercator square
+    df.loc[df['kingdom_grouped'] == 'Fungi', 'decimalLatitude'] = 89.0
+    layers, labels = rasterize(df, size=64)
+    assert labels == ['Animalia', 'Plantae']
+    assert len(layers) == 2 and (layers.sum(axis=(1, 2)) > 0).all()
+
+    df['decimalLatitude'] = 89.0
+    layers, labels = rasterize(df, size=64)
+    assert layers.shape == (0, 64, 64) and labels == []
+    assert composite(layers)[..., 3].max() == 0
+
+
+def test_missing_groups_get_their_own_layer():
+    df = _frame(1000)
+    df.loc[::4, 'kingdom_grouped'] = None
+    layers, labels = rasterize(df, size=64)
+    assert sorted(labels[:3]) == ['Animalia', 'Fungi', 'Plantae'] and labels[3] == 'Unknown'
+    assert layers.sum() == (df['decimalLatitude'].abs() <= 85.05112878).sum()
+    assert layers[3].sum() == (df['kingdom_grouped'].isna() & (df['decimalLatitude'].abs() <= 85.05112878)).sum()
+
+
+def test_composite_colours_and_transparency():
+    layers = np.zeros((2, 4, 4), dtype=np.int64)
+    layers[0, 0, 0] = 10
+    layers[1, 3, 3] = 5
+    image = composite(layers)
+    assert image.shape == (4, 4, 4) and image.dtype == np.uint8
+    assert image[1, 1, 3] == 0
+    assert image[0, 0, :3].tolist() == [int(RASTER_COLORS[0][i:i + 2], 16) for i in (1, 3, 5)]
+    assert image[3, 3, 3] == 255
+
+
+def test_large_selections_become_a_density_image():
+    small = visualizations.plot_plotly_map(_frame(100))
+    assert small.layout.map.layers == ()
+    fig = visualizations.plot_plotly_map(_frame(visualizations.SCATTER_MAX_POINTS + 1))
+    assert fig.layout.map.layers[0].sourcetype == 'image'
+    assert len(fig.data) == 3
+
+    df = _frame(visualizations.SCATTER_MAX_POINTS + 1)
+    df['kingdom_grouped'] = pd.Categorical(df['kingdom_grouped'], categories=['Animalia', 'Bacteria', 'Fungi', 'Plantae'])
+    fig = visualizations.plot_plotly_map(df)
+    assert [trace.name.split(' (')[0] for trace in fig.data] == ['Animalia', 'Fungi', 'Plantae']
+
+
+if __name__ == "__main__":
+    for rows in (100_000, 1_000_000, 10_000_000):
+        df = _frame(rows)
+        start = time.perf_counter()
+        fig = visualizations.plot_plotly_map(df)
+        built = time.perf_counter() - start
+        print(f"{rows:>10,} points: density map in {built:.2f}s, {len(fig.to_json()) / 2**10:.0f} KiB")
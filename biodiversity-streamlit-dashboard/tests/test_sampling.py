@@ -0,0 +1,73 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.sampling import stratified_sample, stratum_count
+from tests.synthetic import make_gbif_frame
+
+
+def _frame(n_rows):
+    df = make_gbif_frame(n_rows)[['species', 'countryCode', 'decimalLatitude', 'decimalLongitude']]
+    # Few, unevenly common species so strata have very different sizes
+    rng = np.random.default_rng(0)
+    weights = 1 / np.arange(1, 151)
+    df['species'] = rng.choice([f"Species {i}" for i in range(150)], n_rows, p=weights / weights.sum())
+    df['countryCode'] = rng.choice(["US", "CA", "MX", "BR", "AU"], n_rows, p=[0.6, 0.2, 0.1, 0.07, 0.03])
+    # A rare species seen once
+    df.loc[n_rows // 2, 'species'] = "Rarus singularis"
+    return df
+
+
+def test_sample_is_deterministic_and_bounded():
+    df = _frame(20000)
+    rows = stratified_sample(df, 2000)
+    assert len(rows) <= 2000
+    assert np.array_equal(rows, stratified_sample(df, 2000))
+    assert np.all(np.diff(rows) > 0)
+    assert not np.array_equal(rows, stratified_sample(df, 2000, seed=1))
+    assert np.array_equal(stratified_sample(df.head(100), 2000), np.arange(100))
+
+
+def test_every_stratum_is_represented():
+    df = _frame(20000)
+    rows = stratified_sample(df, 3000)
+    sample = df.take(rows)
+    strata = df.groupby(['species', 'countryCode'], dropna=False, observed=True).size()
+    assert stratum_count(df) == len(strata) < 3000
+    assert len(sample.groupby(['species', 'countryCode'], dropna=False, observed=True)) == len(strata)
+    assert "Rarus singularis" in set(sample['species'])
+    # The rest of the budget follows stratum sizes
+    assert len(rows) > 0.9 * 3000
+
+
+def test_more_strata_than_budget_keeps_one_row_each():
+    df = _frame(20000)
+    n_strata = stratum_count(df)
+    rows = stratified_sample(df, n_strata // 2)
+    sample = df.take(rows)
+    assert len(rows) == n_strata // 2
+    assert len(sample.groupby(['species', 'countryCode'], dropna=False, observed=True)) == len(rows)
+
+
+def test_sample_is_stable_across_filters():
+    df = _frame(20000)
+    subset = df[df['countryCode'] == df['countryCode'].iloc[0]]
+    in_full = set(df.index[stratified_sample(df, 20000 // 4)])
+    in_subset = set(subset.index[stratified_sample(subset, len(subset) // 4)])
+    # Observations are ranked by a hash of their label, so overlapping selections share rows
+    assert len(in_full & in_subset) > 0.15 * len(in_subset)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    df = _frame(rows)
+    start = time.perf_counter()
+    sample = stratified_sample(df, 5000)
+    print(f"{rows:,} rows -> {len(sample):,} sampled in {time.perf_counter() - start:.2f}s")
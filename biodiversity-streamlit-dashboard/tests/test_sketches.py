@@ -0,0 +1,88 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.metrics import overview_summary
+from src.preprocessing import clean_data
+from src.sketches import SKETCH_COLUMNS, DistinctSketches, estimate, relative_error
+from tests.synthetic import make_gbif_frame
+
+ALL = {"kingdom": "All", "phylum": "All", "country": "All", "state": "All",
+       "year_range": None, "has_image": False, "valid_coords": False}
+
+
+def _frame(n_rows, n_species=2000):
+    df = clean_data(make_gbif_frame(n_rows, n_species=n_species), drop_invalid_coords=False)
+    return df[SKETCH_COLUMNS].reset_index(drop=True)
+
+
+def _exact(df, filters):
+    rows = df
+    if filters["kingdom"] != "All":
+        rows = rows[rows['kingdom_grouped'] == filters["kingdom"]]
+    if filters["country"] != "All":
+        rows = rows[rows['countryCode'] == filters["country"]]
+    if filters["year_range"]:
+        rows = rows[rows['event_year'].between(*filters["year_range"])]
+    return rows
+
+
+def test_estimates_within_error_bound():
+    df = _frame(30_000, n_species=20_000)
+    sketches = DistinctSketches(df)
+    bound = 4 * relative_error()
+    country = df['countryCode'].value_counts().index[0]
+    for filters in [ALL, {**ALL, "year_range": (2005, 2015)}, {**ALL, "country": country, "kingdom": "Plantae"}]:
+        rows = _exact(df, filters)
+        estimates = sketches.distinct(filters)
+        for col in ['species', 'genus', 'family', 'recordedBy']:
+            exact = rows[col].nunique()
+            assert abs(estimates[col] - exact) <= max(bound * exact, 2), (col, filters, estimates[col], exact)
+
+
+def test_richness_by_country_and_unsupported_filters():
+    df = _frame(10_000)
+    sketches = DistinctSketches(df)
+    richness = sketches.distinct_by('species', 'countryCode', ALL)
+    exact = df.groupby('countryCode', observed=True)['species'].nunique()
+    for country, count in richness.head(10).items():
+        assert abs(count - exact[country]) <= max(4 * relative_error() * exact[country], 2)
+
+    assert sketches.distinct({**ALL, "phylum": "Chordata"}) is None
+    assert sketches.distinct({**ALL, "valid_coords": True}) is None
+    assert sketches.distinct({**ALL, "country": "Atlantis"})['species'] == 0
+
+
+def test_summary_uses_estimates():
+    df = _frame(2000)
+    sketches = DistinctSketches(df)
+    summary = overview_summary(df, sketches.distinct(ALL))
+    assert summary.approximate
+    assert abs(summary.species - df['species'].nunique()) <= 4 * relative_error() * df['species'].nunique()
+    assert estimate(np.zeros(16, dtype=np.uint8))[0] == 0
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    df = _frame(rows, n_species=50_000)
+    start = time.perf_counter()
+    sketches = DistinctSketches(df)
+    print(f"{rows:,} rows: sketches built in {time.perf_counter() - start:.2f}s, {sketches.nbytes / 2**20:.1f} MiB")
+
+    filters = {**ALL, "year_range": (2005, 2015), "kingdom": "Plantae"}
+    start = time.perf_counter()
+    rows_ = _exact(df, filters)
+    exact = {col: rows_[col].nunique() for col in ['species', 'genus', 'family', 'recordedBy']}
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    estimates = sketches.distinct(filters)
+    sketch_time = time.perf_counter() - start
+    print(f"exact {exact_time * 1000:.0f} ms -> sketches {sketch_time * 1000:.0f} ms")
+    for col in exact:
+        print(f"  {col:<11} exact {exact[col]:>9,}  estimate {estimates[col]:>9,}")
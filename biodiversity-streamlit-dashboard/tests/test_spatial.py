@@ -0,0 +1,144 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src import visualizations
+from src.components.tabs import _viewport
+from src.spatial import GRID_MAX_CELLS, SpatialIndex, grid_cells, grid_for_zoom, heat_points
+from tests.synthetic import make_gbif_frame
+
+
+def _points(n_rows):
+    df = make_gbif_frame(n_rows)[['decimalLatitude', 'decimalLongitude', 'species']]
+    df.loc[::13, 'decimalLatitude'] = None
+    return df
+
+
+def test_grid_counts_every_point_and_its_top_species():
+    df = _points(5000)
+    grid = grid_cells(df, 10.0)
+    mdf = df.dropna(subset=['decimalLatitude', 'decimalLongitude'])
+    assert grid['count'].sum() == len(mdf)
+
+    cell = pd.Series(list(zip(np.floor((mdf['decimalLatitude'] + 90) / 10), np.floor((mdf['decimalLongitude'] + 180) / 10))),
+                     index=mdf.index)
+    assert len(grid) == cell.nunique()
+    for row in grid.itertuples(index=False):
+        inside = mdf[cell == (np.floor((row.latitude + 90) / 10), np.floor((row.longitude + 180) / 10))]
+        assert len(inside) == row.count
+        expected = inside['species'].value_counts()
+        assert [count for _, count in row.top_species] == expected.head(3).tolist()
+        assert all(expected[name] == count for name, count in row.top_species)
+
+
+def test_grid_and_map_stay_bounded():
+    df = _points(20000)
+    assert len(grid_for_zoom(df, 12, max_cells=50)) <= 50
+    layer = visualizations.folium_layer(df, map_type="Markers", zoom=12)
+    assert 0 < len(layer._children) <= GRID_MAX_CELLS
+    few = df.head(50)
+    assert len(visualizations.folium_layer(few, map_type="Markers")._children) == few['decimalLatitude'].notna().sum()
+
+
+def test_spatial_index_matches_box_scan():
+    df = _points(20000)
+    lat = df['decimalLatitude'].astype('float32')
+    lon = df['decimalLongitude'].astype('float32')
+
+    def scan(south, west, north, east, frame_lat=lat, frame_lon=lon):
+        inside = (frame_lat >= south) & (frame_lat <= north) & (frame_lon >= west) & (frame_lon <= east)
+        return np.flatnonzero(inside.to_numpy())
+
+    index = SpatialIndex(df)
+    assert len(index) == df['decimalLatitude'].notna().sum()
+    for box in [(-90, -180, 90, 180), (10, -20, 40, 35), (-5.5, 100.25, -5, 101), (80, 0, 90, 10)]:
+        assert index.within(*box).tolist() == scan(*box).tolist()
+
+    rows = np.flatnonzero(np.random.default_rng(3).random(len(df)) < 0.2)
+    restricted = index.where(rows)
+    box = (10, -20, 40, 35)
+    assert restricted.within(*box).tolist() == scan(*box, lat.take(rows), lon.take(rows)).tolist()
+
+
+def test_heat_points_keep_every_point_within_budget():
+    df = _points(20000)
+    valid = df['decimalLatitude'].notna().sum()
+    for zoom, max_points in [(2, 10000), (10, 10000), (10, 300)]:
+        points = heat_points(df, zoom, max_points)
+        assert len(points) <= max_points
+        assert points[:, 2].sum() == valid
+        assert (np.abs(points[:, 0]) <= 90).all() and (np.abs(points[:, 1]) <= 180).all()
+
+
+def _clustered_points(n_rows, rng):
+    centers = rng.uniform([-50, -170], [70, 170], size=(200, 2))
+    points = centers[rng.integers(len(centers), size=n_rows)] + rng.normal(scale=3, size=(n_rows, 2))
+    return pd.DataFrame({'decimalLatitude': points[:, 0].clip(-90, 90), 'decimalLongitude': points[:, 1].clip(-180, 180)})
+
+
+def benchmark_heatmap_payload(sizes=(100_000, 1_000_000, 10_000_000)):
+    rng = np.random.default_rng(0)
+    for n_rows in sizes:
+        df = _clustered_points(n_rows, rng)
+        if n_rows <= 1_000_000:
+            start = time.perf_counter()
+            raw = len(json.dumps(df[['decimalLatitude', 'decimalLongitude']].values.tolist()))
+            raw_time = f"{time.perf_counter() - start:.2f}s"
+        else:
+            raw, raw_time = None, "skipped"
+        start = time.perf_counter()
+        payload = len(json.dumps(heat_points(df, 4).tolist()))
+        built = time.perf_counter() - start
+        raw_bytes = "-" if raw is None else f"{raw / 2**20:.1f} MiB"
+        print(f"{n_rows:>10,} points: raw {raw_bytes} ({raw_time}) -> weighted {payload / 2**10:.0f} KiB ({built:.2f}s)")
+
+
+def _state(south, west, north, east, zoom=4):
+    return {'bounds': {'_southWest': {'lat': south, 'lng': west}, '_northEast': {'lat': north, 'lng': east}},
+            'zoom': zoom}
+
+
+def test_viewport_wraps_across_antimeridian():
+    assert _viewport(None) is None
+    # Panned one world to the east: the same view as (-10, 10)
+    boxes, zoom = _viewport(_state(-10, 350, 10, 370))
+    assert zoom == 4 and len(boxes) == 1
+    assert np.allclose(boxes[0], (-15, -15, 15, 15))
+
+    # Straddling the antimeridian: one box on either side
+    boxes, _ = _viewport(_state(-10, 160, 10, 200))
+    assert np.allclose(boxes, [(-15, 150, 15, 180), (-15, -180, 15, -150)])
+
+    df = pd.DataFrame({'decimalLatitude': [0.0, 0.0, 0.0, 0.0], 'decimalLongitude': [170.0, -170.0, 0.0, 179.9]})
+    index = SpatialIndex(df)
+    rows = np.unique(np.concatenate([index.within(*box) for box in boxes]))
+    assert rows.tolist() == [0, 1, 3]
+
+    boxes, _ = _viewport(_state(-80, -300, 80, 300))
+    assert boxes == [(-90.0, -180.0, 90.0, 180.0)]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["heatmap"]:
+        benchmark_heatmap_payload()
+        sys.exit()
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    df = _points(rows)
+    start = time.perf_counter()
+    index = SpatialIndex(df)
+    print(f"{rows:,} points: spatial index built in {time.perf_counter() - start:.2f}s, {index.nbytes / 2**20:.0f} MiB")
+    start = time.perf_counter()
+    in_view = index.within(40, -10, 50, 5)
+    print(f"viewport lookup: {len(in_view):,} points in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for zoom in (2, 5, 8):
+        start = time.perf_counter()
+        grid = grid_for_zoom(df, zoom)
+        print(f"{rows:,} points, zoom {zoom}: {len(grid)} cells in {time.perf_counter() - start:.2f}s")
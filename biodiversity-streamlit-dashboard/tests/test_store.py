@@ -0,0 +1,173 @@
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.cube import CUBE_COLUMNS, CUBE_DIMS, CountCube
+from src.data_loader import open_dataset, read_dataset, source_version
+from src.store import OccurrenceStore
+from tests.synthetic import make_gbif_frame
+
+
+def _export(tmp_path, name, df):
+    path = tmp_path / name
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_ingest_and_upsert(tmp_path):
+    base = make_gbif_frame(300)
+    store = OccurrenceStore(tmp_path / "store")
+    stats = store.ingest(_export(tmp_path, "week1.csv", base), chunksize=100)
+    assert stats['inserted'] == 300
+    assert len(store) == 300
+
+    # Week 2: 50 re-interpreted records, 20 stale copies and 30 new ones
+    updated = base.iloc[:50].copy()
+    updated['lastInterpreted'] = "2030-01-01T00:00:00.000Z"
+    updated['species'] = "Updated species"
+    stale = base.iloc[100:120].copy()
+    stale['lastInterpreted'] = "2000-01-01T00:00:00.000Z"
+    stale['species'] = "Stale species"
+    new = make_gbif_frame(30, seed=1)
+    new['gbifID'] += 10_000
+    week2 = pd.concat([updated, stale, new], ignore_index=True)
+
+    stats = OccurrenceStore(tmp_path / "store").ingest(_export(tmp_path, "week2.csv", week2))
+    assert (stats['inserted'], stats['updated'], stats['skipped']) == (30, 50, 20)
+
+    store = OccurrenceStore(tmp_path / "store")
+    df = store.read()
+    assert len(df) == len(store) == 330
+    assert df['gbifID'].is_unique
+    assert (df['species'] == "Updated species").sum() == 50
+    assert not (df['species'] == "Stale species").any()
+
+    counts = store.counts()
+    assert counts['count'].sum() == 330
+    by_kingdom = counts.groupby('kingdom_grouped')['count'].sum()
+    expected = df['kingdom_grouped'].value_counts()
+    assert by_kingdom.sort_index().tolist() == expected[expected > 0].sort_index().tolist()
+
+    # The maintained cube matches one rebuilt from the live rows
+    cube, rebuilt = store.cube(), CountCube(store.read(CUBE_COLUMNS))
+    assert cube.total() == rebuilt.total() == 330
+    for dim in CUBE_DIMS:
+        assert cube.totals(dim).to_dict() == rebuilt.totals(dim).to_dict()
+
+
+def test_compact_keeps_live_rows(tmp_path):
+    base = make_gbif_frame(100)
+    store = OccurrenceStore(tmp_path / "store")
+    store.upsert(read_dataset(_export(tmp_path, "a.csv", base), use_snapshot=False))
+    newer = base.iloc[:40].copy()
+    newer['lastInterpreted'] = "2030-01-01T00:00:00.000Z"
+    store.upsert(read_dataset(_export(tmp_path, "b.csv", newer), use_snapshot=False))
+
+    before = store.read().sort_values('gbifID').reset_index(drop=True)
+    store.compact()
+    after = OccurrenceStore(tmp_path / "store").read().sort_values('gbifID').reset_index(drop=True)
+    assert not any(p['tombstones'] for p in store.manifest['parts'])
+    pd.testing.assert_frame_equal(before, after)
+
+
+def test_store_path_loads_like_csv(tmp_path):
+    csv_path = _export(tmp_path, "gbif.csv", make_gbif_frame(50))
+    store = OccurrenceStore(tmp_path / "store")
+    store.ingest(csv_path)
+
+    version = source_version(tmp_path / "store")
+    df = read_dataset(tmp_path / "store")
+    assert len(df) == 50
+    assert df['species'].dtype == 'category'
+
+    store.ingest(_export(tmp_path, "more.csv", make_gbif_frame(5, seed=3).assign(gbifID=range(5))))
+    assert source_version(tmp_path / "store") != version
+
+
+def test_reingest_unchanged_export_is_a_no_op(tmp_path):
+    export = _export(tmp_path, "week1.csv", make_gbif_frame(200))
+    OccurrenceStore(tmp_path / "store").ingest(export)
+
+    store = OccurrenceStore(tmp_path / "store")
+    stats = store.ingest(export)
+    assert (stats['inserted'], stats['updated'], stats['skipped']) == (0, 0, 200)
+    assert len(store) == 200
+    assert not any(part['tombstones'] for part in store.manifest['parts'])
+
+
+def test_newest_duplicate_in_export_wins(tmp_path):
+    base = make_gbif_frame(150)
+    older = base.iloc[:20].assign(lastInterpreted="2023-01-01T00:00:00.000Z", species="Older species")
+    newer = base.iloc[:20].assign(lastInterpreted="2024-01-01T00:00:00.000Z", species="Newer species")
+    # The older copy comes first, and the newer one lands in a later chunk
+    export = pd.concat([older, base.iloc[20:], newer], ignore_index=True)
+
+    store = OccurrenceStore(tmp_path / "store")
+    store.ingest(_export(tmp_path, "export.csv", export), chunksize=50)
+    df = store.read()
+    assert len(df) == len(store) == 150
+    assert (df['species'] == "Newer species").sum() == 20
+    assert not (df['species'] == "Older species").any()
+
+
+def test_dataset_serves_the_stored_cube(tmp_path):
+    OccurrenceStore(tmp_path / "store").ingest(_export(tmp_path, "gbif.csv", make_gbif_frame(80)))
+    dataset = open_dataset(tmp_path / "store")
+    cube = dataset.derived(CountCube, CUBE_COLUMNS)
+    assert cube.total() == 80
+    assert dataset.loaded_columns == []
+
+
+def _count_rows_read(monkeypatch):
+    """Patch OccurrenceStore to record how many stored rows each upsert reads back."""
+    read = []
+    read_rows = OccurrenceStore._read_rows
+
+    def counting(self, part, ids, columns):
+        rows = read_rows(self, part, ids, columns)
+        read.append(len(rows))
+        return rows
+
+    monkeypatch.setattr(OccurrenceStore, "_read_rows", counting)
+    return read
+
+
+def test_shuffled_ids_only_read_matching_rows(tmp_path, monkeypatch):
+    read = _count_rows_read(monkeypatch)
+    base = make_gbif_frame(2000).sample(frac=1, random_state=0)
+    stats = OccurrenceStore(tmp_path / "store").ingest(_export(tmp_path, "week1.csv", base), chunksize=200)
+    assert stats['inserted'] == 2000
+    # Chunks overlap each other's id ranges, but none of them is read back
+    assert sum(read) == 0
+
+    updated = base.sample(100, random_state=1).assign(lastInterpreted="2030-01-01T00:00:00.000Z",
+                                                      species="Updated species")
+    stats = OccurrenceStore(tmp_path / "store").ingest(_export(tmp_path, "week2.csv", updated), chunksize=20)
+    assert (stats['inserted'], stats['updated'], stats['skipped']) == (0, 100, 0)
+    assert sum(read) == 100
+
+    df = OccurrenceStore(tmp_path / "store").read()
+    assert len(df) == 2000 and df['gbifID'].is_unique
+    assert (df['species'] == "Updated species").sum() == 100
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    import pytest
+
+    read = _count_rows_read(pytest.MonkeyPatch())
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        export = _export(tmp, "export.csv", make_gbif_frame(rows).sample(frac=1, random_state=0))
+        start = time.perf_counter()
+        stats = OccurrenceStore(tmp / "store").ingest(export, chunksize=10_000)
+        print(f"{rows:,} shuffled ids: {stats['inserted']:,} inserted in {time.perf_counter() - start:.2f}s, "
+              f"{sum(read):,} stored rows read back")
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src import visualizations
+from src.components import tabs
+from src.components.sidebar import FILTER_COLUMNS
+from src.data_loader import read_dataset
+
+SAMPLE = read_dataset(project_root / "data" / "dataset_sample.csv", use_snapshot=False)
+
+
+@pytest.mark.parametrize("name", sorted(visualizations.PLOT_COLUMNS))
+def test_plot_runs_on_declared_columns(name):
+    plot = getattr(visualizations, name)
+    df = SAMPLE[visualizations.PLOT_COLUMNS[name]]
+    assert plot(df) is not None
+
+
+def test_plot_columns_cover_every_plot():
+    plots = {name for name in dir(visualizations) if name.startswith('plot_')}
+    assert plots == set(visualizations.PLOT_COLUMNS)
+
+
+@pytest.mark.parametrize("page", sorted(tabs.TAB_COLUMNS))
+def test_tab_columns_exist(page):
+    columns = tabs.columns_for(page)
+    if columns is not None:
+        assert set(FILTER_COLUMNS + columns) <= set(SAMPLE.columns)